@@ -0,0 +1,185 @@
+"""Time and memory-profile the QA/QC checks on synthetic mesonet data at several scales.
+
+Run from the repository root with:
+
+    python -m bench.bench_checks --scales small medium --output results.json
+
+and compare two saved runs with:
+
+    python -m bench.bench_checks --compare before.json after.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import pyqc.checks as ck
+from pyqc.backend import BACKENDS
+from pyqc.columns import Columns
+from pyqc.process import check_observations, merge_elements_by_date
+from pyqc.synthetic import make_mesonet
+
+SCALES = {
+    "small": dict(stations=1, days=7),
+    "medium": dict(stations=10, days=30),
+    "large": dict(stations=50, days=30),
+    "soil": dict(stations=10, days=30, soil_sensors=2),
+}
+
+# Checks that are timed on observations already merged with their elements. The like
+# elements check is timed on observations that have been through the other checks.
+CHECKS = [
+    ck.check_range_pd,
+    ck.check_step_pd,
+    ck.check_variance_pd,
+    ck.check_outages,
+]
+
+
+def _measure(func, repeat: int) -> dict:
+    """Best wall time of `repeat` calls, and the peak memory allocated by one more call."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"seconds": best, "peak_mb": peak / 2**20}
+
+
+def run_scale(name: str, repeat: int, seed: int = 0, backend: str = "pandas") -> list:
+    columns = Columns()
+    dat, elements = make_mesonet(
+        **SCALES[name], sensor_swaps=2, outages=2, gap_fraction=0.01, seed=seed
+    )
+    merged = merge_elements_by_date(dat, elements, columns)
+    checked = merged
+    for check in CHECKS:
+        checked = check(checked, columns=columns)
+
+    stages = {
+        "merge_elements_by_date": lambda: merge_elements_by_date(
+            dat, elements, columns
+        ),
+        **{
+            check.__name__: lambda check=check: check(
+                merged, columns=columns, backend=backend
+            )
+            for check in CHECKS
+        },
+        "check_like_elements": lambda: ck.check_like_elements(checked, columns),
+        "check_observations": lambda: check_observations(
+            dat, elements, columns, *CHECKS, ck.check_like_elements, backend=backend
+        ),
+    }
+
+    results = []
+    for stage, func in stages.items():
+        result = {"scale": name, "backend": backend, "stage": stage, "rows": len(dat)}
+        result.update(_measure(func, repeat))
+        print(
+            f"{name:<8} {backend:<7} {stage:<24} rows={len(dat):>11,} "
+            f"{result['seconds']:9.3f}s {result['peak_mb']:10.1f} MB"
+        )
+        results.append(result)
+
+    return results
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def compare(before: str, after: str) -> None:
+    """Print the change in time and memory of each stage between two saved runs."""
+    with open(before) as f:
+        old = pd.DataFrame(json.load(f)["results"])
+    with open(after) as f:
+        new = pd.DataFrame(json.load(f)["results"])
+
+    keys = [x for x in ["scale", "backend", "stage", "rows"] if x in old and x in new]
+    both = old.merge(new, on=keys, suffixes=("_before", "_after"))
+    both["speedup"] = both["seconds_before"] / both["seconds_after"]
+    both["memory"] = both["peak_mb_after"] / both["peak_mb_before"]
+    print(
+        both[
+            [
+                *keys[:-1],
+                "rows",
+                "seconds_before",
+                "seconds_after",
+                "speedup",
+                "memory",
+            ]
+        ]
+        .round(3)
+        .to_string(index=False)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scales", nargs="+", default=["small", "medium"], choices=list(SCALES)
+    )
+    parser.add_argument(
+        "--backends", nargs="+", default=["pandas"], choices=list(BACKENDS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Save the results to this JSON file.")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = [
+        x
+        for name in args.scales
+        for backend in args.backends
+        for x in run_scale(name, args.repeat, args.seed, backend)
+    ]
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"environment": _environment(), "scales": SCALES, "results": results},
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark the vectorized `check_step_pd` against the original rolling/merge implementation.
+
+Run from the repository root with:
+
+    python -m bench.bench_step --days 365 --elements 24
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from pyqc.checks import check_step_pd
+from pyqc.columns import Columns
+from pyqc.plan import sort_keys
+
+
+def _legacy_check_step_pd(
+    dat: pd.DataFrame, columns: Columns, filter_first: bool = True, **kwargs
+) -> pd.DataFrame:
+    # The rolling-apply implementation `check_step_pd` replaced, kept for comparison.
+    sort_cols = [columns.elem_col, columns.dt_col]
+
+    if "id" in dat.columns:
+        sort_cols.append("id")
+    dat = dat.sort_values(sort_cols, ascending=False, ignore_index=True)
+
+    dat = dat.set_index([columns.dt_col])
+
+    grp_cols = ["id", columns.elem_col] if "id" in dat.columns else [columns.elem_col]
+
+    diffs = (
+        dat.groupby(grp_cols, dropna=False)[columns.compare_col]
+        .rolling(2)
+        .apply(lambda x: abs(x.iloc[1] - x.iloc[0]))
+        .shift(-1)
+        .reset_index()
+        .rename(columns={"value": "diff"})
+    )
+
+    if all(diffs["diff"].isna()):
+        dat = dat.assign(qa_step=-1)
+        dat = dat.reset_index()
+        return dat
+
+    dat = dat.reset_index()
+    dat = dat.merge(diffs, how="left")
+
+    if filter_first:
+        dat = dat[~dat["diff"].isna()].reset_index(drop=True)
+
+    dat = dat.assign(qa_step=(~(dat["diff"] < dat[columns.step_col])).astype(int))
+    if not filter_first:
+        dat = dat.assign(qa_step=np.where(dat["diff"].isna(), -1, dat["qa_step"]))
+
+    dat = dat.drop(columns=["diff"])
+    dat = dat.assign(qa_step=np.where(dat[columns.step_col].isna(), -1, dat["qa_step"]))
+
+    return dat
+
+
+def make_observations(days: int, elements: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(
+        "2022-01-01", periods=days * 288, freq="5min", tz="America/Denver"
+    )
+    names = [f"elem_{i:02}" for i in range(elements)]
+    values = rng.normal(0, 1, (len(names), len(times))).cumsum(axis=1)
+    return pd.DataFrame(
+        {
+            "station": "benchmark",
+            "datetime": np.tile(times, len(names)),
+            "element": np.repeat(names, len(times)),
+            "value": values.ravel(),
+            "step_size": 2.5,
+        }
+    )
+
+
+def _time(func, dat, columns, repeat, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func(dat, columns, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--elements", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    columns = Columns()
+    dat = make_observations(args.days, args.elements)
+
+    for filter_first in (True, False):
+        legacy_t, legacy = _time(
+            _legacy_check_step_pd, dat, columns, 1, filter_first=filter_first
+        )
+        new_t, new = _time(
+            check_step_pd, dat, columns, args.repeat, filter_first=filter_first
+        )
+        # The legacy check returns the newest observations first, `check_step_pd` the oldest.
+        keys = sort_keys(new, columns)
+        pd.testing.assert_series_equal(
+            legacy.sort_values(keys, ignore_index=True)["qa_step"],
+            new.sort_values(keys, ignore_index=True)["qa_step"],
+            check_dtype=False,
+        )
+        print(
+            f"filter_first={filter_first!s:<5} rows={len(dat):>9,} "
+            f"legacy={legacy_t:8.3f}s vectorized={new_t:8.3f}s "
+            f"speedup={legacy_t / new_t:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
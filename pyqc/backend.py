@@ -0,0 +1,71 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict
+
+from .columnar import polars_range, polars_step, polars_variance
+from .matrix import matrix_range, matrix_step, matrix_variance
+from .plan import Check, CheckResult
+
+
+@dataclass(frozen=True)
+class Backend:
+    """An engine that computes some of the registered checks instead of pandas.
+
+    Args:
+        name (str): The name the backend is chosen by, e.g. `check_observations(..., backend="matrix")`.
+        computes (Dict[str, Callable[..., CheckResult]]): Compute functions by the name of the check they
+        replace. They are called like `Check.compute` and must give the same flags. Checks without one are
+        computed with pandas.
+    """
+
+    name: str
+    computes: Dict[str, Callable[..., CheckResult]] = field(default_factory=dict)
+
+    def compute(self, check: Check) -> Callable[..., CheckResult]:
+        """The function that computes `check` with this backend."""
+        return self.computes.get(check.name, check.compute)
+
+
+BACKENDS: Dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend) -> Backend:
+    """Register a backend so it can be chosen by name.
+
+    Args:
+        backend (Backend): The backend. It replaces any earlier backend of the same name.
+
+    Returns:
+        Backend: The registered backend.
+    """
+    BACKENDS[backend.name] = backend
+    return backend
+
+
+def get_backend(backend: str | Backend) -> Backend:
+    """Look up a backend by name.
+
+    Raises:
+        ValueError: If no backend of that name is registered.
+    """
+    if isinstance(backend, Backend):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unknown backend '{backend}'. Must be one of {list(BACKENDS)}."
+        )
+    return BACKENDS[backend]
+
+
+register_backend(Backend("pandas"))
+register_backend(
+    Backend(
+        "matrix",
+        {"range": matrix_range, "step": matrix_step, "variance": matrix_variance},
+    )
+)
+register_backend(
+    Backend(
+        "polars",
+        {"range": polars_range, "step": polars_step, "variance": polars_variance},
+    )
+)
@@ -1,7 +1,16 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import List, Mapping
+from typing import List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+NOT_PERFORMED = "QA/QC not performed for this check."
+UNABLE_TO_PERFORM = (
+    "Unable to perform QA/QC check. If this is unexpected, check AirTable and metadata."
+)
+FLAG_RAISED = "QA/QC flag raised for this check. "
 
 
 @dataclass
@@ -11,29 +20,39 @@ class Bits:
     bits: int
     value: int
 
-    def encode(self):
-        if self.value is not None:
-            if self.value == -1:
-                # If the bit value is -1 (i.e. test cannot be performed),
-                # fill the leftmost bit with a 1.
-                bit_string = "1".ljust(self.bits, "0")
-            else:
-                # Otherwise, just use the actuall binary representation,
-                # zero padded to fit all assigned bits.
-                bit_string = bin(self.value)[2:].zfill(self.bits)
-        else:
+    @property
+    def fill(self) -> int:
+        """The code used when a test hasn't been done yet (all bits set to one)."""
+        return (1 << self.bits) - 1
+
+    @property
+    def unable(self) -> int:
+        """The code used when a test cannot be performed (only the leftmost bit set)."""
+        return 1 << (self.bits - 1)
+
+    def to_int(self) -> int:
+        if self.value is None:
             # If the QA/QC value is None (i.e. a test hasn't been done yet),
             # fill all bits with one.
-            bit_string = "".ljust(self.bits, "1")
+            return self.fill
+
+        if self.value == -1:
+            # If the bit value is -1 (i.e. test cannot be performed),
+            # fill the leftmost bit with a 1.
+            return self.unable
 
-        if len(bit_string) > self.bits:
+        if self.value < 0 or self.value > self.fill:
             raise ValueError(
                 f"""The QC flag value for {self.name} was greater than its
-                allowed number of bits ({self.bits}.) Please check the 
+                allowed number of bits ({self.bits}.) Please check the
                 QC flag and ensure it is valid."""
             )
 
-        return bit_string
+        # Otherwise, just use the actual value, which fits in the assigned bits.
+        return int(self.value)
+
+    def encode(self):
+        return format(self.to_int(), f"0{self.bits}b")
 
     def __lt__(self, other: Bits):
         return self.order < other.order
@@ -67,12 +86,20 @@ class BitEncoder:
             self.qa_shared,
         ]
 
-    def encode(self, as_int: bool = True) -> str | int:
-        s_out = ""
+    def _layout(self) -> List[Tuple[Bits, int]]:
+        """Pair each check with the offset of its rightmost bit in the packed flag."""
+        out = []
+        shift = 0
         for bit in sorted(self._bit_list):
-            s_out = bit.encode() + s_out
-        s_out = s_out.zfill(self.total_bits)
-        return int(s_out, 2) if as_int else s_out
+            out.append((bit, shift))
+            shift += bit.bits
+        return out
+
+    def encode(self, as_int: bool = True) -> str | int:
+        packed = 0
+        for bit, shift in self._layout():
+            packed |= bit.to_int() << shift
+        return packed if as_int else format(packed, f"0{self.total_bits}b")
 
     @staticmethod
     def code_to_human_readable(code: str, shared: str | None = None):
@@ -82,34 +109,107 @@ class BitEncoder:
 
         # If all bits are '1'
         if code.count("1") == len(code):
-            return "QA/QC not performed for this check."
+            return NOT_PERFORMED
 
         # If the leftmost bit is '1' and everything else is '0'.
         if code[0] == "1" and (code.count("0") == len(code) - 1):
-            return "Unable to perform QA/QC check. If this is unexpected, check AirTable and metadata."
+            return UNABLE_TO_PERFORM
 
         if code.count("0") == len(code):
             return None
 
-        return "QA/QC flag raised for this check. "
+        return FLAG_RAISED
 
     def decode(self, qa_val: str | int) -> Mapping[str, str]:
-        if isinstance(qa_val, int):
-            qa_val = bin(qa_val)[2:]
+        if isinstance(qa_val, str):
+            qa_val = int(qa_val, 2)
 
-        # Reverse so we can use normal indexing
-        qa_val = qa_val[::-1]
-
-        cur_idx = 0
         out = {}
-
-        for bit in sorted(self._bit_list):
-            end = cur_idx + bit.bits
-            code = qa_val[cur_idx:end]
-            out[bit.name] = self.code_to_human_readable(code)
-            cur_idx = end
+        for bit, shift in self._layout():
+            code = (qa_val >> shift) & bit.fill
+            # code_to_human_readable expects the bits in right-to-left order.
+            out[bit.name] = self.code_to_human_readable(
+                format(code, f"0{bit.bits}b")[::-1]
+            )
 
         return out
 
+    @classmethod
+    def encode_frame(cls, dat: pd.DataFrame) -> pd.Series:
+        """Pack the `qa_` columns of a DataFrame into one 32 bit flag per observation.
+
+        Args:
+            dat (pd.DataFrame): A DataFrame with any of the `qa_step`, `qa_range`, `qa_delta`,
+            `qa_spatial`, `qa_like` and `qa_shared` columns. A value of -1 means the check could
+            not be performed, and a missing value (or a missing column) means the check was not run.
+
+        Returns:
+            pd.Series: A uint32 Series of packed flags with the same index as `dat`.
+        """
+        encoder = cls()
+        packed = np.zeros(len(dat), dtype=np.uint32)
+
+        for bit, shift in encoder._layout():
+            if bit.name not in dat.columns:
+                packed |= np.uint32(bit.fill << shift)
+                continue
+
+            values = pd.to_numeric(dat[bit.name]).to_numpy(dtype=float, na_value=np.nan)
+            missing = np.isnan(values)
+            values = np.where(missing, 0, values)
+
+            invalid = ((values < 0) & (values != -1)) | (values > bit.fill)
+            if invalid.any():
+                raise ValueError(
+                    f"""The QC flag value for {bit.name} was greater than its
+                    allowed number of bits ({bit.bits}.) Please check the
+                    QC flag and ensure it is valid."""
+                )
+
+            code = np.where(values == -1, bit.unable, values)
+            code = np.where(missing, bit.fill, code).astype(np.uint32)
+            packed |= code << np.uint32(shift)
+
+        return pd.Series(packed, index=dat.index, name="qa_flag")
+
+    @classmethod
+    def decode_array(
+        cls, qa_vals: np.ndarray | pd.Series, human_readable: bool = False
+    ) -> pd.DataFrame:
+        """Unpack an array of packed flags back into one column per check.
+
+        Args:
+            qa_vals (np.ndarray | pd.Series): Packed flags, as returned by `encode_frame`.
+            human_readable (bool): If False, each check is returned as a nullable integer column
+            where -1 means the check could not be performed and <NA> means it was not run. If True,
+            each check is returned as a categorical of the messages used by `decode`.
+
+        Returns:
+            pd.DataFrame: A DataFrame with a column for each check.
+        """
+        index = qa_vals.index if isinstance(qa_vals, pd.Series) else None
+        qa_vals = np.asarray(qa_vals).astype(np.uint32)
+        encoder = cls()
+        out = {}
+
+        for bit, shift in encoder._layout():
+            code = (qa_vals >> np.uint32(shift)) & np.uint32(bit.fill)
+            not_performed = code == bit.fill
+            unable = code == bit.unable
+
+            if human_readable:
+                cat_codes = np.select(
+                    [not_performed, unable, code == 0], [0, 1, -1], default=2
+                )
+                out[bit.name] = pd.Categorical.from_codes(
+                    cat_codes,
+                    categories=[NOT_PERFORMED, UNABLE_TO_PERFORM, FLAG_RAISED],
+                )
+            else:
+                values = pd.array(
+                    np.where(unable, -1, code.astype(np.int16)), dtype="Int16"
+                )
+                values[not_performed] = pd.NA
+                out[bit.name] = values
 
-# dat = pd.read_csv("~/Desktop/test.csv")
+        return pd.DataFrame(out, index=index)
@@ -0,0 +1,436 @@
+import dataclasses
+import hashlib
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .columns import Columns
+from .elements import CompiledElements, compile_elements
+from .instrument import Instrumentation
+from .plan import CHECKS, canonical_order
+from .process import _run_checks, _select_columns
+from .times import TimeIndex
+
+CACHE_SUFFIX = ".pkl"
+
+
+@dataclass
+class CacheStats:
+    """How often a `ResultCache` had the flags of a slice of observations.
+
+    Args:
+        hits (int): Slices whose flags were found.
+        misses (int): Slices whose flags had to be computed.
+        evictions (int): Slices dropped to keep the cache under its size limit.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of slices that were found, NaN before any lookups."""
+        total = self.hits + self.misses
+        return self.hits / total if total else np.nan
+
+
+@dataclass
+class ResultCache:
+    """A size-bounded cache of checked observations, keyed by the content they were checked from.
+
+    The least recently used entries are evicted once the cache holds more than `max_bytes`. With a `path`,
+    entries are kept as files in that directory, so the cache outlives the process and can be shared by
+    runs on the same machine.
+
+    Args:
+        max_bytes (int): How large the cached entries can get, in memory or on disk.
+        path (str | None): A directory to keep the entries in. It is created if it doesn't exist, and
+        entries already in it are reused. If None, the entries are only kept in memory.
+        stats (CacheStats): Hit, miss and eviction counts, e.g. to tune the size of reprocessing windows.
+    """
+
+    max_bytes: int = 256 * 2**20
+    path: str | None = None
+    stats: CacheStats = field(default_factory=CacheStats)
+    # The size and, in memory, the frame of each entry, least recently used first.
+    _entries: "OrderedDict[str, Tuple[int, pd.DataFrame | None]]" = field(
+        init=False, repr=False, default_factory=OrderedDict
+    )
+    _nbytes: int = field(init=False, repr=False, default=0)
+
+    def __post_init__(self):
+        if self.path is None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        files = [x for x in os.scandir(self.path) if x.name.endswith(CACHE_SUFFIX)]
+        for entry in sorted(files, key=lambda x: x.stat().st_mtime):
+            key = entry.name[: -len(CACHE_SUFFIX)]
+            self._entries[key] = (entry.stat().st_size, None)
+            self._nbytes += entry.stat().st_size
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the cached entries."""
+        return self._nbytes
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """The entry stored under `key`, or None if there isn't one. Counts as a hit or a miss."""
+        if key not in self._entries:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        frame = self._entries[key][1]
+        if frame is None:
+            file = self._file(key)
+            frame = pd.read_pickle(file)
+            # Keep the files in order of use for the next process that opens the cache.
+            os.utime(file)
+        return frame
+
+    def put(self, key: str, frame: pd.DataFrame, nbytes: int | None = None) -> None:
+        """Store an entry under `key`, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (str): The key of the entry.
+            frame (pd.DataFrame): The entry.
+            nbytes (int | None): The size of the entry in memory, if it is known. Measured otherwise. On
+            disk, the size of the file is used.
+        """
+        if key in self._entries:
+            self._nbytes -= self._entries.pop(key)[0]
+        if self.path is None:
+            # Strings in the frames are mostly shared, so only their references are counted.
+            size = nbytes
+            if size is None:
+                size = int(frame.memory_usage(index=False, deep=False).sum())
+            self._entries[key] = (size, frame)
+        else:
+            file = self._file(key)
+            # Write to a temporary file first, so a reader never sees half an entry.
+            pd.to_pickle(frame, file + ".tmp", compression=None)
+            os.replace(file + ".tmp", file)
+            size = os.path.getsize(file)
+            self._entries[key] = (size, None)
+        self._nbytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._entries and self._nbytes > self.max_bytes:
+            key, (size, _) = self._entries.popitem(last=False)
+            if self.path is not None and os.path.exists(self._file(key)):
+                os.remove(self._file(key))
+            self._nbytes -= size
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry. The statistics are kept."""
+        for key in list(self._entries):
+            if self.path is not None and os.path.exists(self._file(key)):
+                os.remove(self._file(key))
+        self._entries.clear()
+        self._nbytes = 0
+
+
+def _row_hashes(dat: pd.DataFrame) -> np.ndarray:
+    """A uint64 hash of each row of `dat`."""
+    try:
+        hashed = pd.util.hash_pandas_object(dat, index=False)
+    except TypeError:
+        # Lists, like outage ranges, are hashed by their text.
+        hashed = pd.util.hash_pandas_object(dat.astype(str), index=False)
+    return hashed.to_numpy()
+
+
+def _group_sums(hashes: np.ndarray, codes: np.ndarray, n: int) -> np.ndarray:
+    """The sum of the hashes of each group, wrapping around, so the order of the rows doesn't matter."""
+    out = np.zeros(n, dtype=np.uint64)
+    np.add.at(out, codes, hashes)
+    return out
+
+
+def _codes(*keys: np.ndarray) -> Tuple[np.ndarray, int]:
+    """One integer code for each combination of keys, and the number of combinations."""
+    code = np.zeros(len(keys[0]), dtype=np.int64)
+    for key in keys:
+        key_code, uniques = pd.factorize(key, use_na_sentinel=False)
+        code = code * len(uniques) + key_code
+    code, uniques = pd.factorize(code)
+    return code, len(uniques)
+
+
+def _first(codes: np.ndarray, n: int) -> np.ndarray:
+    """The position of the first row of each code."""
+    first = np.empty(n, dtype=np.int64)
+    # Of repeated positions, the last assignment wins.
+    first[codes[::-1]] = np.arange(len(codes))[::-1]
+    return first
+
+
+def _marked(codes: np.ndarray, marked: np.ndarray) -> np.ndarray:
+    """Whether each code is one of `marked`."""
+    mask = np.zeros(codes.max() + 1 if len(codes) else 0, dtype=bool)
+    mask[marked] = True
+    return mask[codes]
+
+
+def _fingerprint(x, h) -> None:
+    """Feed a keyword argument of the checks into the hash `h`."""
+    if isinstance(x, (pd.DataFrame, pd.Series)):
+        frame = x.to_frame() if isinstance(x, pd.Series) else x
+        h.update(repr((type(x).__name__, list(frame.columns), len(frame))).encode())
+        h.update(_row_hashes(frame).tobytes())
+    elif isinstance(x, np.ndarray):
+        h.update(repr((x.dtype.str, x.shape)).encode())
+        h.update(np.ascontiguousarray(x).tobytes())
+    elif dataclasses.is_dataclass(x) and not isinstance(x, type):
+        h.update(type(x).__name__.encode())
+        for f in dataclasses.fields(x):
+            h.update(f.name.encode())
+            _fingerprint(getattr(x, f.name), h)
+    elif isinstance(x, (list, tuple)):
+        h.update(f"{type(x).__name__}{len(x)}".encode())
+        for item in x:
+            _fingerprint(item, h)
+    elif isinstance(x, dict):
+        h.update(f"dict{len(x)}".encode())
+        for k in sorted(x, key=repr):
+            h.update(repr(k).encode())
+            _fingerprint(x[k], h)
+    else:
+        h.update(repr(x).encode())
+
+
+@dataclass
+class _Slices:
+    """The (station, element, id, local day) slices of a frame of observations.
+
+    Args:
+        codes (np.ndarray): The slice of each observation.
+        table (pd.DataFrame): The `station`, `element`, `id` and `day` of each slice.
+        keys (List[str]): The cache key of each slice.
+        context (List[np.ndarray]): For each observation, the code of the group it shares a key component
+        with, for each component that depends on other slices, like the station's day for the like elements
+        check. The observations of a slice's groups are checked with it.
+        previous (np.ndarray): For each slice, the row of the last observation of its series before its day,
+        which the step check compares the day's first observation with. -1 if there is none.
+    """
+
+    codes: np.ndarray
+    table: pd.DataFrame
+    keys: List[str]
+    context: List[np.ndarray]
+    previous: np.ndarray
+
+
+def _slice_table(dat: pd.DataFrame, columns: Columns) -> pd.DataFrame:
+    """The station, element, id and local day of each observation, as values that can be joined on."""
+    time_index = TimeIndex.build(dat, columns)
+    days = np.append(time_index.days.to_numpy(), np.datetime64("NaT"))
+    return pd.DataFrame(
+        {
+            "station": dat["station"].astype(str).astype("category").array,
+            "element": dat[columns.elem_col].astype(str).astype("category").array,
+            "id": dat["id"].to_numpy() if "id" in dat.columns else np.nan,
+            "day": days[time_index.row_days],
+        }
+    )
+
+
+def _slices(
+    dat: pd.DataFrame,
+    elements: CompiledElements,
+    columns: Columns,
+    names: set,
+    salt: bytes,
+) -> _Slices:
+    labels = _slice_table(dat, columns)
+    station, element = labels["station"].array, labels["element"].array
+    id, day = labels["id"].to_numpy(), labels["day"].to_numpy()
+    hashes = _row_hashes(dat)
+
+    codes, n = _codes(station, element, id, day)
+    first = _first(codes, n)
+    parts = [_group_sums(hashes, codes, n)]
+    context = []
+
+    previous = np.full(n, -1, dtype=np.int64)
+    if "step" in names:
+        # The step check compares the first observation of a slice with the last observation of its
+        # series before the day.
+        times = TimeIndex.build(dat, columns).codes
+        series, _ = _codes(station, element, id)
+        span = times.max() + 2 if len(times) else 1
+        order = np.argsort(series * span + times, kind="stable")
+        rank = np.empty(len(dat), dtype=np.int64)
+        rank[order] = np.arange(len(dat))
+        earliest = np.full(n, len(dat), dtype=np.int64)
+        np.minimum.at(earliest, codes, rank)
+        prev = order[np.maximum(earliest - 1, 0)]
+        valid = (earliest > 0) & (series[prev] == series[first])
+        parts.append(np.where(valid, hashes[prev], np.uint64(0)))
+        previous[valid] = prev[valid]
+
+    # A slice's flags also depend on the observations that the checks read alongside it, and on what
+    # the step check compares those with.
+    combined = np.sum(parts, axis=0, dtype=np.uint64)
+    if "like_elements" in names:
+        group, n_groups = _codes(station, day)
+        parts.append(_group_sums(combined, group[first], n_groups)[group[first]])
+        context.append(group)
+    if "spatial" in names:
+        group, n_groups = _codes(day)
+        parts.append(_group_sums(combined, group[first], n_groups)[group[first]])
+        context.append(group)
+
+    # The deployments of the slice's station, which include the shared sensors of its other elements.
+    table = elements.table.assign(sdi12_address=elements.sdi12_address)
+    table_station, table_stations = pd.factorize(table["station"].astype(str))
+    deployments = pd.Series(
+        _group_sums(_row_hashes(table), table_station, len(table_stations)),
+        index=table_stations,
+    )
+    deployments = deployments.reindex(np.asarray(station[first]), fill_value=0)
+    parts.append(deployments.to_numpy(dtype=np.uint64))
+
+    stacked = np.ascontiguousarray(np.stack(parts, axis=1).astype("<u8"))
+    keys = [
+        hashlib.blake2b(row.tobytes() + salt, digest_size=16).hexdigest()
+        for row in stacked
+    ]
+    return _Slices(
+        codes, labels.iloc[first].reset_index(drop=True), keys, context, previous
+    )
+
+
+def check_observations_cached(
+    dat: pd.DataFrame,
+    elements: pd.DataFrame | CompiledElements,
+    columns: Columns,
+    *checks: Callable,
+    cache: ResultCache,
+    keep_columns: List[str] = None,
+    instrument: Instrumentation | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Check observations like `check_observations`, reusing the flags of slices that were checked before.
+
+    Observations are split into (station, element, id, local day) slices, and each slice is keyed by a hash
+    of its observations, of its station's deployments, of the checks and their arguments, and of the other
+    observations the checks read with it: the station's other elements on the same day for the like elements
+    check, the series' last observation before the day for the step check, and every station's observations
+    on the same day for the spatial check. Slices whose key is in `cache` are taken from it. The rest are
+    checked together, with the observations they depend on, and stored in `cache`.
+
+    This suits jobs that check overlapping windows of observations again and again, like a real-time job
+    checking the last few days every few minutes: only the slices that changed since the last run are
+    checked. Hashing the slices and putting the cached ones back together has a cost of its own, so a run
+    with a warm cache is only faster than `check_observations` when the checks themselves are expensive.
+
+    Args:
+        dat (pd.DataFrame): Long-formatted observations, as described in `check_observations`.
+        elements (pd.DataFrame | CompiledElements): A dataframe of elements for different QA/QC tests.
+        columns (Columns): A Class mapping the column names of `dat` and `elements`.
+        *checks (Callable): QA/QC functions from `check.py` that will be used to check the observations.
+        They must be registered checks, so the observations they read together are known.
+        cache (ResultCache): Where checked slices are looked up and stored. Its `stats` count the slices
+        that were found and checked.
+        keep_columns (List[str]): Columns to keep in the checked DataFrame, as in `check_observations`.
+        instrument (Instrumentation | None): Records the time, rows and raised flags of the slices that are
+        checked.
+        **kwargs: Values to be passed to the check functions.
+
+    Raises:
+        ValueError: If any of the checks isn't registered.
+
+    Returns:
+        pd.DataFrame: The checked observations, sorted by station, element, id and datetime like
+        `check_observations`.
+    """
+    unknown = [x.__name__ for x in checks if x not in CHECKS]
+    if unknown:
+        raise ValueError(f"Can't tell which observations {unknown} read together!")
+
+    names = {CHECKS[x].name for x in checks}
+    elements = compile_elements(elements, columns)
+
+    h = hashlib.blake2b(digest_size=16)
+    _fingerprint(
+        [sorted(names), dataclasses.astuple(columns), list(dat.columns), keep_columns],
+        h,
+    )
+    _fingerprint(kwargs, h)
+    slices = _slices(dat, elements, columns, names, h.digest())
+
+    parts = {}
+    missed = []
+    for code, key in enumerate(slices.keys):
+        found = cache.get(key)
+        if found is None:
+            missed.append(code)
+        else:
+            parts[code] = found
+
+    if missed:
+        is_missed = _marked(slices.codes, missed)
+        rows = is_missed.copy()
+        for group in slices.context:
+            rows |= _marked(group, group[is_missed])
+        # Every slice that is checked needs its series' previous observation for the step check.
+        previous = slices.previous[np.unique(slices.codes[rows])]
+        rows[previous[previous >= 0]] = True
+
+        keep = None if keep_columns is None else list(keep_columns)
+        checked = _run_checks(
+            dat[rows],
+            elements,
+            columns,
+            *checks,
+            keep_columns=keep,
+            instrument=instrument,
+            **kwargs,
+        )
+        labels = _slice_table(checked, columns).merge(
+            slices.table.reset_index(names="_slice"),
+            on=["station", "element", "id", "day"],
+            how="left",
+        )["_slice"]
+        selected = _select_columns(checked, keep)
+        # Order the checked observations by slice once, so each slice is a block of rows.
+        labels = labels.to_numpy()
+        order = np.argsort(labels, kind="stable")
+        selected, labels = selected.take(order), labels[order]
+        lo = np.searchsorted(labels, missed, side="left")
+        hi = np.searchsorted(labels, missed, side="right")
+        row_bytes = selected.memory_usage(index=False).sum() / max(len(selected), 1)
+        for code, a, b in zip(missed, lo, hi):
+            part = selected.iloc[a:b].reset_index(drop=True)
+            cache.put(slices.keys[code], part, int(row_bytes * len(part)))
+            parts[code] = part
+
+    out = pd.concat([parts[x] for x in sorted(parts)], ignore_index=True)
+    for col in ["station", columns.elem_col]:
+        if col in out.columns:
+            out[col] = out[col].astype("category")
+
+    if columns.dt_col in out.columns:
+        order = canonical_order(out, columns)
+        if order is not None:
+            out = out.take(order).reset_index(drop=True)
+    return out
@@ -1,9 +1,15 @@
-from typing import List
+from typing import Callable, List, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .backend import get_backend
 from .columns import Columns
+from .daily import DailyStatsStore
+from .elements import Deployments, deployment_column, has_deployment_column
+from .plan import CHECKS, Check, CheckResult, canonical_order, register_check
+from .spatial import NeighborIndex, neighbor_index
+from .times import TimeIndex
 
 Numeric = float | int | np.number
 
@@ -24,41 +30,69 @@ def check_range(x: Numeric, low: Numeric, high: Numeric) -> int:
     return 1
 
 
-def check_range_pd(dat: pd.DataFrame, columns: Columns, **kwargs) -> pd.DataFrame:
+def check_range_pd(
+    dat: pd.DataFrame, columns: Columns, backend: str = "pandas", **kwargs
+) -> pd.DataFrame:
     """Check that all observations fall within an accepted range of values in a Pandas DataFrame.
 
     Args:
         dat (pd.DataFrame): A DataFrame that has has both observations and criteria needed to run the range check.
         columns (Columns): A Columns object that provides column mappings for everything needed to run the test.
+        backend (str): The engine that computes the flags, 'pandas', 'matrix' or 'polars'. Checks a backend doesn't
+        implement are computed with pandas.
 
     Returns:
         pd.DataFrame: Updated DataFrame that now has a `qa_range` column with associated QA/QC flag values.
     """
 
-    dat = dat.assign(
-        qa_range=dat[columns.compare_col].between(
-            dat[columns.min_col], dat[columns.max_col], inclusive="both"
-        )
-    )
+    flag_range = _flag_range(dat, columns)
+    if flag_range is not None:
+        dat = dat.assign(flag_range=flag_range)
 
-    if (columns.flag_min_col in dat.columns) and (columns.flag_max_col in dat.columns):
-        dat = dat.assign(
-            flag_range=dat[columns.compare_col].between(
-                dat[columns.flag_min_col], dat[columns.flag_max_col], inclusive="both"
-            )
-        )
-        dat = dat.assign(
-            flag_range=np.where(
-                dat[columns.flag_min_col].isna(), True, dat["flag_range"]
-            )
-        )
-        dat = dat.assign(qa_range=(~dat.qa_range | ~dat.flag_range).astype(int))
-    else:
-        dat = dat.assign(qa_range=(~dat["qa_range"]).astype(int))
+    result = _backend_flags(check_range_pd, dat, columns, backend, **kwargs)
+    return dat.assign(qa_range=result.flags["qa_range"])
+
+
+def _threshold(
+    dat: pd.DataFrame,
+    columns: Columns,
+    name: str,
+    deployments: Deployments | None = None,
+) -> np.ndarray:
+    return deployment_column(dat, columns, name, deployments).astype(float)
+
+
+def _flag_range(
+    dat: pd.DataFrame, columns: Columns, deployments: Deployments | None = None
+) -> np.ndarray | None:
+    if not (
+        has_deployment_column(dat, columns.flag_min_col, deployments)
+        and has_deployment_column(dat, columns.flag_max_col, deployments)
+    ):
+        return None
+
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    flag_min = _threshold(dat, columns, columns.flag_min_col, deployments)
+    flag_max = _threshold(dat, columns, columns.flag_max_col, deployments)
+    flag_range = (values >= flag_min) & (values <= flag_max)
+    return np.where(np.isnan(flag_min), True, flag_range)
 
-    dat = dat.assign(qa_range=np.where(dat["range_min"].isna(), -1, dat["qa_range"]))
 
-    return dat
+def _range_flags(
+    dat: pd.DataFrame, columns: Columns, deployments: Deployments | None = None
+) -> np.ndarray:
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    low = _threshold(dat, columns, columns.min_col, deployments)
+    high = _threshold(dat, columns, columns.max_col, deployments)
+    in_range = (values >= low) & (values <= high)
+
+    flag_range = _flag_range(dat, columns, deployments)
+    if flag_range is not None:
+        in_range = in_range & flag_range
+
+    qa_range = (~in_range).astype(np.int8)
+    qa_range[np.isnan(low)] = -1
+    return qa_range
 
 
 def check_step(x: Numeric, prev: Numeric, threshold: Numeric) -> int:
@@ -78,7 +112,11 @@ def check_step(x: Numeric, prev: Numeric, threshold: Numeric) -> int:
 
 
 def check_step_pd(
-    dat: pd.DataFrame, columns: Columns, filter_first: bool = True, **kwargs
+    dat: pd.DataFrame,
+    columns: Columns,
+    filter_first: bool = True,
+    backend: str = "pandas",
+    **kwargs,
 ) -> pd.DataFrame:
     """Check step size criteria and assign QA flag for all observations in a DataFrame
 
@@ -88,47 +126,63 @@ def check_step_pd(
         filter_first (bool): When doing the step check, the first value in a timeseries cannot be QA'd because
         there is no previous value to compare it to. If `filter_first` is True, this first value is simply filtered
         out. If it is set to False, the observation is kept and the `qa_step` column is assigned a fill value of -1.
+        backend (str): The engine that computes the flags, 'pandas', 'matrix' or 'polars'. Checks a backend doesn't
+        implement are computed with pandas.
     Returns:
-        pd.DataFrame:  Updated DataFrame that now has a `qa_step` column with associated QA/QC flag values.
+        pd.DataFrame:  Updated DataFrame that now has a `qa_step` column with associated QA/QC flag values,
+        sorted by station, element, id and datetime.
     """
-    sort_cols = [columns.elem_col, columns.dt_col]
-
-    if "id" in dat.columns:
-        sort_cols.append("id")
-    dat = dat.sort_values(sort_cols, ascending=False, ignore_index=True)
+    order = canonical_order(dat, columns)
+    if order is not None:
+        dat = dat.take(order)
+    dat = dat.reset_index(drop=True)
 
-    dat = dat.set_index([columns.dt_col])
-
-    grp_cols = ["id", columns.elem_col] if "id" in dat.columns else [columns.elem_col]
-
-    diffs = (
-        dat.groupby(grp_cols, dropna=False)[columns.compare_col]
-        .rolling(2)
-        .apply(lambda x: abs(x.iloc[1] - x.iloc[0]))
-        .shift(-1)
-        .reset_index()
-        .rename(columns={"value": "diff"})
+    result = _backend_flags(
+        check_step_pd, dat, columns, backend, filter_first=filter_first, **kwargs
     )
-
-    if all(diffs["diff"].isna()):
-        dat = dat.assign(qa_step=-1)
-        dat = dat.reset_index()
-        return dat
-
-    dat = dat.reset_index()
-    dat = dat.merge(diffs, how="left")
-
-    if filter_first:
-        dat = dat[~dat["diff"].isna()].reset_index(drop=True)
-
-    dat = dat.assign(qa_step=(~(dat["diff"] < dat[columns.step_col])).astype(int))
-    if not filter_first:
-        dat = dat.assign(qa_step=np.where(dat["diff"].isna(), -1, dat["qa_step"]))
-
-    dat = dat.drop(columns=["diff"])
-    dat = dat.assign(qa_step=np.where(dat[columns.step_col].isna(), -1, dat["qa_step"]))
-
-    return dat
+    qa_step, keep = result.flags["qa_step"], result.keep
+    if keep is not None:
+        dat = dat[keep].reset_index(drop=True)
+        qa_step = qa_step[keep]
+
+    return dat.assign(qa_step=qa_step)
+
+
+def _series_starts(dat: pd.DataFrame, columns: Columns) -> np.ndarray:
+    """Whether each observation starts a new (station, element, id) series, in canonical order."""
+    starts = np.zeros(len(dat), dtype=bool)
+    starts[:1] = True
+    for key in [x for x in ["station", columns.elem_col, "id"] if x in dat.columns]:
+        codes = pd.factorize(dat[key], use_na_sentinel=False)[0]
+        starts[1:] |= codes[1:] != codes[:-1]
+    return starts
+
+
+def _step_flags(
+    dat: pd.DataFrame,
+    columns: Columns,
+    filter_first: bool = True,
+    deployments: Deployments | None = None,
+) -> Tuple[np.ndarray, np.ndarray | None]:
+    """Step flags of observations in canonical order, and the rows to keep if the first observation
+    of each series is filtered out."""
+    # Each series is a block of rows in time order, so the previous observation of a series is
+    # the row above, unless the row starts the series.
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    prev = np.empty(len(dat))
+    prev[1:] = values[:-1]
+    prev[_series_starts(dat, columns)] = np.nan
+    diff = np.abs(values - prev)
+
+    if np.isnan(diff).all():
+        return np.full(len(dat), -1, dtype=np.int8), None
+
+    step = _threshold(dat, columns, columns.step_col, deployments)
+    qa_step = np.where(diff < step, 0, 1)
+    qa_step = np.where(np.isnan(diff) | np.isnan(step), -1, qa_step)
+
+    keep = ~np.isnan(diff) if filter_first else None
+    return qa_step.astype(np.int8), keep
 
 
 def check_variance(x: np.ndarray | List[Numeric], threshold: Numeric) -> int:
@@ -146,29 +200,29 @@ def check_variance(x: np.ndarray | List[Numeric], threshold: Numeric) -> int:
     return 1
 
 
-def _calc_daily_variance(dat: pd.DataFrame, columns: Columns) -> pd.DataFrame:
-    dat = dat.assign(datetime=pd.to_datetime(dat[columns.dt_col]))
+def _variance_keys(dat: pd.DataFrame, columns: Columns) -> List[str]:
+    return [x for x in ["station", columns.elem_col, "id"] if x in dat.columns]
 
-    sd = (
-        dat.groupby([pd.Grouper(key=columns.dt_col, freq="1D"), columns.elem_col])[
-            columns.compare_col
-        ]
-        .std()
-        .reset_index()
-    )
-    sd = sd.assign(date=sd[columns.dt_col].dt.date)
-    dat = dat.assign(date=dat[columns.dt_col].dt.date)
-    sd = sd[["date", columns.elem_col, columns.compare_col]]
-    sd.columns = ["date", columns.elem_col, "sd"]
 
-    dat = dat.merge(sd, on=[columns.elem_col, "date"], how="left")
-    dat = dat[["date", columns.elem_col, "sd"]]
-    dat = dat.drop_duplicates(ignore_index=True)
-    return dat
+def _daily_groups(dat: pd.DataFrame, columns: Columns, time_index: TimeIndex):
+    keys = [dat[x] for x in _variance_keys(dat, columns)]
+    day = pd.Series(time_index.row_days, index=dat.index, name="date")
+    return dat.groupby([*keys, day], dropna=False, observed=True)[columns.compare_col]
+
+
+def _calc_daily_variance(
+    dat: pd.DataFrame, columns: Columns, time_index: TimeIndex | None = None
+) -> pd.DataFrame:
+    time_index = TimeIndex.of(dat, columns, time_index)
+    sd = _daily_groups(dat, columns, time_index).std().rename("sd").reset_index()
+
+    # Only the unique days are converted to dates. Missing times (-1) get a missing date.
+    dates = np.append(time_index.days.date, pd.NaT)
+    return sd.assign(date=dates[sd["date"].to_numpy()])
 
 
 def check_variance_pd(
-    dat: pd.DataFrame, columns: Columns, **kwargs: pd.DataFrame
+    dat: pd.DataFrame, columns: Columns, backend: str = "pandas", **kwargs
 ) -> pd.DataFrame:
     """Check that the standard deviation of observations over the course of a day are above a
     specified threshold.
@@ -176,105 +230,145 @@ def check_variance_pd(
     Args:
         dat (pd.DataFrame): A DataFrame of observations and threshold values for the test.
         columns (Columns): A mapping of columns to use in the calculation.
-        **kwargs (pd.DataFrame): Optional - A DataFrame of daily variance for each element.
+        backend (str): The engine that computes the flags, 'pandas', 'matrix' or 'polars'. Checks a backend doesn't
+        implement are computed with pandas.
+        **kwargs (pd.DataFrame): Optional - A DataFrame of daily variance for each element (`variance_df`), or
+        a `DailyStatsStore` of daily statistics (`daily_stats`).
 
     Returns:
         pd.DataFrame: _description_
     """
-
-    if "variance_df" in kwargs:
-        dat = dat.assign(date=pd.to_datetime(dat[columns.dt_col]).dt.date)
-        dat = dat.merge(
-            kwargs["variance_df"], on=[columns.elem_col, "date"], how="left"
-        )
+    result = _backend_flags(check_variance_pd, dat, columns, backend, **kwargs)
+    return dat.assign(qa_delta=result.flags["qa_delta"])
+
+
+def _variance_flags(
+    dat: pd.DataFrame,
+    columns: Columns,
+    variance_df: pd.DataFrame | None = None,
+    daily_stats: DailyStatsStore | None = None,
+    time_index: TimeIndex | None = None,
+    deployments: Deployments | None = None,
+) -> np.ndarray:
+    time_index = TimeIndex.of(dat, columns, time_index)
+    if daily_stats is not None:
+        sd = daily_stats.sd(dat, time_index)
+    elif variance_df is None:
+        sd = _daily_groups(dat, columns, time_index).transform("std").to_numpy()
     else:
-        var = _calc_daily_variance(dat, columns)
-        dat = dat.assign(date=pd.to_datetime(dat[columns.dt_col]).dt.date)
-        dat = dat.merge(var, on=[columns.elem_col, "date"], how="left")
+        # Older daily variances may only be keyed by element and date. Their dates are
+        # matched to the observations' day codes, so the join is on integers.
+        on = [x for x in _variance_keys(dat, columns) if x in variance_df.columns]
+        day = time_index.days.get_indexer(pd.to_datetime(variance_df["date"]))
+        variance_df = variance_df.assign(date=day)[day >= 0]
+        keys = pd.DataFrame({x: dat[x].to_numpy() for x in on})
+        keys["date"] = time_index.row_days
+        sd = keys.merge(variance_df, on=[*on, "date"], how="left")["sd"].to_numpy()
+        if len(sd) != len(dat):
+            raise ValueError(
+                "The daily variance has more than one value for a series and date!"
+            )
 
-    dat = dat.assign(qa_delta=(~(dat["sd"] >= dat[columns.delta_col])).astype(int))
+    delta = _threshold(dat, columns, columns.delta_col, deployments)
+    qa_delta = (~(sd >= delta)).astype(np.int8)
+    qa_delta[np.isnan(delta)] = -1
+    return qa_delta
 
-    dat = dat.drop(columns=["sd", "date"])
 
-    dat = dat.assign(
-        qa_delta=np.where(dat[columns.delta_col].isna(), -1, dat["qa_delta"])
-    )
+def _like_elements(element: str, shared: str) -> List[str]:
+    like_elems = shared.split(",")
+
+    try:
+        elev = int(element.split("_")[-1])
+    except ValueError:
+        elev = None
 
-    return dat
+    if elev:
+        like_elems += [x + f"_{elev:04}" for x in like_elems]
+
+    # Drop duplicates but keep the order, which is used to assign the QA bit flags.
+    return list(dict.fromkeys(like_elems))
 
 
 def check_like_elements(
-    dat: pd.DataFrame, columns: Columns, **kwargs: pd.DataFrame
+    dat: pd.DataFrame, columns: Columns, backend: str = "pandas", **kwargs
 ) -> pd.DataFrame:
-    qa_cols = dat.columns.to_series().str.contains("qa_")
-    split = {k: v for k, v in dat.groupby("element")}
-    out = []
-
-    for element, tmp in split.items():
-        try:
-            elev = int(element.split("_")[-1])
-        except ValueError:
-            elev = None
-
-        try:
-            like_elems = tmp[columns.shared_col].values[0].split(",")
-            if elev:
-                new_like_elems = [x + f"_{elev:04}" for x in like_elems]
-                like_elems += new_like_elems
-            filt = dat[dat["element"].isin(like_elems)]
-
-            # Reversed because this order will be used to assign QA bit flags.
-            # Binary number goes from R -> L so we need to reverse the elements to match.
-            like_elems = list(reversed(like_elems))
-            like_elems.insert(0, "datetime")
-            like_elems = dict(zip(like_elems, range(len(like_elems)), strict=True))
-
-            filt = filt[["datetime", "element"]].assign(
-                # Sum the QA columns
-                qa_sum=filt[filt.columns[qa_cols]].apply(
-                    lambda x: -1 if -1 in x else sum(x), axis=1
-                )
-            )
-            filt = (
-                filt.assign(qa_sum=filt["qa_sum"].apply(lambda x: min(1, x)))
-                .reset_index(drop=True)
-                .pivot(index="datetime", columns="element", values="qa_sum")
-                .rename_axis(None, axis=1)
-                .reset_index()
-                .fillna(-1)
-            )
+    """Flag observations whose shared sensor elements failed any other QA/QC check.
 
-            # Join the columns to create a binary string
-            filt = filt.assign(
-                qa_shared=filt[
-                    # Reorder the columns so they are in the same order as specified in the QA column
-                    sorted(filt.columns, key=lambda x: like_elems[x])
-                ]
-                .iloc[:, 1:]
-                .map(lambda x: str(int(x)).replace("-1", "0"))
-                .apply("".join, axis=1)
-            )[["datetime", "qa_shared"]]
-
-            # Convert binary string to integer.
-            filt = filt.assign(
-                qa_shared=filt["qa_shared"].apply(
-                    lambda x: -1 if "-1" in x else int(x, 2)
-                )
-            )
+    Args:
+        dat (pd.DataFrame): A DataFrame of observations that have already been through the other checks.
+        columns (Columns): A mapping of columns to use in the calculation.
+        backend (str): The engine that computes the flags, 'pandas', 'matrix' or 'polars'. Checks a backend doesn't
+        implement are computed with pandas.
+
+    Returns:
+        pd.DataFrame: Updated DataFrame that now has a `qa_shared` column. Each bit of the flag corresponds
+        to one of the elements in the `shared_sensor` column (the first element is the rightmost bit) and is
+        set if that element failed a check at the same time. A value of -1 means the shared elements are
+        duplicated or have invalid flags, which usually means there is an AirTable error.
+    """
+    result = _backend_flags(check_like_elements, dat, columns, backend, **kwargs)
+    return dat.assign(qa_shared=result.flags["qa_shared"])
+
+
+def _fail_values(qa: pd.DataFrame) -> np.ndarray:
+    """Reduce each observation to a single fail value. A missing flag counts as a failure."""
+    return qa.sum(axis=1, skipna=False).clip(upper=1).fillna(1).to_numpy(dtype=np.int64)
+
+
+def _shared_flags(
+    dat: pd.DataFrame,
+    fail: np.ndarray,
+    columns: Columns,
+    time_index: TimeIndex | None = None,
+    deployments: Deployments | None = None,
+) -> np.ndarray:
+    time_codes = TimeIndex.of(dat, columns, time_index).codes
+    shared = deployment_column(dat, columns, columns.shared_col, deployments)
+    qa_shared = np.zeros(len(dat), dtype=np.int16)
+
+    if "station" in dat.columns:
+        stations = dat.groupby(
+            "station", sort=False, dropna=False, observed=True
+        ).indices.values()
+    else:
+        stations = [np.arange(len(dat))]
 
-            tmp = tmp.merge(filt, how="left", on="datetime")
-        except AttributeError:
-            tmp = tmp.assign(qa_shared=0)
-        except ValueError:
-            # This means there is an airtable error.
-            tmp = tmp.assign(qa_shared=-1)
+    for rows in stations:
+        t_codes, times = pd.factorize(time_codes[rows])
+        e_codes, elems = pd.factorize(dat[columns.elem_col].iloc[rows])
+        elem_index = {elem: i for i, elem in enumerate(elems)}
 
-        out.append(tmp)
+        # Pivot once to a (time x element) matrix of failures.
+        cells = t_codes * len(elems) + e_codes
+        failed = np.zeros(len(times) * len(elems), dtype=bool)
+        failed[cells] = fail[rows] == 1
+        failed = failed.reshape(len(times), len(elems))
 
-    out = pd.concat(out)
-    out = out.assign(qa_shared=out["qa_shared"].fillna(0))
+        # Elements that can't be turned into a flag: duplicated observations or invalid sums.
+        invalid = np.zeros(len(elems), dtype=bool)
+        np.logical_or.at(invalid, e_codes, fail[rows] <= -2)
+        counts = np.bincount(cells, minlength=len(times) * len(elems))
+        np.logical_or.at(invalid, e_codes, counts[cells] > 1)
 
-    return out
+        order = np.argsort(e_codes, kind="stable")
+        bounds = np.cumsum(np.bincount(e_codes, minlength=len(elems)))[:-1]
+        for code, elem_rows in enumerate(np.split(order, bounds)):
+            try:
+                like_elems = _like_elements(elems[code], shared[rows[elem_rows[0]]])
+            except AttributeError:
+                continue
+
+            idx = [elem_index[x] for x in like_elems if x in elem_index]
+            if invalid[idx].any():
+                # This means there is an airtable error.
+                qa_shared[rows[elem_rows]] = -1
+                continue
+
+            flags = failed[:, idx] @ (1 << np.arange(len(idx), dtype=np.int64))
+            qa_shared[rows[elem_rows]] = flags[t_codes[elem_rows]]
+
+    return qa_shared
 
 
 def apply_outage_check(row):
@@ -294,8 +388,271 @@ def apply_outage_check(row):
     return out
 
 
+def _outage_intervals(outages, tz) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse a list of outage ranges into start times sorted in ascending order and the running maximum
+    of their end times, both as integer nanoseconds. Open-ended outages never end."""
+    starts, ends = [], []
+
+    # Any sequence counts, like the arrays outage ranges are read back from Parquet as.
+    for outage in outages if pd.api.types.is_list_like(outages) else []:
+        outage = pd.to_datetime(outage).tz_localize(tz).as_unit("ns").asi8
+        if len(outage) == 2:
+            starts.append(outage[0])
+            ends.append(outage[1])
+        else:
+            # Open-ended outages only flag observations after their start.
+            starts.append(outage[0] + 1)
+            ends.append(np.iinfo(np.int64).max)
+
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    order = np.argsort(starts, kind="stable")
+
+    return starts[order], np.maximum.accumulate(ends[order])
+
+
 def check_outages(
-    dat: pd.DataFrame, columns: Columns, **kwargs: pd.DataFrame
+    dat: pd.DataFrame, columns: Columns, backend: str = "pandas", **kwargs
 ) -> pd.DataFrame:
-    dat = dat.assign(qa_outage=dat.apply(apply_outage_check, axis=1))
-    return dat
+    """Flag observations that were made while an element was listed as having an outage.
+
+    Args:
+        dat (pd.DataFrame): A DataFrame of observations with a column of outage ranges. Each outage is a
+        list of one (open-ended) or two (start and end) datetime strings in the observations' time zone.
+        columns (Columns): A mapping of columns to use in the calculation.
+        backend (str): The engine that computes the flags, 'pandas', 'matrix' or 'polars'. Checks a backend doesn't
+        implement are computed with pandas.
+
+    Returns:
+        pd.DataFrame: Updated DataFrame that now has a `qa_outage` column with associated QA/QC flag values.
+    """
+    result = _backend_flags(check_outages, dat, columns, backend, **kwargs)
+    return dat.assign(qa_outage=result.flags["qa_outage"])
+
+
+def _outage_flags(
+    dat: pd.DataFrame, columns: Columns, deployments: Deployments | None = None
+) -> np.ndarray:
+    times = pd.DatetimeIndex(dat[columns.dt_col]).as_unit("ns")
+    tz = times.tz
+    times = times.asi8
+
+    outages = deployment_column(dat, columns, columns.outages_col, deployments)
+    qa_outage = np.zeros(len(dat), dtype=np.int8)
+
+    # Outage ranges come from the elements table, so they are the same for every
+    # observation of a deployment and only need to be parsed once.
+    if deployments is not None and columns.deployment_col in dat:
+        keys = [columns.deployment_col]
+    else:
+        keys = [
+            x
+            for x in ["station", columns.elem_col, "id", columns.start_col]
+            if x in dat
+        ]
+    groups = dat.groupby(keys, sort=False, dropna=False, observed=True)
+    for rows in groups.indices.values():
+        starts, ends = _outage_intervals(outages[rows[0]], tz)
+        if not len(starts):
+            continue
+
+        # An observation is in an outage if any outage starting before it ends after it.
+        idx = np.searchsorted(starts, times[rows], side="right") - 1
+        in_outage = (idx >= 0) & (ends[np.maximum(idx, 0)] >= times[rows])
+        qa_outage[rows] = in_outage
+
+    return qa_outage
+
+
+def check_spatial(
+    dat: pd.DataFrame,
+    columns: Columns,
+    stations: pd.DataFrame | None = None,
+    neighbors: NeighborIndex | None = None,
+    backend: str = "pandas",
+    **kwargs,
+) -> pd.DataFrame:
+    """Flag observations that are too far from what neighboring stations observed at the same time.
+
+    Each observation is compared with the inverse distance weighted mean of the same element at the
+    station's nearest neighbors, and fails if they differ by more than the deployment's `spatial_sd`.
+
+    Args:
+        dat (pd.DataFrame): A DataFrame of observations and threshold values for the test.
+        columns (Columns): A mapping of columns to use in the calculation.
+        stations (pd.DataFrame | None): The coordinates of each station, as described in
+        `build_neighbor_index`. The neighbor index built from them is cached.
+        neighbors (NeighborIndex | None): A neighbor index to use instead of `stations`.
+        backend (str): The engine that computes the flags, 'pandas', 'matrix' or 'polars'. Checks a backend doesn't
+        implement are computed with pandas.
+
+    Returns:
+        pd.DataFrame: Updated DataFrame that now has a `qa_spatial` column. A value of -1 means the element has
+        no threshold, the station has no coordinates or none of its neighbors observed the element at the time.
+    """
+    result = _backend_flags(
+        check_spatial,
+        dat,
+        columns,
+        backend,
+        stations=stations,
+        neighbors=neighbors,
+        **kwargs,
+    )
+    return dat.assign(qa_spatial=result.flags["qa_spatial"])
+
+
+def _spatial_flags(
+    dat: pd.DataFrame,
+    columns: Columns,
+    stations: pd.DataFrame | None = None,
+    neighbors: NeighborIndex | None = None,
+    time_index: TimeIndex | None = None,
+    deployments: Deployments | None = None,
+) -> np.ndarray:
+    if neighbors is None:
+        if stations is None:
+            raise ValueError(
+                "The spatial check needs the `stations` coordinates or a `neighbors` index!"
+            )
+        neighbors = neighbor_index(stations)
+
+    n_stations = len(neighbors.stations)
+    station = dat["station"]
+    if isinstance(station.dtype, pd.CategoricalDtype):
+        lookup = neighbors.stations.get_indexer(station.cat.categories.astype(str))
+        station = np.append(lookup, -1)[station.cat.codes.to_numpy()]
+    else:
+        station = neighbors.stations.get_indexer(station.astype(str))
+
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    threshold = _threshold(dat, columns, columns.spatial_col, deployments)
+    times = TimeIndex.of(dat, columns, time_index).codes
+    qa_spatial = np.full(len(dat), -1, dtype=np.int8)
+
+    elements = dat.groupby(columns.elem_col, sort=False, dropna=False, observed=True)
+    for rows in elements.indices.values():
+        rows = rows[station[rows] >= 0]
+        if not len(rows):
+            continue
+
+        # Pivot the element to a (time x station) matrix, averaging repeated observations.
+        t_codes = pd.factorize(times[rows])[0]
+        cells = t_codes * n_stations + station[rows]
+        size = (t_codes.max() + 1) * n_stations
+        has = ~np.isnan(values[rows])
+        sums = np.bincount(cells[has], weights=values[rows][has], minlength=size)
+        counts = np.bincount(cells[has], minlength=size)
+        with np.errstate(invalid="ignore"):
+            grid = (sums / counts).reshape(-1, n_stations)
+
+        estimate = neighbors.estimate(grid)[t_codes, station[rows]]
+        diff = np.abs(values[rows] - estimate)
+        flags = np.where(diff > threshold[rows], 1, 0)
+        qa_spatial[rows] = np.where(
+            np.isnan(diff) | np.isnan(threshold[rows]), -1, flags
+        )
+
+    return qa_spatial
+
+
+def _backend_flags(
+    func: Callable, dat: pd.DataFrame, columns: Columns, backend: str, **kwargs
+) -> CheckResult:
+    """Compute the flags of a registered check function with a backend."""
+    return get_backend(backend).compute(CHECKS[func])(dat, columns, {}, **kwargs)
+
+
+def _plan_shared(
+    dat, columns, flags, time_index=None, deployments=None, **kwargs
+) -> CheckResult:
+    # Flags already in the observations count as well as those computed by the plan.
+    qa = dat[[x for x in dat.columns if "qa_" in x and x not in flags]]
+    fail = _fail_values(qa.assign(**flags))
+    return CheckResult(
+        {"qa_shared": _shared_flags(dat, fail, columns, time_index, deployments)}
+    )
+
+
+def _plan_step(
+    dat, columns, flags, filter_first: bool = True, deployments=None, **kwargs
+) -> CheckResult:
+    qa_step, keep = _step_flags(dat, columns, filter_first, deployments)
+    return CheckResult({"qa_step": qa_step}, keep)
+
+
+register_check(
+    Check(
+        "range",
+        check_range_pd,
+        lambda dat, columns, flags, deployments=None, **kwargs: CheckResult(
+            {"qa_range": _range_flags(dat, columns, deployments)}
+        ),
+        inputs=("compare_col", "min_col", "max_col"),
+        outputs=("qa_range",),
+    )
+)
+register_check(
+    Check(
+        "step",
+        check_step_pd,
+        _plan_step,
+        inputs=("compare_col", "elem_col", "dt_col", "step_col"),
+        outputs=("qa_step",),
+    )
+)
+register_check(
+    Check(
+        "variance",
+        check_variance_pd,
+        lambda dat, columns, flags, variance_df=None, daily_stats=None, time_index=None, deployments=None, **kwargs: (
+            CheckResult(
+                {
+                    "qa_delta": _variance_flags(
+                        dat, columns, variance_df, daily_stats, time_index, deployments
+                    )
+                }
+            )
+        ),
+        inputs=("compare_col", "elem_col", "dt_col", "delta_col"),
+        outputs=("qa_delta",),
+    )
+)
+register_check(
+    Check(
+        "like_elements",
+        check_like_elements,
+        _plan_shared,
+        inputs=("elem_col", "dt_col", "shared_col", "qa_*"),
+        outputs=("qa_shared",),
+    )
+)
+register_check(
+    Check(
+        "spatial",
+        check_spatial,
+        lambda dat, columns, flags, stations=None, neighbors=None, time_index=None, deployments=None, **kwargs: (
+            CheckResult(
+                {
+                    "qa_spatial": _spatial_flags(
+                        dat, columns, stations, neighbors, time_index, deployments
+                    )
+                }
+            )
+        ),
+        inputs=("compare_col", "elem_col", "dt_col", "spatial_col"),
+        outputs=("qa_spatial",),
+        network=True,
+    )
+)
+register_check(
+    Check(
+        "outages",
+        check_outages,
+        lambda dat, columns, flags, deployments=None, **kwargs: CheckResult(
+            {"qa_outage": _outage_flags(dat, columns, deployments)}
+        ),
+        inputs=("dt_col", "outages_col"),
+        outputs=("qa_outage",),
+    )
+)
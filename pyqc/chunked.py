@@ -0,0 +1,122 @@
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import pandas as pd
+
+from .columns import Columns
+from .plan import network_checks
+from .process import _run_checks, _select_columns
+
+
+def iter_check_observations(
+    chunks: Iterable[pd.DataFrame],
+    elements: pd.DataFrame,
+    columns: Columns,
+    *checks: Callable,
+    keep_columns: List[str] = None,
+    **kwargs,
+) -> Iterator[pd.DataFrame]:
+    """Perform QA/QC checks on observations that are too large to fit in memory at once.
+
+    Only whole days of observations are checked, so a day that is split across chunks is held back until
+    the station's next day shows up. The last observation of each series is carried over to the next
+    checked part, so the step check doesn't lose the first observation after a chunk boundary.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Long-formatted observations, as described in `check_observations`.
+        For example, CSV or Parquet readers partitioned by station and month. The observations of each
+        station must arrive in chronological order, but stations can be interleaved.
+        elements (pd.DataFrame): A dataframe of elements for different QA/QC tests.
+        columns (Columns): A Class mapping the column names of the observations and `elements`.
+        *checks (Callable): QA/QC functions from `check.py` that will be used to check the observations.
+        keep_columns (List[str]): Columns to keep in the checked DataFrames, as in `check_observations`.
+        **kwargs: Values to be passed to the check functions.
+
+    Raises:
+        ValueError: If any of the checks compares stations, like `check_spatial`. Each station is checked
+        on its own, so such checks would never see the other stations.
+
+    Yields:
+        pd.DataFrame: Checked observations for one or more whole days of a single station.
+    """
+    network = [x.__name__ for x in network_checks(*checks)]
+    if network:
+        raise ValueError(
+            f"{network} compare stations with each other, so they can't be run on one station at a time!"
+        )
+
+    held: Dict[str, pd.DataFrame] = {}
+    context: Dict[str, pd.DataFrame] = {}
+    latest: Dict[str, pd.Timestamp] = {}
+
+    def check_part(station: str, part: pd.DataFrame) -> pd.DataFrame:
+        keys = ["station", columns.elem_col] + (["id"] if "id" in part.columns else [])
+        first = part[columns.dt_col].min()
+
+        prev = context.get(station)
+        context[station] = (
+            part.sort_values(columns.dt_col, kind="stable")
+            .groupby(keys, dropna=False, observed=True)
+            .tail(1)
+        )
+        if prev is not None:
+            part = pd.concat([prev, part], ignore_index=True)
+
+        dat = _run_checks(
+            part, elements, columns, *checks, keep_columns=keep_columns, **kwargs
+        )
+        # The carried over observations were already returned with the previous part.
+        dat = dat[dat[columns.dt_col] >= first]
+        return _select_columns(dat.reset_index(drop=True), keep_columns)
+
+    for chunk in chunks:
+        for station, dat in chunk.groupby("station", sort=False, observed=True):
+            day = dat[columns.dt_col].dt.normalize()
+            if station in latest and (day < latest[station]).any():
+                raise ValueError(
+                    f"""Observations for {station} are out of order! Chunks must
+                    contain each station's observations in chronological order."""
+                )
+
+            if station in held:
+                dat = pd.concat([held.pop(station), dat], ignore_index=True)
+                day = dat[columns.dt_col].dt.normalize()
+
+            # The station's latest day may continue in the next chunk.
+            latest[station] = day.max()
+            held[station] = dat[day == latest[station]]
+
+            if (day < latest[station]).any():
+                yield check_part(station, dat[day < latest[station]])
+
+    for station, dat in held.items():
+        yield check_part(station, dat)
+
+
+def check_observations_chunked(
+    chunks: Iterable[pd.DataFrame],
+    elements: pd.DataFrame,
+    columns: Columns,
+    *checks: Callable,
+    sink: Callable[[pd.DataFrame], None],
+    keep_columns: List[str] = None,
+    **kwargs,
+) -> None:
+    """Perform QA/QC checks on chunks of observations and pass the results to `sink` as they are ready.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): Long-formatted observations. See `iter_check_observations`.
+        elements (pd.DataFrame): A dataframe of elements for different QA/QC tests.
+        columns (Columns): A Class mapping the column names of the observations and `elements`.
+        *checks (Callable): QA/QC functions from `check.py` that will be used to check the observations.
+        sink (Callable[[pd.DataFrame], None]): Called with each DataFrame of checked observations,
+        for example to append it to a file.
+        keep_columns (List[str]): Columns to keep in the checked DataFrames, as in `check_observations`.
+        **kwargs: Values to be passed to the check functions.
+
+    Raises:
+        ValueError: If any of the checks compares stations, like `check_spatial`.
+    """
+    for dat in iter_check_observations(
+        chunks, elements, columns, *checks, keep_columns=keep_columns, **kwargs
+    ):
+        sink(dat)
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+from .columns import Columns
+from .elements import deployment_column, has_deployment_column
+from .plan import CHECKS, CheckResult, series_codes
+from .times import TimeIndex
+
+
+def _import_polars():
+    try:
+        import polars as pl
+    except ImportError as e:
+        raise ImportError(
+            "The 'polars' backend requires polars. Install it with `pip install pyqc[polars]`."
+        ) from e
+    return pl
+
+
+def _pandas(name: str):
+    return next(x.compute for x in CHECKS.values() if x.name == name)
+
+
+def _frame(**values: np.ndarray):
+    """A lazy Polars frame of numeric arrays, with missing values (NaN) as nulls."""
+    pl = _import_polars()
+    return pl.LazyFrame(values, nan_to_null=True)
+
+
+def _values(dat, columns, name, deployments) -> np.ndarray:
+    return deployment_column(dat, columns, name, deployments).astype(float)
+
+
+def polars_range(
+    dat: pd.DataFrame, columns: Columns, flags, deployments=None, **kwargs
+) -> CheckResult:
+    pl = _import_polars()
+    bounds = {
+        "low": columns.min_col,
+        "high": columns.max_col,
+    }
+    has_flags = has_deployment_column(
+        dat, columns.flag_min_col, deployments
+    ) and has_deployment_column(dat, columns.flag_max_col, deployments)
+    if has_flags:
+        bounds.update(flag_min=columns.flag_min_col, flag_max=columns.flag_max_col)
+
+    frame = _frame(
+        value=dat[columns.compare_col].to_numpy(dtype=float),
+        **{k: _values(dat, columns, v, deployments) for k, v in bounds.items()},
+    )
+
+    def between(low: str, high: str):
+        # A missing value or bound fails the comparison, like NaN does in pandas.
+        return pl.col("value").is_between(pl.col(low), pl.col(high)).fill_null(False)
+
+    in_range = between("low", "high")
+    if has_flags:
+        in_range &= pl.col("flag_min").is_null() | between("flag_min", "flag_max")
+    qa_range = (
+        pl.when(pl.col("low").is_null())
+        .then(-1)
+        .otherwise((~in_range).cast(pl.Int8))
+        .cast(pl.Int8)
+    )
+    out = frame.select(qa_range.alias("qa_range")).collect()
+    return CheckResult({"qa_range": out["qa_range"].to_numpy()})
+
+
+def polars_step(
+    dat: pd.DataFrame,
+    columns: Columns,
+    flags,
+    filter_first: bool = True,
+    deployments=None,
+    **kwargs,
+) -> CheckResult:
+    pl = _import_polars()
+    # The observations are in canonical order, so the previous observation of a series is the
+    # row above, unless the row starts the series.
+    frame = _frame(
+        series=series_codes(dat, columns),
+        value=dat[columns.compare_col].to_numpy(dtype=float),
+        step=_values(dat, columns, columns.step_col, deployments),
+    )
+    value, series = pl.col("value"), pl.col("series")
+    prev = pl.when(series == series.shift(1)).then(value.shift(1))
+    diff, step = pl.col("diff"), pl.col("step")
+    out = (
+        frame.with_columns((value - prev).abs().alias("diff"))
+        .select(
+            pl.when(diff.is_null() | step.is_null())
+            .then(-1)
+            .when(diff < step)
+            .then(0)
+            .otherwise(1)
+            .cast(pl.Int8)
+            .alias("qa_step"),
+            diff.is_not_null().alias("keep"),
+        )
+        .collect()
+    )
+
+    keep = out["keep"].to_numpy()
+    if not keep.any():
+        return CheckResult({"qa_step": np.full(len(dat), -1, dtype=np.int8)})
+    return CheckResult(
+        {"qa_step": out["qa_step"].to_numpy()}, keep if filter_first else None
+    )
+
+
+def polars_variance(
+    dat: pd.DataFrame,
+    columns: Columns,
+    flags,
+    variance_df=None,
+    daily_stats=None,
+    time_index=None,
+    deployments=None,
+    **kwargs,
+) -> CheckResult:
+    if variance_df is not None or daily_stats is not None:
+        return _pandas("variance")(
+            dat,
+            columns,
+            flags,
+            variance_df=variance_df,
+            daily_stats=daily_stats,
+            time_index=time_index,
+            deployments=deployments,
+            **kwargs,
+        )
+
+    pl = _import_polars()
+    time_index = TimeIndex.of(dat, columns, time_index)
+    # One integer per series and day is much cheaper to group by than two columns.
+    days = len(time_index.days) + 1
+    frame = _frame(
+        group=series_codes(dat, columns) * days + time_index.row_days + 1,
+        value=dat[columns.compare_col].to_numpy(dtype=float),
+        delta=_values(dat, columns, columns.delta_col, deployments),
+    )
+    # A day with fewer than two observations has no standard deviation, which fails the check.
+    sd = pl.col("value").std().over("group")
+    qa_delta = (
+        pl.when(pl.col("delta").is_null())
+        .then(-1)
+        .when(sd >= pl.col("delta"))
+        .then(0)
+        .otherwise(1)
+        .cast(pl.Int8)
+    )
+    out = frame.select(qa_delta.alias("qa_delta")).collect()
+    return CheckResult({"qa_delta": out["qa_delta"].to_numpy()})
@@ -1,5 +1,8 @@
 from dataclasses import dataclass
 
+import numpy as np
+import pandas as pd
+
 
 @dataclass
 class Columns:
@@ -20,6 +23,11 @@ class Columns:
         delta_col (str): The column speficying the minimum allowable standard deviation across a day of observations.
         like_col (str): The column specifying which other elements a given observation should be compared to.
         shared_sensor(str): The column specifying which other elements originate from the same instrument on a station.
+        outages_col (str): The column listing the outage ranges of an element.
+        spatial_col (str): The column specifying how far an observation can be from the estimate from neighboring
+        stations.
+        deployment_col (str): The column giving the position of each observation's deployment in the
+        `Deployments` table it was matched to, added by `merge_deployments`.
     """
 
     compare_col: str = "value"
@@ -36,3 +44,15 @@ class Columns:
     like_col: str = "like_element"
     shared_col: str = "shared_sensor"
     outages_col: str = "outage_ranges"
+    spatial_col: str = "spatial_sd"
+    deployment_col: str = "deployment"
+
+
+def id_key(x) -> str:
+    """The id of an observation as a string that stores can key a series by, '' if it is missing."""
+    if pd.isna(x):
+        return ""
+    # Numeric ids are read back as floats if any are missing, so 1 and 1.0 are the same id.
+    if isinstance(x, (int, float, np.number)) and float(x).is_integer():
+        return str(int(x))
+    return str(x)
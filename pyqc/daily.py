@@ -0,0 +1,246 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .columns import Columns, id_key
+from .io import import_pyarrow
+from .times import TimeIndex
+
+KEYS = ["station", "element", "id", "date"]
+STATS_COLUMNS = ["count", "mean", "m2"]
+
+
+def _keys(
+    dat: pd.DataFrame, columns: Columns, time_index: TimeIndex | None = None
+) -> pd.DataFrame:
+    """The station, element, id and local date of each observation."""
+    if "id" in dat.columns:
+        codes, uniques = pd.factorize(dat["id"], use_na_sentinel=False)
+        ids = np.array([id_key(x) for x in uniques], dtype=object)[codes]
+    else:
+        ids = ""
+
+    time_index = TimeIndex.of(dat, columns, time_index)
+    days = time_index.days.to_numpy().astype("datetime64[ns]")
+    date = np.append(days, np.datetime64("NaT", "ns"))[time_index.row_days]
+    return pd.DataFrame(
+        {
+            "station": dat["station"].astype(str).to_numpy(),
+            "element": dat[columns.elem_col].astype(str).to_numpy(),
+            "id": ids,
+            "date": date,
+        }
+    )
+
+
+def summarize_daily(dat: pd.DataFrame, columns: Columns) -> pd.DataFrame:
+    """Count, mean and sum of squared deviations (Welford's M2) of each day of each series.
+
+    Args:
+        dat (pd.DataFrame): Long-formatted observations with `station`, `element`, `datetime`, `value` and
+        optionally `id` columns.
+        columns (Columns): A Class mapping the column names of `dat`.
+
+    Returns:
+        pd.DataFrame: A row for each station, element, id and local date with observations. Missing ids are
+        empty strings.
+    """
+    keys = _keys(dat, columns)
+    grouped = (
+        pd.Series(dat[columns.compare_col].to_numpy())
+        .groupby([keys[x] for x in keys.columns], dropna=False, sort=False)
+        .agg(["count", "mean", "var"])
+    )
+    grouped = grouped[grouped["count"] > 0]
+    # `var` is NaN for a single observation, which has no spread.
+    m2 = (grouped["var"] * (grouped["count"] - 1)).fillna(0)
+
+    return grouped.assign(m2=m2)[STATS_COLUMNS].reset_index()
+
+
+def _combine(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Combine two sets of statistics of the same days with Chan's parallel algorithm."""
+    n_a, n_b = a["count"].to_numpy(), b["count"].to_numpy()
+    count = n_a + n_b
+    delta = b["mean"].to_numpy() - a["mean"].to_numpy()
+    return pd.DataFrame(
+        {
+            "count": count,
+            "mean": a["mean"].to_numpy() + delta * n_b / count,
+            "m2": a["m2"].to_numpy()
+            + b["m2"].to_numpy()
+            + delta**2 * n_a * n_b / count,
+        }
+    )
+
+
+def _fold(day: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """Fold the statistics of a batch into the statistics of the same day."""
+    both = day.merge(batch, on=KEYS, how="outer", suffixes=("_day", ""))
+    # A series that is missing on one side has no observations there.
+    combined = _combine(
+        both[[f"{x}_day" for x in STATS_COLUMNS]]
+        .fillna(0)
+        .set_axis(STATS_COLUMNS, axis=1),
+        both[STATS_COLUMNS].fillna(0),
+    )
+    return both[KEYS].assign(**combined).astype({"count": np.int64})
+
+
+def _partition(date) -> str:
+    """The file name of a day's statistics in a store."""
+    return f"date={'NaT' if pd.isna(date) else pd.Timestamp(date).strftime('%Y-%m-%d')}.parquet"
+
+
+def _empty_stats() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "station": pd.Series(dtype=object),
+            "element": pd.Series(dtype=object),
+            "id": pd.Series(dtype=object),
+            "date": pd.Series(dtype="datetime64[ns]"),
+            "count": pd.Series(dtype=np.int64),
+            "mean": pd.Series(dtype=float),
+            "m2": pd.Series(dtype=float),
+        }
+    )
+
+
+@dataclass
+class DailyStatsStore:
+    """Daily statistics of each station, element and id for the persistence check, kept on disk.
+
+    Fold new observations in with `update`, and pass the store to `check_variance_pd` (or to
+    `check_observations`) as `daily_stats` to use the daily standard deviations from the store instead of
+    recomputing them from the observations.
+
+    On disk, each local date is a Parquet file (`date=<YYYY-MM-DD>.parquet`) in the `path` directory. Days
+    are only read when observations of them are updated or checked, and an update only rewrites the days
+    it touches, so late observations cost as much as the days they fall on, however large the store grows.
+
+    Args:
+        path (str | None): A directory to load the statistics from and save them to. It is created if it
+        doesn't exist. If None, the store is only kept in memory. Saving needs pyarrow, which is installed
+        with `pip install pyqc[arrow]`.
+        columns (Columns): A Class mapping the column names of the observations.
+    """
+
+    path: str | None = None
+    columns: Columns = field(default_factory=Columns)
+    # The statistics of each day that has been read or updated, by the name of its file.
+    _days: Dict[str, pd.DataFrame] = field(init=False, repr=False, default_factory=dict)
+
+    def __post_init__(self):
+        if self.path is not None:
+            import_pyarrow()
+            os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def stats(self) -> pd.DataFrame:
+        """The statistics of every day that has been read or updated."""
+        return self._stats(self._days)
+
+    def _stats(self, names) -> pd.DataFrame:
+        parts = [self._days[x] for x in names if x in self._days]
+        return pd.concat(parts, ignore_index=True) if parts else _empty_stats()
+
+    def _day(self, name: str) -> pd.DataFrame:
+        """The statistics of a day, read from disk the first time they are needed."""
+        if name not in self._days:
+            file = None if self.path is None else os.path.join(self.path, name)
+            if file is not None and os.path.exists(file):
+                self._days[name] = pd.read_parquet(file).astype(
+                    {"id": object, "date": "datetime64[ns]"}
+                )
+            else:
+                return _empty_stats()
+        return self._days[name]
+
+    def load(self, dates=None) -> pd.DataFrame:
+        """Read the statistics of days from disk, unless they have been read already.
+
+        Args:
+            dates: The local dates to read. Defaults to every day in the store.
+
+        Returns:
+            pd.DataFrame: The statistics of every day read so far, as in `stats`.
+        """
+        if dates is not None:
+            names = {_partition(x) for x in dates}
+        elif self.path is not None:
+            names = [x for x in os.listdir(self.path) if x.endswith(".parquet")]
+        else:
+            names = []
+        for name in sorted(names):
+            self._day(name)
+        return self.stats
+
+    def update(self, dat: pd.DataFrame, save: bool = True) -> pd.DataFrame:
+        """Fold new observations into the statistics. Each observation should only be added once.
+
+        Only the statistics of the days that `dat` has observations for are read, updated and saved.
+
+        Args:
+            dat (pd.DataFrame): Long-formatted observations.
+            save (bool): If True and the store has a `path`, save the days that `dat` has observations for.
+
+        Returns:
+            pd.DataFrame: The updated statistics of the days that `dat` has observations for.
+        """
+        batch = summarize_daily(dat, self.columns)
+        names = []
+        for date, part in batch.groupby("date", dropna=False, sort=False):
+            name = _partition(date)
+            self._days[name] = _fold(self._day(name), part)
+            names.append(name)
+
+        if save and self.path is not None:
+            self._save(self.path, names)
+
+        return batch[KEYS].merge(self._stats(names), on=KEYS, how="left")
+
+    def sd(self, dat: pd.DataFrame, time_index: TimeIndex | None = None) -> np.ndarray:
+        """The standard deviation of the day each observation was made on, NaN if it isn't known.
+
+        Args:
+            dat (pd.DataFrame): Long-formatted observations.
+            time_index (TimeIndex | None): The factorized times of `dat`, if they have been built already.
+
+        Returns:
+            np.ndarray: The sample standard deviation of each observation's day, matching `pd.Series.std`.
+        """
+        keys = _keys(dat, self.columns, time_index)
+        names = sorted({_partition(x) for x in keys["date"].unique()})
+        for name in names:
+            self._day(name)
+        stats = keys.merge(self._stats(names), on=KEYS, how="left")
+        count = stats["count"].to_numpy(dtype=float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sd = np.sqrt(stats["m2"].to_numpy() / (count - 1))
+        return np.where(count > 1, sd, np.nan)
+
+    def save(self, path: str | None = None, dates=None) -> None:
+        """Save the statistics to a directory of a Parquet file per day.
+
+        Args:
+            path (str | None): Where to save the statistics. Defaults to the store's `path`.
+            dates: The local dates to save. Defaults to every day that has been read or updated.
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("The store has no path to save to!")
+        import_pyarrow()
+        os.makedirs(path, exist_ok=True)
+
+        names = list(self._days) if dates is None else [_partition(x) for x in dates]
+        self._save(path, [x for x in names if x in self._days])
+
+    def _save(self, path: str, names: List[str]) -> None:
+        for name in names:
+            # Written next to the day and moved over it, so a day is never half written.
+            target = os.path.join(path, name)
+            self._days[name].to_parquet(f"{target}.tmp", index=False)
+            os.replace(f"{target}.tmp", target)
@@ -0,0 +1,257 @@
+import hashlib
+from dataclasses import astuple, dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .columns import Columns
+from .memo import Memo
+
+# How many compiled elements tables `compile_elements` keeps around.
+ELEMENTS_CACHE_SIZE = 16
+
+_cache = Memo()
+
+
+@dataclass
+class DeploymentIndex:
+    """Deployments sorted by element and start date, for matching observations to deployments.
+
+    Args:
+        categories (List[pd.Index]): The unique values of each key column of the deployments.
+        code (np.ndarray): A single integer for the key columns of each sorted deployment.
+        start (np.ndarray): The start date of each sorted deployment, as UTC nanoseconds.
+        order (np.ndarray): The position in the elements table of each sorted deployment. Deployments
+        without a start date are left out.
+    """
+
+    categories: List[pd.Index]
+    code: np.ndarray
+    start: np.ndarray
+    order: np.ndarray
+
+    def encode(self, dat: pd.DataFrame, keys: List[str]) -> np.ndarray:
+        """Encode the key columns of observations in the same way as the deployments' keys.
+
+        Missing keys match deployments with missing keys, and keys without a deployment get a code
+        that no deployment has.
+        """
+        code = np.zeros(len(dat), dtype=np.int64)
+        for key, cats in zip(keys, self.categories, strict=True):
+            x = dat[key]
+            if isinstance(x.dtype, pd.CategoricalDtype):
+                # Only look up each category once.
+                lookup = np.append(cats.get_indexer(x.cat.categories), len(cats))
+                key_code = lookup[x.cat.codes.to_numpy()]
+            else:
+                key_code = cats.get_indexer(x)
+                key_code[x.isna().to_numpy()] = len(cats)
+            key_code[key_code == -1] = len(cats) + 1
+            code = code * (len(cats) + 2) + key_code
+        return code
+
+
+@dataclass
+class Deployments:
+    """The deployments that observations were matched to, kept apart from the observations.
+
+    Observations only carry the position of their deployment in `table` (the `deployment_col` of `Columns`,
+    -1 if no deployment was active), and the checks look up the thresholds they need with array lookups.
+    Other columns, like a sensor's model or serial number, are only joined to the observations on request.
+
+    Args:
+        table (pd.DataFrame): The columns of each deployment, with a RangeIndex.
+    """
+
+    table: pd.DataFrame
+    _values: Dict[str, np.ndarray] = field(init=False, repr=False, default_factory=dict)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.table.columns
+
+    def values(self, codes: np.ndarray, name: str) -> np.ndarray:
+        """The column `name` of the deployments at `codes`, missing where the code is -1."""
+        if name not in self._values:
+            # The code -1 points at a last, missing row.
+            self._values[name] = (
+                self.table[name].reindex(np.arange(len(self.table) + 1)).to_numpy()
+            )
+        return self._values[name][codes]
+
+    def attach(
+        self, dat: pd.DataFrame, columns: Columns, names: List[str] | None = None
+    ) -> pd.DataFrame:
+        """Join the columns `names` of each observation's deployment to the observations, or every column
+        if `names` is None."""
+        meta = self.table if names is None else self.table[list(names)]
+        meta = meta.reindex(dat[columns.deployment_col].to_numpy()).set_axis(dat.index)
+        return dat.join(meta, lsuffix="_x", rsuffix="_y")
+
+
+def deployment_column(
+    dat: pd.DataFrame,
+    columns: Columns,
+    name: str,
+    deployments: Deployments | None = None,
+) -> np.ndarray:
+    """The value of an elements column for each observation.
+
+    Args:
+        dat (pd.DataFrame): Observations, either merged with their elements or carrying the deployment codes
+        of `deployments`.
+        columns (Columns): A Class mapping the column names of `dat`.
+        name (str): The elements column, like `columns.min_col`.
+        deployments (Deployments | None): The deployments the observations were matched to, or None if the
+        elements columns are in `dat`.
+
+    Returns:
+        np.ndarray: The column's value for each observation.
+    """
+    if deployments is not None and name in deployments:
+        return deployments.values(dat[columns.deployment_col].to_numpy(), name)
+    return dat[name].to_numpy()
+
+
+def has_deployment_column(
+    dat: pd.DataFrame, name: str, deployments: Deployments | None = None
+) -> bool:
+    """Whether `deployment_column` can find the column `name`."""
+    return name in dat.columns or (deployments is not None and name in deployments)
+
+
+@dataclass
+class CompiledElements:
+    """An elements table prepared once for matching observations to deployments.
+
+    Use `compile_elements` to create one, so that the preparation is shared by every call with the same
+    elements table. `merge_elements_by_date` and `check_observations` accept a compiled elements table in
+    place of the DataFrame.
+
+    Args:
+        elements (pd.DataFrame): A dataframe of elements for different QA/QC tests. It is not modified.
+        columns (Columns): A Class mapping the column names of `elements`.
+    """
+
+    elements: pd.DataFrame
+    columns: Columns = field(default_factory=Columns)
+    table: pd.DataFrame = field(init=False, repr=False)
+    sdi12_address: pd.Series = field(init=False, repr=False)
+    _by_tz: Dict[str, pd.DataFrame] = field(
+        init=False, repr=False, default_factory=dict
+    )
+    _indexes: Dict[Tuple[str, ...], DeploymentIndex] = field(
+        init=False, repr=False, default_factory=dict
+    )
+
+    def __post_init__(self):
+        columns = self.columns
+        table = self.elements.reset_index(drop=True)
+        self.table = table.assign(
+            **{
+                col: pd.to_datetime(table[col]).dt.tz_localize("UTC")
+                for col in [columns.start_col, columns.end_col]
+            }
+        )
+
+        # The address only tells soil sensors of the same element apart.
+        if "sdi12_address" in table.columns:
+            address = table["sdi12_address"]
+        else:
+            address = pd.Series(np.nan, index=table.index)
+        soil = table["element"].str.contains("soil").fillna(False).to_numpy(dtype=bool)
+        soil_counts = table.loc[soil, "element"].value_counts()
+        single = table["element"].isin(soil_counts[soil_counts == 1].index).to_numpy()
+        self.sdi12_address = address.where(soil & ~single)
+
+    def localize(self, tz) -> pd.DataFrame:
+        """The elements table with deployment dates in the time zone `tz` and open-ended deployments
+        ending now. Deployments end at the last second of their end date."""
+        columns = self.columns
+        key = str(tz)
+        if key not in self._by_tz:
+            self._by_tz[key] = self.table.assign(
+                **{
+                    col: self.table[col].dt.tz_convert(tz)
+                    for col in [columns.start_col, columns.end_col]
+                }
+            )
+        table = self._by_tz[key]
+
+        date_end = table[columns.end_col].fillna(pd.Timestamp.now(tz))
+        return table.assign(
+            date_end=date_end + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+        )
+
+    def index(self, keys: List[str]) -> DeploymentIndex:
+        """Index the deployments by the columns `keys`, e.g. `["station", "element"]`."""
+        keys = tuple(keys)
+        if keys not in self._indexes:
+            table = self.table.assign(sdi12_address=self.sdi12_address)
+            categories = []
+            code = np.zeros(len(table), dtype=np.int64)
+            for key in keys:
+                key_code, cats = pd.factorize(table[key])
+                key_code[key_code == -1] = len(cats)
+                categories.append(pd.Index(cats))
+                code = code * (len(cats) + 2) + key_code
+
+            start = pd.DatetimeIndex(table[self.columns.start_col]).as_unit("ns").asi8
+            # Deployments without a start date never match an observation.
+            valid = np.flatnonzero(~table[self.columns.start_col].isna().to_numpy())
+            order = valid[np.lexsort((start[valid], code[valid]))]
+
+            self._indexes[keys] = DeploymentIndex(
+                categories, code[order], start[order], order
+            )
+        return self._indexes[keys]
+
+
+def _content_hash(elements: pd.DataFrame, columns: Columns) -> str:
+    h = hashlib.sha1()
+    h.update(
+        repr(
+            (list(elements.columns), list(map(str, elements.dtypes)), astuple(columns))
+        ).encode()
+    )
+    for col in elements.columns:
+        x = elements[col]
+        try:
+            hashed = pd.util.hash_pandas_object(x, index=False)
+        except TypeError:
+            # Lists, like outage ranges, are hashed by their text.
+            hashed = pd.util.hash_pandas_object(x.astype(str), index=False)
+        h.update(hashed.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def compile_elements(
+    elements: pd.DataFrame, columns: Columns = None
+) -> CompiledElements:
+    """Prepare an elements table for `merge_elements_by_date`, reusing earlier work where possible.
+
+    Compiled tables are memoized by the content of `elements`, so calling this with an unchanged table,
+    even a new copy of it, returns the same `CompiledElements`. The `ELEMENTS_CACHE_SIZE` most recently
+    used tables are kept.
+
+    Args:
+        elements (pd.DataFrame): A dataframe of elements for different QA/QC tests.
+        columns (Columns): A Class mapping the column names of `elements`.
+
+    Returns:
+        CompiledElements: The prepared elements table.
+    """
+    if isinstance(elements, CompiledElements):
+        return elements
+
+    columns = columns or Columns()
+    return _cache.get(
+        _content_hash(elements, columns),
+        lambda: CompiledElements(elements.copy(), columns),
+        ELEMENTS_CACHE_SIZE,
+    )
+
+
+def clear_elements_cache() -> None:
+    """Forget all elements tables compiled by `compile_elements`."""
+    _cache.clear()
@@ -0,0 +1,276 @@
+import os
+from dataclasses import dataclass, field, fields
+from fnmatch import fnmatch
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .bits import BitEncoder
+from .columns import Columns, id_key
+
+TIMES_FILE = "datetime.bin"
+FLAGS_FILE = "qa_flag.bin"
+
+SeriesKey = Tuple[str, str, str]
+
+# The flags `BitEncoder` packs, which are the only ones the store can keep.
+STORED_FLAGS = [x.name for x in fields(BitEncoder) if x.name.startswith("qa_")]
+
+
+@dataclass
+class FlagSeries:
+    """The packed flags of one series over a time range.
+
+    Args:
+        times (np.ndarray): The UTC times of the observations as datetime64[ns], in ascending order.
+        flags (np.ndarray): The uint32 flags of the observations, packed by `BitEncoder`.
+    """
+
+    times: np.ndarray
+    flags: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __getitem__(self, rows) -> "FlagSeries":
+        return FlagSeries(self.times[rows], self.flags[rows])
+
+    def decode(self) -> pd.DataFrame:
+        """Unpack the flags into a column for each check, indexed by time."""
+        return BitEncoder.decode_array(self.flags).set_index(
+            pd.DatetimeIndex(self.times, tz="UTC", name="datetime")
+        )
+
+
+def _codes(flags: np.ndarray, check: str) -> Tuple[np.ndarray, int, int]:
+    for bit, shift in BitEncoder()._layout():
+        if bit.name == check:
+            return (
+                (flags >> np.uint32(shift)) & np.uint32(bit.fill),
+                bit.fill,
+                bit.unable,
+            )
+    raise ValueError(
+        f"Unknown check '{check}'. Must be one of "
+        f"{[x.name for x, _ in BitEncoder()._layout()]}."
+    )
+
+
+def match_flags(
+    flags: np.ndarray,
+    raised: Iterable[str] = (),
+    unable: Iterable[str] = (),
+    not_performed: Iterable[str] = (),
+) -> np.ndarray:
+    """Find packed flags where any of the given checks is in the given state.
+
+    For example, `match_flags(flags, raised=["qa_range"], unable=["qa_step"])` finds observations that
+    failed the range check or that the step check could not be performed for.
+
+    Args:
+        flags (np.ndarray): uint32 flags packed by `BitEncoder`.
+        raised (Iterable[str]): Checks whose flag was raised, like 'qa_range'.
+        unable (Iterable[str]): Checks that could not be performed.
+        not_performed (Iterable[str]): Checks that were not run.
+
+    Returns:
+        np.ndarray: A boolean mask of the matching flags.
+    """
+    flags = np.asarray(flags, dtype=np.uint32)
+    out = np.zeros(len(flags), dtype=bool)
+    for check in raised:
+        code, fill, unable_code = _codes(flags, check)
+        out |= (code != 0) & (code != fill) & (code != unable_code)
+    for check in unable:
+        code, _, unable_code = _codes(flags, check)
+        out |= code == unable_code
+    for check in not_performed:
+        code, fill, _ = _codes(flags, check)
+        out |= code == fill
+    return out
+
+
+def _utc_ns(x) -> np.int64:
+    x = pd.Timestamp(x)
+    x = x.tz_localize("UTC") if x.tzinfo is None else x.tz_convert("UTC")
+    return np.int64(x.as_unit("ns").value)
+
+
+@dataclass
+class FlagStore:
+    """An append-only store of packed QA/QC flags that can be queried by time without loading it.
+
+    Each station, element and id is kept in its own directory (`station=<station>/element=<element>/id=<id>`)
+    as two flat binary files: the UTC times as int64 nanoseconds and the flags as uint32 packed by
+    `BitEncoder`. Reads memory map the files, so reading a time range of a series is a binary search and a
+    slice of the mapped files, without copying them.
+
+    Args:
+        root (str): The directory of the store. It is created if it doesn't exist.
+        columns (Columns): A Class mapping the column names of checked observations.
+    """
+
+    root: str
+    columns: Columns = field(default_factory=Columns)
+    _maps: Dict[str, Tuple[int, np.ndarray]] = field(
+        init=False, repr=False, default_factory=dict
+    )
+
+    def __post_init__(self):
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: SeriesKey) -> str:
+        station, element, id = key
+        return os.path.join(
+            self.root, f"station={station}", f"element={element}", f"id={id}"
+        )
+
+    def _map(self, path: str, dtype) -> np.ndarray:
+        """Memory map a file, reusing the map until the file grows."""
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        cached = self._maps.get(path)
+        if cached is None or cached[0] != size:
+            if size == 0:
+                data = np.empty(0, dtype=dtype)
+            else:
+                data = np.memmap(path, dtype=dtype, mode="r")
+            self._maps[path] = cached = (size, data)
+        return cached[1]
+
+    def _arrays(self, key: SeriesKey) -> Tuple[np.ndarray, np.ndarray]:
+        path = self._path(key)
+        times = self._map(os.path.join(path, TIMES_FILE), np.int64)
+        flags = self._map(os.path.join(path, FLAGS_FILE), np.uint32)
+        # An interrupted append can leave flags without times, which are ignored until the next
+        # append overwrites them.
+        n = min(len(times), len(flags))
+        return times[:n], flags[:n]
+
+    def append(self, dat: pd.DataFrame) -> None:
+        """Add checked observations to the store.
+
+        Args:
+            dat (pd.DataFrame): Checked observations, as returned by `check_observations`, with time zone
+            aware datetimes. The `qa_` columns are packed with `BitEncoder.encode_frame`, which only has
+            bits for the flags in `STORED_FLAGS`.
+
+        Raises:
+            ValueError: If an observation isn't newer than the last one stored for its series, or if `dat`
+            has `qa_` columns the store can't keep, like `qa_outage`. Nothing is written in that case.
+        """
+        unstored = [
+            x for x in dat.columns if x.startswith("qa_") and x not in STORED_FLAGS
+        ]
+        if unstored:
+            raise ValueError(
+                f"{unstored} can't be packed into the stored flags! Drop them before appending."
+            )
+
+        columns = self.columns
+        times = pd.DatetimeIndex(dat[columns.dt_col]).tz_convert("UTC")
+        batch = pd.DataFrame(
+            {
+                "station": dat["station"].astype(str).to_numpy(),
+                "element": dat[columns.elem_col].astype(str).to_numpy(),
+                "id": [id_key(x) for x in dat["id"]] if "id" in dat.columns else "",
+                "time": times.as_unit("ns").asi8,
+                "flag": BitEncoder.encode_frame(dat).to_numpy(),
+            }
+        ).sort_values(["station", "element", "id", "time"], kind="stable")
+
+        groups = batch.groupby(["station", "element", "id"], sort=False)
+        for key, part in groups:
+            new = part["time"].to_numpy()
+            last = self._arrays(key)[0][-1:]
+            if np.any(np.diff(new) <= 0) or (len(last) and new[0] <= last[0]):
+                raise ValueError(
+                    f"Observations of {key} must be newer than those already stored, "
+                    "and can't be duplicated."
+                )
+
+        for key, part in groups:
+            path = self._path(key)
+            os.makedirs(path, exist_ok=True)
+            flags_path = os.path.join(path, FLAGS_FILE)
+            if os.path.exists(flags_path):
+                os.truncate(flags_path, len(self._arrays(key)[1]) * 4)
+            # Flags are written first, so an interrupted append never exposes a time without a flag.
+            with open(flags_path, "ab") as f:
+                f.write(part["flag"].to_numpy(dtype=np.uint32).tobytes())
+            with open(os.path.join(path, TIMES_FILE), "ab") as f:
+                f.write(part["time"].to_numpy(dtype=np.int64).tobytes())
+
+    def series(self) -> List[SeriesKey]:
+        """The (station, element, id) of every series in the store. A missing id is an empty string."""
+        out = []
+        for station in sorted(os.listdir(self.root)):
+            station_dir = os.path.join(self.root, station)
+            for element in sorted(os.listdir(station_dir)):
+                for id in sorted(os.listdir(os.path.join(station_dir, element))):
+                    out.append(
+                        tuple(x.split("=", 1)[1] for x in [station, element, id])
+                    )
+        return out
+
+    def read(
+        self, station: str, element: str, start=None, end=None, id=None
+    ) -> FlagSeries:
+        """Read the flags of a series between two times, without copying them.
+
+        Args:
+            station (str): The station.
+            element (str): The element.
+            start: The first time to read, inclusive. Naive times are UTC. Defaults to the first observation.
+            end: The last time to read, inclusive. Naive times are UTC. Defaults to the last observation.
+            id: The id of the series, if the observations have ids.
+
+        Returns:
+            FlagSeries: Read-only views of the times and flags of the series in the time range.
+        """
+        times, flags = self._arrays((str(station), str(element), id_key(id)))
+        lo = 0 if start is None else np.searchsorted(times, _utc_ns(start), "left")
+        hi = (
+            len(times) if end is None else np.searchsorted(times, _utc_ns(end), "right")
+        )
+        return FlagSeries(times[lo:hi].view("datetime64[ns]"), flags[lo:hi])
+
+    def query(
+        self,
+        start=None,
+        end=None,
+        stations: str = "*",
+        elements: str = "*",
+        raised: Iterable[str] = (),
+        unable: Iterable[str] = (),
+        not_performed: Iterable[str] = (),
+    ) -> Iterator[Tuple[SeriesKey, FlagSeries]]:
+        """Find observations in a time range whose flags are in a given state, series by series.
+
+        For example, the soil sensors that failed the range check in a week are found with
+        `store.query("2024-06-01", "2024-06-07", elements="soil_*", raised=["qa_range"])`.
+
+        Args:
+            start: The first time to search, inclusive. Naive times are UTC.
+            end: The last time to search, inclusive. Naive times are UTC.
+            stations (str): A pattern the stations must match, like 'ace*'.
+            elements (str): A pattern the elements must match, like 'soil_*'.
+            raised (Iterable[str]): Checks whose flag was raised, as in `match_flags`.
+            unable (Iterable[str]): Checks that could not be performed.
+            not_performed (Iterable[str]): Checks that were not run. If no states are given, every
+            observation in the time range matches.
+
+        Yields:
+            Tuple[SeriesKey, FlagSeries]: The (station, element, id) of each series with matching
+            observations, and those observations.
+        """
+        states = [list(raised), list(unable), list(not_performed)]
+        for key in self.series():
+            station, element, id = key
+            if not (fnmatch(station, stations) and fnmatch(element, elements)):
+                continue
+            found = self.read(station, element, start, end, id)
+            if any(states):
+                found = found[match_flags(found.flags, *states)]
+            if len(found):
+                yield key, found
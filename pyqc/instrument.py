@@ -0,0 +1,155 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Stage:
+    """What happened in one stage of a QA/QC run.
+
+    Args:
+        name (str): The name of the stage, e.g. 'merge_elements_by_date' or 'check_range_pd'.
+        seconds (float): Wall time of the stage.
+        rows_in (int): The number of observations going into the stage.
+        rows_out (int): The number of observations coming out of the stage.
+        peak_memory_mb (float | None): The most memory allocated during the stage on top of what was allocated
+        when it started, if memory is traced.
+        stations (Dict[str, Dict[str, int]]): For each station, the rows in and out and the number of
+        observations each `qa_` flag of the stage was raised for.
+    """
+
+    name: str
+    seconds: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    peak_memory_mb: float | None = None
+    stations: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+@dataclass
+class Instrumentation:
+    """Collects the time, rows and memory of each stage of `check_observations`.
+
+    Pass one as `instrument` to `check_observations` or `merge_elements_by_date`. When none is passed,
+    nothing is recorded.
+
+    Args:
+        memory (bool): If True, trace the peak memory of each stage with `tracemalloc`, which slows the
+        run down considerably.
+        by_station (bool): If True, break the rows and raised flags of each stage down by station.
+    """
+
+    memory: bool = False
+    by_station: bool = True
+    stages: List[Stage] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name: str, dat: pd.DataFrame) -> Iterator["_StageRecorder"]:
+        """Record a stage. Call `done` on the yielded object with the stage's output."""
+        recorder = _StageRecorder(self, Stage(name, rows_in=len(dat)), dat)
+
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield recorder
+        finally:
+            recorder.record.seconds = time.perf_counter() - start
+            if self.memory:
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+                recorder.record.peak_memory_mb = peak / 2**20
+            if tracing:
+                tracemalloc.stop()
+            self.stages.append(recorder.record)
+
+    def to_frame(self) -> pd.DataFrame:
+        """A row for each stage, without the station breakdowns."""
+        return pd.DataFrame(
+            [
+                {k: v for k, v in asdict(x).items() if k != "stations"}
+                for x in self.stages
+            ]
+        )
+
+    def to_dict(self) -> dict:
+        return {"stages": [asdict(x) for x in self.stages]}
+
+    def to_json(self, path: str | None = None, **kwargs) -> str:
+        """Export the stages as JSON, and write them to `path` if given.
+
+        Args:
+            path (str | None): A file to write the JSON to.
+            **kwargs: Passed to `json.dumps`, e.g. `indent`.
+
+        Returns:
+            str: The JSON.
+        """
+        out = json.dumps(self.to_dict(), **kwargs)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(out)
+        return out
+
+
+@dataclass
+class _StageRecorder:
+    instrument: Instrumentation
+    record: Stage
+    dat: pd.DataFrame
+
+    def done(self, out: pd.DataFrame, flags: Dict[str, np.ndarray] | None = None):
+        """Record the output of the stage.
+
+        Args:
+            out (pd.DataFrame): The observations coming out of the stage.
+            flags (Dict[str, np.ndarray] | None): Flags computed by the stage that aren't columns of `out`.
+            By default, `qa_` columns of `out` that weren't in the input are used.
+        """
+        self.record.rows_out = len(out)
+        if not self.instrument.by_station or "station" not in out.columns:
+            return
+
+        if flags is None:
+            flags = {
+                x: out[x].to_numpy()
+                for x in out.columns
+                if x.startswith("qa_") and x not in self.dat.columns
+            }
+
+        stations = self.record.stations
+        rows_in = self.dat["station"].value_counts(sort=False)
+        for station, n in rows_in[rows_in > 0].items():
+            stations[str(station)] = {"rows_in": int(n), "rows_out": 0}
+
+        raised = pd.DataFrame(
+            {"rows_out": np.ones(len(out), dtype=np.int64)}
+            | {k: np.asarray(v) == 1 for k, v in flags.items()}
+        )
+        counts = raised.groupby(out["station"].astype(str).to_numpy()).sum()
+        for station, row in counts.iterrows():
+            stations.setdefault(station, {"rows_in": 0}).update(
+                {k: int(v) for k, v in row.items()}
+            )
+
+
+class _NoStage:
+    def done(self, out, flags=None):
+        pass
+
+
+def stage(instrument: Instrumentation | None, name: str, dat: pd.DataFrame):
+    """Record a stage in `instrument`, or do nothing if it is None."""
+    if instrument is None:
+        return nullcontext(_NoStage())
+    return instrument.stage(name, dat)
@@ -0,0 +1,214 @@
+import uuid
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .bits import BitEncoder
+from .columns import Columns
+
+ARROW_FORMATS = {"parquet": "parquet", "arrow": "ipc", "ipc": "ipc", "feather": "ipc"}
+
+
+def import_pyarrow():
+    """Import pyarrow, which reading and writing Parquet and Arrow files needs, with a hint to install
+    the `arrow` extra if it is missing.
+
+    Returns:
+        Tuple[ModuleType, ModuleType, ModuleType]: `pyarrow`, `pyarrow.dataset` and `pyarrow.parquet`.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Reading and writing Parquet or Arrow files requires pyarrow. "
+            "Install it with `pip install pyqc[arrow]`."
+        ) from e
+    return pa, ds, pq
+
+
+def _arrow_format(format: str) -> str:
+    if format not in ARROW_FORMATS:
+        raise ValueError(
+            f"Unknown format '{format}'. Must be one of {list(ARROW_FORMATS)}."
+        )
+    return ARROW_FORMATS[format]
+
+
+def _read_table(source: str, format: str, filters=None):
+    _, ds, pq = import_pyarrow()
+    dataset = ds.dataset(source, format=_arrow_format(format), partitioning="hive")
+    if isinstance(filters, list):
+        filters = pq.filters_to_expression(filters)
+
+    partitions = dataset.partitioning.schema.names if dataset.partitioning else []
+    return dataset.to_table(filter=filters), partitions
+
+
+def read_observations(
+    source: str,
+    columns: Columns = None,
+    tz: str | None = None,
+    filters=None,
+    format: str = "parquet",
+    unpack: bool = True,
+) -> pd.DataFrame:
+    """Read long-formatted observations from a Parquet or Arrow file or a partitioned directory of them.
+
+    Args:
+        source (str): Path to a file or a directory, such as one written by `write_observations`.
+        columns (Columns): A Class mapping the column names of the observations.
+        tz (str | None): Time zone of the observations. Naive datetimes are localized to it and
+        time zone aware datetimes are converted to it. If None, aware datetimes are left as they are.
+        filters: Rows to read, as a pyarrow expression or a list of tuples like
+        `[("station", "==", "aceabsar")]`. Filters on partition columns skip whole files.
+        format (str): One of 'parquet', 'arrow', 'ipc' or 'feather'.
+        unpack (bool): If True and the observations were written with packed flags, unpack them into
+        a column for each check that was performed.
+
+    Returns:
+        pd.DataFrame: Observations with categorical `station` and `element` columns and a time zone
+        aware datetime column.
+    """
+    columns = columns or Columns()
+    table, partitions = _read_table(source, format, filters)
+
+    # The date partition is only used to split up the files.
+    if "date" in partitions:
+        table = table.drop_columns(["date"])
+
+    dat = table.to_pandas()
+
+    for col in ["station", columns.elem_col]:
+        if col in dat.columns:
+            dat[col] = dat[col].astype("category")
+
+    times = pd.to_datetime(dat[columns.dt_col])
+    if tz is not None:
+        times = (
+            times.dt.tz_convert(tz)
+            if times.dt.tz is not None
+            else times.dt.tz_localize(tz)
+        )
+    dat[columns.dt_col] = times
+
+    if unpack and "qa_flag" in dat.columns:
+        flags = BitEncoder.decode_array(dat.pop("qa_flag"))
+        # Drop the checks that weren't performed for any observation.
+        dat = pd.concat([dat, flags.loc[:, flags.notna().any()]], axis=1)
+
+    return dat
+
+
+def read_elements(
+    source: str, columns: Columns = None, format: str = "parquet"
+) -> pd.DataFrame:
+    """Read an elements table from a Parquet or Arrow file.
+
+    Args:
+        source (str): Path to a file or a directory of files.
+        columns (Columns): A Class mapping the column names of the elements table.
+        format (str): One of 'parquet', 'arrow', 'ipc' or 'feather'.
+
+    Returns:
+        pd.DataFrame: The elements table, with naive UTC deployment dates as expected by
+        `merge_elements_by_date` and list columns, like `outage_ranges`, as Python lists.
+    """
+    pa, _, _ = import_pyarrow()
+
+    columns = columns or Columns()
+    table = _read_table(source, format)[0]
+    dat = table.to_pandas()
+
+    # Lists, like outage ranges, would otherwise come back as numpy arrays.
+    for field in table.schema:
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+            dat[field.name] = pd.Series(
+                table.column(field.name).to_pylist(), index=dat.index, dtype=object
+            )
+
+    for col in [columns.start_col, columns.end_col]:
+        dates = pd.to_datetime(dat[col])
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+        dat[col] = dates
+
+    return dat
+
+
+def _narrow_int(x: pd.Series) -> pd.Series:
+    """Cast a flag column to the smallest integer type that holds all of its values."""
+    if x.isna().all():
+        return x.astype("Int8")
+
+    for dtype in [np.int8, np.int16, np.int32]:
+        info = np.iinfo(dtype)
+        if x.min() >= info.min and x.max() <= info.max:
+            break
+    else:
+        dtype = np.int64
+
+    if x.isna().any():
+        return x.astype(pd.api.types.pandas_dtype(dtype.__name__.capitalize()))
+    return x.astype(dtype)
+
+
+def write_observations(
+    dat: pd.DataFrame,
+    root: str,
+    columns: Columns = None,
+    packed: bool = False,
+    partition_cols: List[str] = None,
+    date_format: str = "%Y-%m-%d",
+    format: str = "parquet",
+) -> None:
+    """Write checked observations to a partitioned Parquet or Arrow dataset.
+
+    `station` and `element` are dictionary encoded and `qa_` columns are stored in the narrowest integer
+    type that holds them, or packed into a single uint32 `qa_flag` column. Calling this repeatedly with the
+    same `root` adds new files, so it can be used as the sink of `check_observations_chunked`.
+
+    Args:
+        dat (pd.DataFrame): Checked observations, as returned by `check_observations`.
+        root (str): Directory to write the dataset to.
+        columns (Columns): A Class mapping the column names of the observations.
+        packed (bool): If True, pack the checks known to `BitEncoder` into a `qa_flag` column.
+        partition_cols (List[str]): Columns to split the files by. `date` is the local date of the
+        observations formatted with `date_format`. Defaults to `["station", "date"]`.
+        date_format (str): strftime format of the `date` partition, e.g. '%Y-%m' to write a file per month.
+        format (str): One of 'parquet', 'arrow', 'ipc' or 'feather'.
+    """
+    pa, ds, _ = import_pyarrow()
+
+    columns = columns or Columns()
+    partition_cols = ["station", "date"] if partition_cols is None else partition_cols
+    dat = dat.copy()
+    if "date" in partition_cols:
+        dat["date"] = dat[columns.dt_col].dt.strftime(date_format)
+
+    qa_cols = [x for x in dat.columns if x.startswith("qa_")]
+    if packed:
+        encoded = [x.name for x, _ in BitEncoder()._layout()]
+        flag = BitEncoder.encode_frame(dat)
+        dat = dat.drop(columns=[x for x in qa_cols if x in encoded])
+        dat["qa_flag"] = flag
+        qa_cols = [x for x in qa_cols if x not in encoded]
+
+    for col in qa_cols:
+        dat[col] = _narrow_int(dat[col])
+
+    for col in ["station", columns.elem_col]:
+        if col in dat.columns and col not in partition_cols:
+            dat[col] = dat[col].astype("category")
+
+    ds.write_dataset(
+        pa.Table.from_pandas(dat, preserve_index=False),
+        root,
+        format=_arrow_format(format),
+        partitioning=partition_cols,
+        partitioning_flavor="hive",
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.{format}",
+        existing_data_behavior="overwrite_or_ignore",
+    )
@@ -0,0 +1,243 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .columns import Columns
+from .elements import deployment_column, has_deployment_column
+from .plan import CHECKS, CheckResult, series_codes
+from .times import TimeIndex
+
+
+@dataclass
+class StationMatrix:
+    """The observations of one station laid out as a dense (time x series) matrix.
+
+    Each series is an element, or an element and id, of the station. Matrix rows are the station's unique
+    times in ascending order, so a series' previous observation is above it and a day is a block of rows.
+    Observations with a missing time share a last row.
+
+    Args:
+        rows (np.ndarray): The positions of the station's observations in the frame.
+        t (np.ndarray): The matrix row of each of the station's observations.
+        c (np.ndarray): The matrix column of each of the station's observations.
+        shape (Tuple[int, int]): The number of times and series.
+        days (np.ndarray): The local day code of each matrix row, as in `TimeIndex.day_codes`.
+        unique (bool): Whether every observation has its own cell. If a series has two observations at the
+        same time, the checks fall back to the long format.
+    """
+
+    rows: np.ndarray
+    t: np.ndarray
+    c: np.ndarray
+    shape: Tuple[int, int]
+    days: np.ndarray
+    unique: bool = True
+
+    def scatter(self, x: np.ndarray, fill=np.nan) -> np.ndarray:
+        """Lay out a value of each of the station's observations as a matrix, `fill` where there is none."""
+        out = np.full(self.shape, fill, dtype=np.result_type(x.dtype, type(fill)))
+        out[self.t, self.c] = x
+        return out
+
+    def threshold(self, x: np.ndarray) -> np.ndarray:
+        """A per-series (1 x series) vector of a threshold, or a full matrix if it changes within a series,
+        e.g. when a sensor was swapped."""
+        x = x.astype(float)
+        first = np.full(self.shape[1], np.nan)
+        first[self.c[::-1]] = x[::-1]
+        if np.array_equal(first[self.c], x, equal_nan=True):
+            return first[None, :]
+        return self.scatter(x)
+
+    def gather(self, m: np.ndarray) -> np.ndarray:
+        """The values of a matrix at the station's observations."""
+        return np.broadcast_to(m, self.shape)[self.t, self.c]
+
+
+def station_matrices(
+    dat: pd.DataFrame, columns: Columns, time_index: TimeIndex | None = None
+) -> List[StationMatrix]:
+    """Lay out the observations of each station as a `StationMatrix`.
+
+    Each station only has rows for the times it observed and columns for its own series, so stations with
+    different times or elements don't pad each other's matrices. The layout only depends on the rows of
+    `dat`, so it is kept with the `TimeIndex` of the frame and built once for all checks that share it.
+
+    The shared sensor check has no matrix implementation. It already pivots each station once to a
+    (time x element) matrix of failures, so the matrix backend computes it with pandas.
+    """
+    time_index = TimeIndex.of(dat, columns, time_index)
+    if "matrices" in time_index.cache:
+        return time_index.cache["matrices"]
+
+    series = series_codes(dat, columns)
+    if "station" in dat.columns:
+        stations = dat.groupby(
+            "station", sort=False, dropna=False, observed=True
+        ).indices.values()
+    else:
+        stations = [np.arange(len(dat))]
+
+    # Missing times get the code after the last time, so they sort into the last row.
+    n_times = len(time_index.times)
+    codes = np.where(time_index.codes >= 0, time_index.codes, n_times)
+    out = []
+    for rows in stations:
+        present = np.zeros(n_times + 1, dtype=bool)
+        present[codes[rows]] = True
+        present[n_times] = True
+        t = (np.cumsum(present) - 1)[codes[rows]]
+        times = np.flatnonzero(present[:n_times])
+        c, uniques = pd.factorize(series[rows])
+        shape = (len(times) + 1, len(uniques))
+        days = np.append(time_index.day_codes[times], -1)
+        counts = np.bincount(t * shape[1] + c, minlength=shape[0] * shape[1])
+        unique = not len(counts) or counts.max() <= 1
+        out.append(StationMatrix(rows, t, c, shape, days, unique))
+
+    time_index.cache["matrices"] = out
+    return out
+
+
+def _pandas(name: str):
+    return next(x.compute for x in CHECKS.values() if x.name == name)
+
+
+def _values(dat, columns, name, deployments) -> np.ndarray:
+    return deployment_column(dat, columns, name, deployments).astype(float)
+
+
+def matrix_range(
+    dat: pd.DataFrame,
+    columns: Columns,
+    flags,
+    time_index=None,
+    deployments=None,
+    **kwargs,
+) -> CheckResult:
+    matrices = station_matrices(dat, columns, time_index)
+    if not all(m.unique for m in matrices):
+        return _pandas("range")(
+            dat,
+            columns,
+            flags,
+            time_index=time_index,
+            deployments=deployments,
+            **kwargs,
+        )
+
+    has_flags = has_deployment_column(
+        dat, columns.flag_min_col, deployments
+    ) and has_deployment_column(dat, columns.flag_max_col, deployments)
+    bounds = [columns.min_col, columns.max_col]
+    if has_flags:
+        bounds += [columns.flag_min_col, columns.flag_max_col]
+
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    bounds = [_values(dat, columns, x, deployments) for x in bounds]
+    qa_range = np.empty(len(dat), dtype=np.int8)
+    for m in matrices:
+        v = m.scatter(values[m.rows])
+        low, high, *flag = [m.threshold(x[m.rows]) for x in bounds]
+        in_range = (v >= low) & (v <= high)
+        if has_flags:
+            in_range &= np.isnan(flag[0]) | ((v >= flag[0]) & (v <= flag[1]))
+        qa_range[m.rows] = m.gather(np.where(np.isnan(low), -1, ~in_range))
+    return CheckResult({"qa_range": qa_range})
+
+
+def matrix_step(
+    dat: pd.DataFrame,
+    columns: Columns,
+    flags,
+    filter_first: bool = True,
+    time_index=None,
+    deployments=None,
+    **kwargs,
+) -> CheckResult:
+    matrices = station_matrices(dat, columns, time_index)
+    if not all(m.unique for m in matrices):
+        return _pandas("step")(
+            dat,
+            columns,
+            flags,
+            filter_first=filter_first,
+            deployments=deployments,
+            **kwargs,
+        )
+
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    diff = np.empty(len(dat))
+    for m in matrices:
+        v = m.scatter(values[m.rows])
+        # The previous observation of each series is the last row above with an observation.
+        present = m.scatter(np.ones(len(m.rows), dtype=bool), False)
+        last = np.where(present, np.arange(m.shape[0])[:, None], -1)
+        last = np.maximum.accumulate(last, axis=0)
+        prev = np.vstack([np.full((1, m.shape[1]), -1), last[:-1]])
+        prev_v = np.where(
+            prev >= 0, np.take_along_axis(v, np.maximum(prev, 0), axis=0), np.nan
+        )
+        diff[m.rows] = m.gather(np.abs(v - prev_v))
+
+    if np.isnan(diff).all():
+        return CheckResult({"qa_step": np.full(len(dat), -1, dtype=np.int8)})
+
+    step = _values(dat, columns, columns.step_col, deployments)
+    qa_step = np.where(diff < step, 0, 1)
+    qa_step = np.where(np.isnan(diff) | np.isnan(step), -1, qa_step).astype(np.int8)
+    keep = ~np.isnan(diff) if filter_first else None
+    return CheckResult({"qa_step": qa_step}, keep)
+
+
+def matrix_variance(
+    dat: pd.DataFrame,
+    columns: Columns,
+    flags,
+    variance_df=None,
+    daily_stats=None,
+    time_index=None,
+    deployments=None,
+    **kwargs,
+) -> CheckResult:
+    matrices = station_matrices(dat, columns, time_index)
+    if (
+        variance_df is not None
+        or daily_stats is not None
+        or not all(m.unique for m in matrices)
+    ):
+        return _pandas("variance")(
+            dat,
+            columns,
+            flags,
+            variance_df=variance_df,
+            daily_stats=daily_stats,
+            time_index=time_index,
+            deployments=deployments,
+            **kwargs,
+        )
+
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    sd = np.empty(len(dat))
+    for m in matrices:
+        v = m.scatter(values[m.rows])
+        has = ~np.isnan(v)
+        # Rows are in time order, so each day is a contiguous block of rows.
+        new_day = np.r_[True, m.days[1:] != m.days[:-1]]
+        starts = np.flatnonzero(new_day)
+        block = np.cumsum(new_day) - 1
+
+        n = np.add.reduceat(has.astype(np.int64), starts, axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.add.reduceat(np.where(has, v, 0.0), starts, axis=0) / n
+            dev = np.where(has, v - mean[block], 0.0)
+            m2 = np.add.reduceat(dev**2, starts, axis=0)
+            day_sd = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+        sd[m.rows] = day_sd[block[m.t], m.c]
+
+    delta = _values(dat, columns, columns.delta_col, deployments)
+    qa_delta = (~(sd >= delta)).astype(np.int8)
+    qa_delta[np.isnan(delta)] = -1
+    return CheckResult({"qa_delta": qa_delta})
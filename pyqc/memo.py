@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Memo:
+    """A thread-safe memo of the most recently used values, for things that are slow to build and are
+    asked for again and again, like compiled elements tables and neighbor indexes.
+    """
+
+    _values: "OrderedDict[Hashable, object]" = field(
+        init=False, repr=False, default_factory=OrderedDict
+    )
+    _lock: threading.Lock = field(
+        init=False, repr=False, default_factory=threading.Lock
+    )
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: Hashable, build: Callable[[], T], size: int) -> T:
+        """The value memoized under `key`, built with `build` if there isn't one.
+
+        The value is built without holding the lock, so other threads aren't held up by a slow build.
+
+        Args:
+            key (Hashable): What the value is memoized under, e.g. a hash of what it is built from.
+            build (Callable[[], T]): Builds the value.
+            size (int): How many of the most recently used values to keep.
+
+        Returns:
+            T: The value.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+
+        value = build()
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > size:
+                self._values.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Forget every value."""
+        with self._lock:
+            self._values.clear()
@@ -0,0 +1,132 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from .columns import Columns
+from .elements import CompiledElements, compile_elements
+from .plan import split_network_checks
+from .process import _keep_patterns, check_observations
+
+
+class StationCheckError(RuntimeError):
+    """Raised when the QA/QC checks failed for one or more stations.
+
+    Attributes:
+        errors (Dict[str, BaseException]): The exception raised for each station that failed.
+        result (pd.DataFrame): The checked observations of every station that succeeded.
+    """
+
+    def __init__(self, errors: Dict[str, BaseException], result: pd.DataFrame):
+        self.errors = errors
+        self.result = result
+        failed = ", ".join(f"{k} ({type(v).__name__}: {v})" for k, v in errors.items())
+        super().__init__(f"QA/QC checks failed for {len(errors)} station(s): {failed}")
+
+
+def _check_stations(
+    stations: List[Tuple[str, pd.DataFrame]],
+    elements: CompiledElements,
+    columns: Columns,
+    checks: Tuple[Callable, ...],
+    keep_columns: List[str],
+    kwargs: dict,
+) -> List[Tuple[str, pd.DataFrame | BaseException]]:
+    out = []
+    for station, dat in stations:
+        try:
+            keep = None if keep_columns is None else list(keep_columns)
+            result = check_observations(
+                dat, elements, columns, *checks, keep_columns=keep, **kwargs
+            )
+        except Exception as e:
+            result = e
+        out.append((station, result))
+    return out
+
+
+def check_observations_parallel(
+    dat: pd.DataFrame,
+    elements: pd.DataFrame | CompiledElements,
+    columns: Columns,
+    *checks: Callable,
+    keep_columns: List[str] = None,
+    max_workers: int | None = None,
+    stations_per_task: int = 1,
+    **kwargs,
+) -> pd.DataFrame:
+    """Run `check_observations` for each station in a pool of worker processes.
+
+    The observations are split by station, each station is checked separately against the whole
+    elements table, compiled once, and the results are concatenated in station order. Checks that compare
+    stations, like `check_spatial`, and the checks planned after them then run once on the checked
+    observations of every station. The result is the same as calling `check_observations` on all of the
+    observations.
+
+    Args:
+        dat (pd.DataFrame): A long-formatted dataframe of observations, as described in `check_observations`.
+        elements (pd.DataFrame | CompiledElements): A dataframe of elements for different QA/QC tests, or
+        the same compiled with `compile_elements`.
+        columns (Columns): A Class mapping the column names of `dat` and `elements`.
+        *checks (Callable): QA/QC functions from `check.py` that will be used to check the observations.
+        Checks must be importable module level functions so they can be sent to the workers.
+        keep_columns (List[str]): Columns to keep in the final DataFrame, as in `check_observations`.
+        max_workers (int | None): The number of worker processes. If None, one per CPU is used. If 1,
+        the stations are checked in the current process.
+        stations_per_task (int): How many stations to send to a worker at once. Larger values reduce
+        overhead when there are many small stations.
+        **kwargs: Values to be passed to the check functions.
+
+    Raises:
+        StationCheckError: If checking any station raised an error. The error has the exception raised
+        for each failed station and the checked observations of the other stations, which were only
+        compared with each other by checks that compare stations.
+
+    Returns:
+        pd.DataFrame: The checked observations of all stations.
+    """
+    # Elements aren't split by station, since how soil sensors are told apart depends on the whole table.
+    elements = compile_elements(elements, columns)
+    checks, network = split_network_checks(*checks)
+    keep = keep_columns
+    if network:
+        # The checks of the whole network read the observations again, so none of their columns are dropped.
+        keep = _keep_patterns(None if keep is None else list(keep))
+        keep += [f"^{re.escape(x)}$" for x in dat.columns]
+
+    stations = list(dat.groupby("station", observed=True))
+    tasks = [
+        stations[i : i + stations_per_task]
+        for i in range(0, len(stations), stations_per_task)
+    ]
+    args = (elements, columns, checks, keep, kwargs)
+
+    if max_workers == 1:
+        results = [_check_stations(task, *args) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_check_stations, task, *args) for task in tasks]
+            results = [x.result() for x in futures]
+
+    checked, errors = [], {}
+    for station, result in (x for task in results for x in task):
+        if isinstance(result, BaseException):
+            errors[station] = result
+        else:
+            checked.append(result)
+
+    out = pd.concat(checked, ignore_index=True) if checked else pd.DataFrame()
+    # Each station has its own categories, which the concat loses.
+    for col in ["station", columns.elem_col]:
+        if col in out.columns:
+            out[col] = out[col].astype("category")
+    if network and len(out):
+        keep = None if keep_columns is None else list(keep_columns)
+        out = check_observations(
+            out, elements, columns, *network, keep_columns=keep, **kwargs
+        )
+    if errors:
+        raise StationCheckError(errors, out)
+
+    return out
@@ -0,0 +1,133 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Awaitable, Callable, Dict, Iterable, List
+
+import pandas as pd
+
+from .columns import Columns
+from .elements import CompiledElements, compile_elements
+from .parallel import StationCheckError
+from .plan import network_checks
+from .process import check_observations
+
+# Marks the end of a queue.
+_DONE = object()
+
+
+async def check_observations_async(
+    stations: Iterable[str],
+    source: Callable[[str], Awaitable[pd.DataFrame]],
+    sink: Callable[[str, pd.DataFrame], Awaitable[None]],
+    elements: pd.DataFrame | CompiledElements,
+    columns: Columns,
+    *checks: Callable,
+    keep_columns: List[str] = None,
+    prefetch: int = 2,
+    workers: int = 1,
+    executor: Executor | None = None,
+    **kwargs,
+) -> None:
+    """Load, check and write the observations of one station after another, overlapping the I/O of some
+    stations with the checks of others.
+
+    Stations are loaded with `source` while earlier stations are being checked, and checked stations are
+    written with `sink` while later stations are being checked. The checks run in `executor`, so they
+    don't block the event loop. At most `prefetch` loaded stations wait to be checked and at most `prefetch`
+    checked stations wait to be written, so a slow sink holds back the source instead of filling memory.
+
+    Args:
+        stations (Iterable[str]): The stations to check, in the order they are loaded.
+        source (Callable[[str], Awaitable[pd.DataFrame]]): Loads the long-formatted observations of a
+        station, as described in `check_observations`.
+        sink (Callable[[str, pd.DataFrame], Awaitable[None]]): Writes the checked observations of a station.
+        elements (pd.DataFrame | CompiledElements): A dataframe of elements for different QA/QC tests. It is
+        compiled once for all stations.
+        columns (Columns): A Class mapping the column names of the observations and `elements`.
+        *checks (Callable): QA/QC functions from `check.py` that will be used to check the observations.
+        keep_columns (List[str]): Columns to keep in the checked DataFrames, as in `check_observations`.
+        prefetch (int): How many stations can wait between loading and checking, and between checking and
+        writing.
+        workers (int): How many stations are checked at once.
+        executor (Executor | None): Where the checks run. If None, the event loop's default thread pool is
+        used. A `ProcessPoolExecutor` avoids the GIL, but the checks must then be importable module level
+        functions.
+        **kwargs: Values to be passed to the check functions.
+
+    Raises:
+        ValueError: If any of the checks compares stations, like `check_spatial`. Each station is checked
+        and written on its own, so such checks would never see the other stations.
+        StationCheckError: If loading, checking or writing any station raised an error, once all other
+        stations are done. The error has the exception raised for each failed station. Its `result` is
+        empty, as the checked observations were passed to `sink`.
+    """
+    network = [x.__name__ for x in network_checks(*checks)]
+    if network:
+        raise ValueError(
+            f"{network} compare stations with each other, so they can't be run on one station at a time!"
+        )
+
+    loop = asyncio.get_running_loop()
+    elements = compile_elements(elements, columns)
+    loaded = asyncio.Queue(maxsize=prefetch)
+    checked = asyncio.Queue(maxsize=prefetch)
+    errors: Dict[str, BaseException] = {}
+
+    async def load():
+        for station in stations:
+            try:
+                dat = await source(station)
+            except Exception as e:
+                errors[station] = e
+                continue
+            await loaded.put((station, dat))
+        for _ in range(workers):
+            await loaded.put(_DONE)
+
+    async def check():
+        while (item := await loaded.get()) is not _DONE:
+            station, dat = item
+            keep = None if keep_columns is None else list(keep_columns)
+            func = partial(
+                check_observations,
+                dat,
+                elements,
+                columns,
+                *checks,
+                keep_columns=keep,
+                **kwargs,
+            )
+            try:
+                result = await loop.run_in_executor(executor, func)
+            except Exception as e:
+                errors[station] = e
+                continue
+            await checked.put((station, result))
+        await checked.put(_DONE)
+
+    async def write():
+        running = workers
+        while running:
+            item = await checked.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            station, result = item
+            try:
+                await sink(station, result)
+            except Exception as e:
+                errors[station] = e
+
+    tasks = [
+        asyncio.ensure_future(x)
+        for x in [load(), write(), *(check() for _ in range(workers))]
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Don't leave the other stages waiting on their queues if one of them failed.
+        for task in tasks:
+            task.cancel()
+
+    if errors:
+        raise StationCheckError(errors, pd.DataFrame())
@@ -0,0 +1,284 @@
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .columns import Columns
+from .elements import Deployments, has_deployment_column
+from .instrument import Instrumentation, stage
+from .times import TimeIndex
+
+
+@dataclass
+class CheckResult:
+    """The flags computed by a check.
+
+    Args:
+        flags (Dict[str, np.ndarray]): An array of flag values for each `qa_` column the check produces,
+        aligned with the rows of the frame the check was given.
+        keep (np.ndarray | None): A boolean mask of the rows to keep, if the check drops rows.
+    """
+
+    flags: Dict[str, np.ndarray]
+    keep: np.ndarray | None = None
+
+
+@dataclass(frozen=True)
+class Check:
+    """Declares what a QA/QC check reads and writes, so checks can be planned and run together.
+
+    Args:
+        name (str): A short name for the check.
+        func (Callable): The DataFrame check function, e.g. `check_range_pd`, that the declaration is for.
+        compute (Callable[..., CheckResult]): Computes the check's flags. Called with the frame of
+        observations sorted by `sort_keys`, the `Columns`, the flags computed so far (Dict[str, np.ndarray]),
+        the factorized times of the frame as `time_index` (a `TimeIndex`), the `Deployments` the
+        observations were matched to as `deployments` (None if their elements columns are in the frame, see
+        `deployment_column`) and any keyword arguments passed to `check_observations`. It must not modify the frame.
+        inputs (Tuple[str, ...]): Columns the check reads. Attribute names of `Columns`, like 'compare_col',
+        are looked up in the `Columns` in use. Patterns like 'qa_*' name flags of other checks, which are
+        computed first.
+        outputs (Tuple[str, ...]): The `qa_` columns the check produces.
+        network (bool): Whether the check compares each station with other stations, so it needs the
+        observations of the whole network at once and can't be run one station at a time.
+    """
+
+    name: str
+    func: Callable
+    compute: Callable[..., CheckResult] = field(repr=False)
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    network: bool = False
+
+    def depends_on(self, other: "Check") -> bool:
+        """Whether the check reads any of the flags `other` produces."""
+        return any(fnmatch(out, x) for x in self.inputs for out in other.outputs)
+
+    def columns(self, columns: Columns) -> List[str]:
+        """The names of the input columns that must be in the observations."""
+        return [getattr(columns, x, x) for x in self.inputs if "*" not in x]
+
+
+CHECKS: Dict[Callable, Check] = {}
+
+
+def sort_keys(dat: pd.DataFrame, columns: Columns) -> List[str]:
+    """The columns observations are sorted by: station, element, id and datetime, if they are present."""
+    return [x for x in ["station", columns.elem_col, "id", columns.dt_col] if x in dat]
+
+
+def series_codes(dat: pd.DataFrame, columns: Columns) -> np.ndarray:
+    """An integer code of the station, element and id series of each observation.
+
+    The codes are numbered in order of appearance. Missing keys are a value of their own.
+    """
+    # Combine the codes of the keys into one integer per series, which is much cheaper than grouping.
+    code = np.zeros(len(dat), dtype=np.int64)
+    for key in [x for x in ["station", columns.elem_col, "id"] if x in dat.columns]:
+        codes, uniques = pd.factorize(dat[key], use_na_sentinel=False)
+        code = pd.factorize(code * len(uniques) + codes)[0]
+    return code
+
+
+def canonical_order(
+    dat: pd.DataFrame, columns: Columns, time_index: TimeIndex | None = None
+) -> np.ndarray | None:
+    """The order that sorts observations by `sort_keys`, so each series is a block of rows in time order.
+
+    Missing keys sort last and ties keep their order.
+
+    Args:
+        dat (pd.DataFrame): Observations.
+        columns (Columns): A Class mapping the column names of `dat`.
+        time_index (TimeIndex | None): The factorized times of `dat`, if they have been built already.
+
+    Returns:
+        np.ndarray | None: The positions of the rows in sorted order, or None if they are sorted already.
+    """
+    time_index = TimeIndex.of(dat, columns, time_index)
+    codes = []
+    for key in sort_keys(dat, columns):
+        if key == columns.dt_col:
+            code, n = time_index.codes, len(time_index.times)
+        elif isinstance(dat[key].dtype, pd.CategoricalDtype):
+            code, n = dat[key].cat.codes.to_numpy(), len(dat[key].cat.categories)
+        else:
+            code, uniques = pd.factorize(dat[key], sort=True)
+            n = len(uniques)
+        codes.append((np.where(code < 0, n, code).astype(np.int64), n + 1))
+
+    # Combine the codes into one integer if it can't overflow, which sorts much faster.
+    if np.prod([float(n) for _, n in codes]) < 2**62:
+        key = np.zeros(len(dat), dtype=np.int64)
+        for code, n in codes:
+            key = key * n + code
+        if np.all(key[1:] >= key[:-1]):
+            return None
+        return np.argsort(key, kind="stable")
+
+    order = np.lexsort([code for code, _ in codes[::-1]])
+    return None if np.all(order[1:] > order[:-1]) else order
+
+
+def network_checks(*funcs: Callable) -> List[Callable]:
+    """The check functions that compare stations with each other, like `check_spatial`."""
+    return [x for x in funcs if x in CHECKS and CHECKS[x].network]
+
+
+def split_network_checks(
+    *funcs: Callable,
+) -> Tuple[Tuple[Callable, ...], Tuple[Callable, ...]]:
+    """Split check functions into those that can run on each station's observations on their own, and
+    those that then have to run once on the observations of every station.
+
+    The second group starts at the first check that compares stations, in the order the checks are planned,
+    so running the groups one after the other gives the same flags as running all of them together.
+
+    Args:
+        *funcs (Callable): Check functions, like `check_range_pd`.
+
+    Returns:
+        Tuple[Tuple[Callable, ...], Tuple[Callable, ...]]: The checks of each station, and the checks of the
+        whole network. If any check isn't registered, so they can't be planned, and one of them compares
+        stations, every check is a check of the whole network.
+    """
+    if not network_checks(*funcs):
+        return funcs, ()
+
+    plan = CheckPlan.build(*funcs)
+    if plan is None:
+        return (), funcs
+    first = next(i for i, x in enumerate(plan.checks) if x.network)
+    return (
+        tuple(x.func for x in plan.checks[:first]),
+        tuple(x.func for x in plan.checks[first:]),
+    )
+
+
+def register_check(check: Check) -> Check:
+    """Register a check's declaration so `check_observations` can include it in a `CheckPlan`.
+
+    Args:
+        check (Check): The declaration. It replaces any earlier declaration of the same function.
+
+    Returns:
+        Check: The registered declaration.
+    """
+    CHECKS[check.func] = check
+    return check
+
+
+@dataclass
+class CheckPlan:
+    """An order to run checks in, so that they share one sorted frame of observations.
+
+    Each check computes its flags as arrays, and the frame is only copied to sort it, to drop rows a
+    check filters out, and to add the flags once all checks are done.
+
+    Args:
+        checks (List[Check]): The checks in the order they are run.
+    """
+
+    checks: List[Check]
+
+    @classmethod
+    def build(cls, *funcs: Callable) -> "CheckPlan | None":
+        """Plan the check functions in the order given, except that checks run after the checks whose
+        flags they read.
+
+        Args:
+            *funcs (Callable): Check functions, like `check_range_pd`.
+
+        Raises:
+            ValueError: If the checks read each other's flags in a cycle.
+
+        Returns:
+            CheckPlan | None: The plan, or None if any of the functions isn't registered.
+        """
+        if not all(x in CHECKS for x in funcs):
+            return None
+
+        remaining = [CHECKS[x] for x in dict.fromkeys(funcs)]
+        ordered = []
+        while remaining:
+            for check in remaining:
+                if not any(check.depends_on(x) for x in remaining if x is not check):
+                    break
+            else:
+                raise ValueError(
+                    f"Checks {[x.name for x in remaining]} depend on each other's flags!"
+                )
+            ordered.append(check)
+            remaining.remove(check)
+
+        return cls(ordered)
+
+    def run(
+        self,
+        dat: pd.DataFrame,
+        columns: Columns,
+        instrument: Instrumentation | None = None,
+        backend: str = "pandas",
+        deployments: Deployments | None = None,
+        **kwargs,
+    ) -> pd.DataFrame:
+        """Run the checks on observations that have been merged with their elements.
+
+        Args:
+            dat (pd.DataFrame): Observations merged with `merge_elements_by_date`, or matched to `deployments`
+            with `merge_deployments`. They are sorted by `sort_keys` first, unless they are already.
+            columns (Columns): A Class mapping the column names of `dat`.
+            instrument (Instrumentation | None): Records the time, rows and raised flags of each check.
+            backend (str): The engine that computes the checks, e.g. 'matrix'. Checks the backend doesn't
+            implement are computed with pandas.
+            deployments (Deployments | None): The deployments `dat` was matched to, which the checks look
+            their thresholds up in.
+            **kwargs: Values to be passed to the checks, like `variance_df` and `filter_first`.
+
+        Raises:
+            KeyError: If a column that a check needs is missing.
+
+        Returns:
+            pd.DataFrame: The observations, sorted by `sort_keys`, with a `qa_` column for each flag.
+        """
+        # Backends register themselves against the checks, so they are imported late.
+        from .backend import get_backend
+
+        backend = get_backend(backend)
+        for check in self.checks:
+            missing = [
+                x
+                for x in check.columns(columns)
+                if not has_deployment_column(dat, x, deployments)
+            ]
+            if missing:
+                raise KeyError(f"Check '{check.name}' needs missing columns {missing}.")
+
+        # Every check shares the times, factorized once, and the checks assign their flags by position to
+        # observations in the order of `canonical_order`.
+        time_index = TimeIndex.build(dat, columns)
+        order = canonical_order(dat, columns, time_index)
+        if order is not None:
+            dat = dat.take(order).reset_index(drop=True)
+            time_index = time_index.take(order)
+        flags: Dict[str, np.ndarray] = {}
+        for check in self.checks:
+            with stage(instrument, check.func.__name__, dat) as record:
+                result = backend.compute(check)(
+                    dat,
+                    columns,
+                    flags,
+                    time_index=time_index,
+                    deployments=deployments,
+                    **kwargs,
+                )
+                flags.update(result.flags)
+                if result.keep is not None and not result.keep.all():
+                    dat = dat[result.keep].reset_index(drop=True)
+                    flags = {k: v[result.keep] for k, v in flags.items()}
+                    time_index = time_index.take(result.keep)
+                record.done(dat, {k: flags[k] for k in result.flags})
+
+        return dat.assign(**flags)
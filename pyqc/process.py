@@ -1,79 +1,100 @@
-from typing import Callable, List
+import re
+from typing import Callable, List, Tuple
 
+import numpy as np
 import pandas as pd
 
 from .columns import Columns
+from .elements import CompiledElements, DeploymentIndex, Deployments, compile_elements
+from .instrument import Instrumentation, stage
+from .plan import CheckPlan, canonical_order
 
 
 def merge_elements_by_date(
-    dat: pd.DataFrame, elements: pd.DataFrame, columns: Columns
+    dat: pd.DataFrame,
+    elements: pd.DataFrame | CompiledElements,
+    columns: Columns,
+    instrument: Instrumentation | None = None,
 ) -> pd.DataFrame:
     """Make sure elements are aligned with proper observation dates.
     Args:
         dat (pd.DataFrame): DataFrame of all observations that will be QA/QC'd
-        elements (pd.DataFrame): DataFrame of all sensor deployments at a given station.
+        elements (pd.DataFrame | CompiledElements): DataFrame of all sensor deployments at a given station,
+        or the same compiled with `compile_elements`.
         columns (Columns): An instance of the `Columns` class.
+        instrument (Instrumentation | None): Records the time and rows of the merge.
     Returns:
-        pd.DataFrame: A filtered version of `elements` where each element is filtered to match
-        the date of the observations.
+        pd.DataFrame: The observations joined with the deployment of each element that was active
+        when the observation was made. If deployments overlap, the one that ends last is used. The
+        observations are sorted by station, element, id and datetime, which the checks rely on.
     """
-    obs_dt = dat["datetime"].dt.tz
+    dat, deployments = merge_deployments(dat, elements, columns, instrument)
+    return deployments.attach(dat, columns).drop(columns=columns.deployment_col)
 
-    elements[columns.start_col] = (
-        pd.to_datetime(elements[columns.start_col])
-        .dt.tz_localize("UTC")
-        .dt.tz_convert(obs_dt)
-    )
-    elements[columns.end_col] = (
-        pd.to_datetime(elements[columns.end_col])
-        .dt.tz_localize("UTC")
-        .dt.tz_convert(obs_dt)
-    )
 
-    elements = elements.assign(
-        date_end=elements[columns.end_col].fillna(
-            pd.Timestamp.now(dat["datetime"].dt.tz)
-        )
-    )
+def merge_deployments(
+    dat: pd.DataFrame,
+    elements: pd.DataFrame | CompiledElements,
+    columns: Columns,
+    instrument: Instrumentation | None = None,
+) -> Tuple[pd.DataFrame, Deployments]:
+    """Match observations to their deployments like `merge_elements_by_date`, without copying the
+    elements columns onto every observation.
 
-    elements = elements.assign(
-        date_end=elements["date_end"] + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-    )
+    Args:
+        dat (pd.DataFrame): DataFrame of all observations that will be QA/QC'd
+        elements (pd.DataFrame | CompiledElements): DataFrame of all sensor deployments at a given station,
+        or the same compiled with `compile_elements`.
+        columns (Columns): An instance of the `Columns` class.
+        instrument (Instrumentation | None): Records the time and rows of the merge, as the
+        'merge_elements_by_date' stage.
 
-    dat = dat.drop_duplicates()
+    Returns:
+        Tuple[pd.DataFrame, Deployments]: The observations, sorted by station, element, id and datetime,
+        with the position of each one's deployment in the `Deployments` table in `columns.deployment_col`.
+    """
+    with stage(instrument, "merge_elements_by_date", dat) as record:
+        dat, deployments = _merge_deployments(dat, elements, columns)
+        record.done(dat)
+    return dat, deployments
+
+
+def _merge_deployments(
+    dat: pd.DataFrame, elements: pd.DataFrame | CompiledElements, columns: Columns
+) -> Tuple[pd.DataFrame, Deployments]:
+    compiled = compile_elements(elements, columns)
+    elements = compiled.localize(dat["datetime"].dt.tz)
+
+    dat = dat.drop_duplicates(ignore_index=True)
+    dat = dat.astype({"station": "category", "element": "category"})
     pre_shp = dat.shape
 
     if "id" in dat.columns:
-        elements.loc[~elements["element"].str.contains("soil"), "sdi12_address"] = None
-        soil_counts = elements[elements["element"].str.contains("soil")][
-            "element"
-        ].value_counts()
-        single_occurrence = soil_counts[soil_counts == 1].index
-        elements.loc[elements["element"].isin(single_occurrence), "sdi12_address"] = (
-            None
-        )
-        dat = dat.merge(
-            elements,
-            left_on=["station", "element", "id"],
-            right_on=["station", "element", "sdi12_address"],
-        )
+        elements = elements.assign(sdi12_address=compiled.sdi12_address)
+        dat_keys = ["station", "element", "id"]
+        elem_keys = ["station", "element", "sdi12_address"]
     else:
-        dat = dat.merge(elements, on=["element", "station"], how="left")
-    no_element = dat[~dat["datetime"].between(dat["date_start"], dat["date_end"])]
-    dat = dat[dat["datetime"].between(dat["date_start"], dat["date_end"])]
-    dat = dat.sort_values("date_end", ascending=False)
+        dat_keys = elem_keys = ["station", "element"]
+
+    deployment, has_elements = _match_deployments(
+        dat, elements, compiled.index(elem_keys), dat_keys, columns
+    )
+
+    # Observations that share a station, element and datetime can't be told apart.
     if "id" in dat.columns:
         duped = dat[["station", "datetime", "element", "id"]].duplicated()
     else:
         duped = dat[["station", "datetime", "element"]].duplicated()
-    dat = dat[~duped]
+    duped = duped.to_numpy()
 
-    # Rejoin if an elements metadata is missing. This will fill flags with -1 value.
-    if pre_shp[0] > dat.shape[0]:
-        no_element = no_element[
-            (no_element["date_start"].isna()) & (no_element["date_end"].isna())
-        ]
-        dat = pd.concat([dat, no_element], ignore_index=True)
+    # Keep observations without a deployment if an element's metadata is missing
+    # altogether. This will fill flags with -1 value.
+    no_element = ~has_elements & ~duped
+    if "id" in dat.columns:
+        no_element[:] = False
+    keep = ((deployment >= 0) & ~duped) | no_element
+    dat = dat[keep].reset_index(drop=True)
+    deployment = deployment[keep]
 
     # Recheck to see if this is still the case
     if pre_shp[0] > dat.shape[0]:
@@ -88,15 +109,77 @@ def merge_elements_by_date(
             Please make sure all elements in this table are unique."""
         )
 
-    return dat
+    # Sort once, into the order every check works in.
+    order = canonical_order(dat, columns)
+    if order is not None:
+        dat = dat.take(order).reset_index(drop=True)
+        deployment = deployment[order]
 
+    # Observations only carry a small code, and the checks look their thresholds up by it.
+    dat[columns.deployment_col] = deployment.astype(np.int32)
+    meta = elements.drop(columns=[x for x in dat_keys if x in elements.columns])
+    return dat, Deployments(meta.reset_index(drop=True))
 
-def check_observations(
+
+def _match_deployments(
     dat: pd.DataFrame,
     elements: pd.DataFrame,
+    index: DeploymentIndex,
+    dat_keys: List[str],
+    columns: Columns,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the deployment that was active for each observation with a sorted join.
+
+    Args:
+        dat (pd.DataFrame): DataFrame of observations.
+        elements (pd.DataFrame): DataFrame of sensor deployments with a RangeIndex.
+        index (DeploymentIndex): The deployments of `elements` sorted by element and start date.
+        dat_keys (List[str]): Columns of `dat` that identify an element.
+        columns (Columns): An instance of the `Columns` class.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The position in `elements` of each observation's deployment (-1 if
+        no deployment covers the observation), and whether the observation's element has any deployments.
+        When deployments overlap, the one that ends last is used.
+    """
+    obs_code = index.encode(dat, dat_keys)
+    has_elements = np.isin(obs_code, index.code)
+
+    if not len(index.order):
+        return np.full(len(dat), -1), has_elements
+
+    obs_time = pd.DatetimeIndex(dat[columns.dt_col]).as_unit("ns").asi8
+    end = pd.DatetimeIndex(elements[columns.end_col]).as_unit("ns").asi8
+    dep_code, start, end = index.code, index.start, end[index.order]
+
+    # Within each element, point every deployment at the deployment with the latest end
+    # date among those that started at or before it. The first deployment of each element
+    # always points at itself, so a plain forward fill stays within elements.
+    running_end = pd.Series(end).groupby(dep_code, sort=False).cummax().to_numpy()
+    best = pd.Series(np.where(end == running_end, np.arange(len(end)), np.nan))
+    best = best.ffill().to_numpy(dtype=np.int64)
+
+    # Rank all times so each (element, time) pair can be searched as a single integer.
+    ranks = np.unique(np.concatenate([obs_time, start]), return_inverse=True)[1]
+    n_ranks = ranks.max() + 1
+    obs_key = obs_code * n_ranks + ranks[: len(dat)]
+    dep_key = dep_code * n_ranks + ranks[len(dat) :]
+
+    idx = np.searchsorted(dep_key, obs_key, side="right") - 1
+    idx = np.where((idx >= 0) & (dep_code[np.maximum(idx, 0)] == obs_code), idx, -1)
+    idx = np.where(idx >= 0, best[np.maximum(idx, 0)], -1)
+    matched = (idx >= 0) & (end[np.maximum(idx, 0)] >= obs_time)
+
+    return np.where(matched, index.order[np.maximum(idx, 0)], -1), has_elements
+
+
+def check_observations(
+    dat: pd.DataFrame,
+    elements: pd.DataFrame | CompiledElements,
     columns: Columns,
     *checks: Callable,
     keep_columns: List[str] = None,
+    instrument: Instrumentation | None = None,
     **kwargs,
 ) -> pd.DataFrame:
     """Given a long-formatted dataframe of observations and a dataframe of qa/qc check elements for
@@ -105,21 +188,80 @@ def check_observations(
     Args:
         dat (pd.DataFrame): A long-formatted dataframe of wether observations with the following columns:
         `station`, `datetime`, `element`, `value`.
-        elements (pd.DataFrame): A dataframe of elements for different QA/QC tests. Should have
-        columns outlined in the `Columns` class.
+        elements (pd.DataFrame | CompiledElements): A dataframe of elements for different QA/QC tests. Should have
+        columns outlined in the `Columns` class. It can be compiled with `compile_elements` ahead of time.
         columns (Columns): A Class mapping the column names of `dat` and `elements` to those used
         in the QA/QC checking functions.
         *checks (Callable): QA/QC functions from `check.py` that will be used to check the observations.
         keep_columns (List[str]): A list of columns (or a pattern to match to columns) in the original dataframe that
         should be kept and returned in the final dataframe. If left as None, 'station', 'datetime', 'element', 'value', and 'units'
-        columns will be kept.
-        **kwargs: Values to be passed to the check functions, these include `variance_df` and
-        `filter_first`
+        columns will be kept. Columns of `elements`, like 'serial_number', are only joined to the observations if they
+        are asked for.
+        instrument (Instrumentation | None): Records the time, rows and raised flags of the merge and of each
+        check, e.g. to find slow checks or stations. Nothing is recorded if None.
+        **kwargs: Values to be passed to the check functions, these include `variance_df`,
+        `filter_first` and `backend`, the engine that computes the checks ('pandas', 'matrix' or 'polars'). Checks a
+        backend doesn't implement are computed with pandas.
 
     Returns:
-        pd.DataFrame: A new observations dataframe additional QA coluns
+        pd.DataFrame: A new observations dataframe additional QA coluns, sorted by station, element, id and
+        datetime.
     """
 
+    dat = _run_checks(
+        dat,
+        elements,
+        columns,
+        *checks,
+        keep_columns=keep_columns,
+        instrument=instrument,
+        **kwargs,
+    )
+
+    return _select_columns(dat, keep_columns)
+
+
+def _run_checks(
+    dat: pd.DataFrame,
+    elements: pd.DataFrame | CompiledElements,
+    columns: Columns,
+    *checks: Callable,
+    keep_columns: List[str] = None,
+    instrument: Instrumentation | None = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Check observations, joining only the elements columns that `keep_columns` asks for."""
+    dat, deployments = merge_deployments(dat, elements, columns, instrument)
+
+    # Registered checks share a single sorted frame and only add their flags at the end.
+    plan = CheckPlan.build(*checks)
+    if plan is None:
+        dat = deployments.attach(dat, columns)
+        return _run_frame_checks(dat, columns, *checks, instrument=instrument, **kwargs)
+
+    dat = plan.run(dat, columns, instrument, deployments=deployments, **kwargs)
+    pattern = "|".join(_keep_patterns(keep_columns))
+    kept = [
+        x
+        for x in deployments.table.columns
+        if re.search(pattern, x) and x not in dat.columns
+    ]
+    if not kept:
+        return dat
+
+    # The elements columns go before the flags, where a merge would have put them.
+    flags = [x for x in dat.columns if x.startswith("qa_")]
+    dat = deployments.attach(dat, columns, kept)
+    return dat[[x for x in dat.columns if x not in flags] + flags]
+
+
+def _run_frame_checks(
+    dat: pd.DataFrame,
+    columns: Columns,
+    *checks: Callable,
+    instrument: Instrumentation | None = None,
+    **kwargs,
+) -> pd.DataFrame:
     # Make sure the like_element check is the final check that is done.
     checks = list(checks)
     check_names = [x.__name__ for x in checks]
@@ -129,6 +271,16 @@ def check_observations(
         func = checks.pop(check_names.index("check_like_elements"))
         checks.append(func)
 
+    for check in checks:
+        with stage(instrument, check.__name__, dat) as record:
+            out = check(dat, columns=columns, **kwargs)
+            record.done(out)
+        dat = out
+
+    return dat
+
+
+def _keep_patterns(keep_columns: List[str] = None) -> List[str]:
     if keep_columns is None:
         keep_columns = [
             "station",
@@ -142,11 +294,11 @@ def check_observations(
 
     if "qa_" not in keep_columns:
         keep_columns.append("qa_")
+    return keep_columns
 
-    dat = merge_elements_by_date(dat, elements, columns)
 
-    for check in checks:
-        dat = check(dat, columns=columns, **kwargs)
+def _select_columns(dat: pd.DataFrame, keep_columns: List[str] = None) -> pd.DataFrame:
+    keep_columns = _keep_patterns(keep_columns)
 
     cols = dat.columns.to_series().str.contains("|".join(keep_columns))
     dat = dat[dat.columns[cols]]
@@ -0,0 +1,323 @@
+from typing import Callable, List, Set
+
+import numpy as np
+import pandas as pd
+
+from .checks import _like_elements
+from .columns import Columns
+from .elements import compile_elements
+from .plan import CHECKS
+from .process import check_observations
+from .spatial import NeighborIndex, neighbor_index
+
+SLICE_COLUMNS = ["station", "element", "sdi12_address", "start", "end", "checks"]
+
+
+def _deployments(elements: pd.DataFrame, columns: Columns) -> pd.DataFrame:
+    """The deployments with UTC start and end times, ending at the last second of their end date."""
+    compiled = compile_elements(elements, columns)
+    table = compiled.table.assign(sdi12_address=compiled.sdi12_address)
+    end = table[columns.end_col] + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+    return table.assign(**{columns.end_col: end})
+
+
+def _changed(old: pd.Series, new: pd.Series) -> np.ndarray:
+    old_na, new_na = old.isna().to_numpy(), new.isna().to_numpy()
+    if pd.api.types.is_numeric_dtype(old) and pd.api.types.is_numeric_dtype(new):
+        differ = old.to_numpy(dtype=float) != new.to_numpy(dtype=float)
+    else:
+        # Lists, like outage ranges, are compared by their text.
+        differ = old.astype(str).to_numpy() != new.astype(str).to_numpy()
+    return np.where(old_na & new_na, False, np.where(old_na | new_na, True, differ))
+
+
+def _readers(column: str, columns: Columns) -> Set[str]:
+    """The registered checks that read a column of the elements table."""
+    return {x.name for x in CHECKS.values() if column in x.columns(columns)}
+
+
+def diff_elements(
+    old: pd.DataFrame, new: pd.DataFrame, columns: Columns = None
+) -> pd.DataFrame:
+    """Find the observations whose flags can change between two versions of an elements table.
+
+    Deployments are matched by station, element, SDI-12 address and start date. An edited column affects the
+    checks that read it, e.g. `step_size` only affects the step check, and added or removed deployments and
+    edited end dates affect every check. Elements whose `shared_sensor` lists an affected element need their
+    like elements check rerun over the same time range.
+
+    Args:
+        old (pd.DataFrame): The elements table the observations were checked with.
+        new (pd.DataFrame): The edited elements table.
+        columns (Columns): A Class mapping the column names of the elements tables.
+
+    Returns:
+        pd.DataFrame: A row for each affected slice with its `station`, `element`, `sdi12_address` (missing
+        unless soil sensors of the element are told apart), UTC `start` and `end` times (a missing end is
+        open-ended) and the names of the affected `checks`, like 'range'.
+    """
+    columns = columns or Columns()
+    old_dep, new_dep = _deployments(old, columns), _deployments(new, columns)
+    keys = ["station", "element", "sdi12_address", columns.start_col, "_n"]
+    # Deployments that start on the same day are matched in order.
+    old_dep, new_dep = (
+        x.assign(_n=x.groupby(keys[:-1], dropna=False).cumcount())
+        for x in [old_dep, new_dep]
+    )
+    compared = [
+        x for x in dict.fromkeys([*old_dep.columns, *new_dep.columns]) if x not in keys
+    ]
+    both = old_dep.reindex(columns=[*keys, *compared]).merge(
+        new_dep.reindex(columns=[*keys, *compared]),
+        on=keys,
+        how="outer",
+        suffixes=("_old", "_new"),
+        indicator=True,
+    )
+
+    all_checks = {x.name for x in CHECKS.values()}
+    affected = [set() for _ in range(len(both))]
+    for i in np.flatnonzero((both["_merge"] != "both").to_numpy()):
+        affected[i] |= all_checks
+    for col in compared:
+        changed = _changed(both[f"{col}_old"], both[f"{col}_new"])
+        changed &= (both["_merge"] == "both").to_numpy()
+        readers = all_checks if col == columns.end_col else _readers(col, columns)
+        for i in np.flatnonzero(changed):
+            affected[i] |= readers
+
+    old_end, new_end = both[f"{columns.end_col}_old"], both[f"{columns.end_col}_new"]
+    # A deployment that is or was open-ended is affected until now.
+    open_ended = (both["_merge"].isin(["both", "left_only"]) & old_end.isna()) | (
+        both["_merge"].isin(["both", "right_only"]) & new_end.isna()
+    )
+    end = pd.concat([old_end, new_end], axis=1).max(axis=1).where(~open_ended)
+    slices = pd.DataFrame(
+        {
+            "station": both["station"],
+            "element": both["element"],
+            "sdi12_address": both["sdi12_address"],
+            "start": both[columns.start_col],
+            "end": end,
+            "checks": affected,
+        }
+    )
+    slices = slices[slices["checks"].map(len) > 0]
+
+    slices = pd.concat([slices, _shared_dependents(slices, new_dep, columns)])
+    slices["checks"] = slices["checks"].map(lambda x: tuple(sorted(x)))
+    return slices.sort_values(["station", "element", "start"], ignore_index=True)[
+        SLICE_COLUMNS
+    ]
+
+
+def _shared_dependents(
+    slices: pd.DataFrame, deployments: pd.DataFrame, columns: Columns
+) -> pd.DataFrame:
+    """Slices of elements whose like elements check reads the flags of an affected element."""
+    if "like_elements" not in {x.name for x in CHECKS.values()}:
+        return slices.iloc[:0]
+
+    changed = slices[
+        slices["checks"].map(lambda x: bool(x - {"like_elements"})).astype(bool)
+    ]
+    shared = deployments[deployments[columns.shared_col].notna()]
+    shared = shared.drop_duplicates(["station", "element", "sdi12_address"])
+
+    dependents = []
+    for row in shared.itertuples(index=False):
+        row = row._asdict()
+        try:
+            like_elems = _like_elements(row["element"], row[columns.shared_col])
+        except AttributeError:
+            continue
+        upstream = changed[
+            (changed["station"] == row["station"]) & changed["element"].isin(like_elems)
+        ]
+        dependents.append(
+            upstream.assign(
+                element=row["element"],
+                sdi12_address=row["sdi12_address"],
+                checks=[{"like_elements"}] * len(upstream),
+            )
+        )
+
+    return pd.concat(dependents) if dependents else slices.iloc[:0]
+
+
+def _slice_rows(
+    dat: pd.DataFrame, slices: pd.DataFrame, columns: Columns
+) -> np.ndarray:
+    """Whether each observation falls in any of `slices`."""
+    times = dat[columns.dt_col]
+    station = dat["station"].astype(str).to_numpy()
+    element = dat[columns.elem_col].astype(str).to_numpy()
+    ids = dat["id"].to_numpy() if "id" in dat.columns else None
+
+    inside = np.zeros(len(dat), dtype=bool)
+    for x in slices.itertuples(index=False):
+        mask = (station == x.station) & (element == x.element)
+        if ids is not None and pd.notna(x.sdi12_address):
+            mask &= ids == x.sdi12_address
+        mask &= (times >= x.start).to_numpy()
+        if pd.notna(x.end):
+            mask &= (times <= x.end).to_numpy()
+        inside |= mask
+    return inside
+
+
+def _windows(
+    dat: pd.DataFrame,
+    slices: pd.DataFrame,
+    columns: Columns,
+    neighbors: NeighborIndex | None = None,
+) -> np.ndarray:
+    """Observations of the affected stations on whole days around the slices, so that the daily and step
+    checks see the same neighbors as in a full run. Slices of the spatial check also take in the stations
+    that the affected station is compared with."""
+    times = dat[columns.dt_col]
+    station = dat["station"].astype(str).to_numpy()
+    tz = times.dt.tz
+
+    window = np.zeros(len(dat), dtype=bool)
+    for x in slices.itertuples(index=False):
+        stations = [x.station]
+        if neighbors is not None and "spatial" in x.checks:
+            stations += neighbors.of(x.station)
+        mask = np.isin(station, stations)
+        start = x.start.tz_convert(tz).floor("D") - pd.Timedelta(days=1)
+        mask &= (times >= start).to_numpy()
+        if pd.notna(x.end):
+            end = x.end.tz_convert(tz).floor("D") + pd.Timedelta(days=2)
+            mask &= (times < end).to_numpy()
+        window |= mask
+    return window
+
+
+def _with_flags(
+    window: pd.DataFrame,
+    checked: pd.DataFrame,
+    flags: List[str],
+    keys: List[str],
+    columns: Columns,
+    inner: bool,
+) -> pd.DataFrame:
+    """Join flags of `checked` to the observations of a window. If `inner`, observations that aren't in
+    `checked`, like those the step check filtered out, are dropped."""
+    as_str = {"station": str, columns.elem_col: str}
+    joined = (
+        window[keys]
+        .astype(as_str)
+        .merge(
+            checked[keys + flags].astype(as_str),
+            on=keys,
+            how="left",
+            indicator=True,
+        )
+    )
+    window = window.assign(**{x: joined[x].to_numpy() for x in flags})
+    if inner:
+        window = window[(joined["_merge"] == "both").to_numpy()]
+    return window
+
+
+def recheck_observations(
+    checked: pd.DataFrame,
+    dat: pd.DataFrame,
+    old_elements: pd.DataFrame,
+    new_elements: pd.DataFrame,
+    columns: Columns,
+    *checks: Callable,
+    **kwargs,
+) -> pd.DataFrame:
+    """Update the flags of checked observations after the elements table was edited, without checking
+    everything again.
+
+    The affected slices are found with `diff_elements`. Only the checks whose criteria changed are run
+    again, only on the observations of affected stations around those slices, and only their flags are
+    replaced, and only for observations in the slices. The spatial check also reads the observations of the
+    stations it compares an affected station with, and the like elements check reads the old flags of the
+    checks that aren't run again.
+
+    Args:
+        checked (pd.DataFrame): The output of `check_observations` with `old_elements`.
+        dat (pd.DataFrame): The observations that were checked, as passed to `check_observations`. Only the
+        observations around the affected slices are used.
+        old_elements (pd.DataFrame): The elements table `checked` was produced with.
+        new_elements (pd.DataFrame): The edited elements table.
+        columns (Columns): A Class mapping the column names of the observations and elements tables.
+        *checks (Callable): The QA/QC functions `checked` was produced with. They must be registered checks.
+        **kwargs: Values to be passed to the check functions.
+
+    Raises:
+        ValueError: If any of the checks isn't registered, so its affected slices can't be known.
+
+    Returns:
+        pd.DataFrame: A copy of `checked` with updated flags. Observations that the new check doesn't
+        produce a flag for keep their old flags.
+    """
+    unknown = [x.__name__ for x in checks if x not in CHECKS]
+    if unknown:
+        raise ValueError(f"Can't tell which observations {unknown} affect!")
+
+    names = {CHECKS[x].name for x in checks}
+    outputs = {x.name: x.outputs for x in CHECKS.values()}
+    slices = diff_elements(old_elements, new_elements, columns)
+    slices = slices.assign(checks=slices["checks"].map(lambda x: names & set(x)))
+    slices = slices[slices["checks"].map(len) > 0]
+
+    out = checked.copy()
+    if not len(slices):
+        return out
+
+    keys = ["station", columns.elem_col, columns.dt_col]
+    if "id" in out.columns:
+        keys.append("id")
+
+    affected = set().union(*slices["checks"])
+    rerun = [x for x in checks if CHECKS[x].name in affected]
+    neighbors = None
+    if "spatial" in affected:
+        neighbors = kwargs.get("neighbors")
+        if neighbors is None and kwargs.get("stations") is not None:
+            neighbors = neighbor_index(kwargs["stations"])
+
+    # The checks that aren't run again keep their flags, which the like elements check reads. Unless the
+    # step check runs again, the observations it filtered out are left out, as they were in the full run.
+    reused = [
+        x for name in names - affected for x in outputs[name] if x in checked.columns
+    ]
+    window = _with_flags(
+        dat[_windows(dat, slices, columns, neighbors)],
+        checked,
+        reused,
+        keys,
+        columns,
+        inner="step" not in affected,
+    )
+    rechecked = check_observations(window, new_elements, columns, *rerun, **kwargs)
+
+    by_checks = slices.groupby(slices["checks"].map(lambda x: tuple(sorted(x))))
+    for check_names, part in by_checks:
+        flags: List[str] = [
+            x
+            for name in check_names
+            for x in outputs[name]
+            if x in out.columns and x in rechecked.columns
+        ]
+        rows = np.flatnonzero(_slice_rows(out, part, columns))
+        if not flags or not len(rows):
+            continue
+
+        target = pd.DataFrame({x: out[x].iloc[rows].to_numpy() for x in keys}).astype(
+            {"station": str, columns.elem_col: str}
+        )
+        source = rechecked[keys + flags].astype({"station": str, columns.elem_col: str})
+        new = target.merge(source, on=keys, how="left")
+        for flag in flags:
+            found = new[flag].notna().to_numpy()
+            out.iloc[rows[found], out.columns.get_loc(flag)] = (
+                new[flag].to_numpy()[found].astype(out[flag].dtype)
+            )
+
+    return out
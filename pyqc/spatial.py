@@ -0,0 +1,140 @@
+import hashlib
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from .memo import Memo
+
+# Neighbor indexes are small, but a few stations tables, e.g. of different networks, are often in use.
+NEIGHBOR_CACHE_SIZE = 8
+
+_cache = Memo()
+
+
+@dataclass
+class NeighborIndex:
+    """The nearest neighbors of each station, with inverse distance weights.
+
+    Args:
+        stations (pd.Index): The station names.
+        neighbors (np.ndarray): A (station x neighbor) array of the positions of each station's neighbors in
+        `stations`, nearest first. Stations with fewer neighbors are padded with -1.
+        weights (np.ndarray): The inverse distance weight of each neighbor, 0 for padding.
+    """
+
+    stations: pd.Index
+    neighbors: np.ndarray
+    weights: np.ndarray
+
+    def of(self, station: str) -> List[str]:
+        """The neighbors of a station, nearest first. A station that isn't in the index has none."""
+        i = self.stations.get_indexer([str(station)])[0]
+        if i < 0:
+            return []
+        near = self.neighbors[i]
+        return list(self.stations[near[near >= 0]])
+
+    def estimate(self, values: np.ndarray) -> np.ndarray:
+        """Estimate each station's values from its neighbors' values at the same time.
+
+        Args:
+            values (np.ndarray): A (time x station) array of observations, NaN where there is none. The
+            stations are in the order of `stations`.
+
+        Returns:
+            np.ndarray: A (time x station) array of the inverse distance weighted mean of the neighbors that
+            have an observation, NaN if none do.
+        """
+        nearby = values[:, np.maximum(self.neighbors, 0)]
+        valid = ~np.isnan(nearby) & (self.neighbors >= 0)
+        weights = np.where(valid, self.weights, 0.0)
+        total = weights.sum(axis=2)
+        weighted = (np.where(valid, nearby, 0.0) * weights).sum(axis=2)
+        return np.where(total > 0, weighted / np.where(total > 0, total, 1.0), np.nan)
+
+
+def _station_points(stations: pd.DataFrame):
+    # geopandas is slow to import, so only import it when an index is built.
+    import geopandas as gpd
+
+    if isinstance(stations, gpd.GeoDataFrame):
+        points = stations.geometry
+    else:
+        points = gpd.GeoSeries.from_xy(
+            stations["longitude"], stations["latitude"], crs="EPSG:4326"
+        )
+
+    if points.crs is None or points.crs.is_geographic:
+        points = points.set_crs("EPSG:4326", allow_override=points.crs is None)
+        points = points.to_crs(points.estimate_utm_crs())
+    return points.reset_index(drop=True)
+
+
+def build_neighbor_index(
+    stations: pd.DataFrame,
+    max_neighbors: int = 5,
+    max_distance: float = 100_000,
+    power: float = 2,
+) -> NeighborIndex:
+    """Find the nearest neighbors of each station with a spatial index.
+
+    Args:
+        stations (pd.DataFrame): A row for each station with `station`, `latitude` and `longitude` columns,
+        or a GeoDataFrame with a `station` column and point geometries.
+        max_neighbors (int): The most neighbors to keep for each station.
+        max_distance (float): The furthest a neighbor can be, in meters.
+        power (float): Neighbors are weighted by their distance to this power.
+
+    Returns:
+        NeighborIndex: The neighbors of each station.
+    """
+    points = _station_points(stations)
+    names = pd.Index(stations["station"].astype(str).to_numpy())
+
+    near, other = points.sindex.query(
+        points, predicate="dwithin", distance=max_distance
+    )
+    keep = near != other
+    near, other = near[keep], other[keep]
+    distance = points.iloc[near].distance(points.iloc[other], align=False).to_numpy()
+
+    # Keep the nearest neighbors of each station.
+    order = np.lexsort((distance, near))
+    near, other, distance = near[order], other[order], distance[order]
+    rank = np.arange(len(near)) - np.searchsorted(near, near)
+    keep = rank < max_neighbors
+
+    neighbors = np.full((len(names), max_neighbors), -1, dtype=np.int64)
+    weights = np.zeros((len(names), max_neighbors))
+    neighbors[near[keep], rank[keep]] = other[keep]
+    # Co-located stations are as close as a meter, so they don't get infinite weights.
+    weights[near[keep], rank[keep]] = 1 / np.maximum(distance[keep], 1.0) ** power
+
+    return NeighborIndex(names, neighbors, weights)
+
+
+def neighbor_index(
+    stations: pd.DataFrame,
+    max_neighbors: int = 5,
+    max_distance: float = 100_000,
+    power: float = 2,
+) -> NeighborIndex:
+    """Like `build_neighbor_index`, but reuses the index of an unchanged stations table.
+
+    The `NEIGHBOR_CACHE_SIZE` most recently used indexes are kept.
+    """
+    h = hashlib.sha1(repr((max_neighbors, max_distance, power)).encode())
+    cols = [x for x in ["station", "latitude", "longitude"] if x in stations.columns]
+    h.update(
+        pd.util.hash_pandas_object(stations[cols], index=False).to_numpy().tobytes()
+    )
+    if "geometry" in stations.columns:
+        h.update(b"".join(stations.geometry.to_wkb()))
+        h.update(str(stations.crs).encode())
+    return _cache.get(
+        h.hexdigest(),
+        lambda: build_neighbor_index(stations, max_neighbors, max_distance, power),
+        NEIGHBOR_CACHE_SIZE,
+    )
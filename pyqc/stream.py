@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .checks import check_range_pd
+from .columns import Columns
+from .process import _select_columns, merge_elements_by_date
+
+
+@dataclass
+class DailyStats:
+    """Running count, mean and sum of squared deviations (Welford's M2) for one day of a series."""
+
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+
+    def update(self, count: int, mean: float, m2: float) -> DailyStats:
+        """Fold the statistics of a new batch of observations into the running totals."""
+        if count == 0:
+            return self
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        return self
+
+    @property
+    def sd(self) -> float:
+        # Sample standard deviation, matching the pandas default used by `check_variance_pd`.
+        if self.count < 2:
+            return np.nan
+        return np.sqrt(self.m2 / (self.count - 1))
+
+
+@dataclass
+class StreamingSession:
+    """Incrementally QA/QC check batches of real-time observations.
+
+    Unlike `check_observations`, a session remembers the last observation and running daily statistics
+    of each (station, element, id) series, so each new batch only needs to contain new observations.
+    The range, step and persistence checks are performed on every batch.
+
+    Args:
+        elements (pd.DataFrame): A dataframe of elements for different QA/QC tests. Should have
+        columns outlined in the `Columns` class.
+        columns (Columns): A Class mapping the column names of observations and `elements` to those used
+        in the QA/QC checking functions.
+        keep_days (int): How many days before the latest day of a series to keep daily statistics for.
+        Observations older than that are still checked, but their daily statistics start from scratch.
+    """
+
+    elements: pd.DataFrame
+    columns: Columns = field(default_factory=Columns)
+    keep_days: int = 1
+    _last: Dict[Hashable, Tuple[pd.Timestamp, float]] = field(
+        init=False, default_factory=dict
+    )
+    _daily: Dict[Hashable, Dict[object, DailyStats]] = field(
+        init=False, default_factory=dict
+    )
+
+    def _series_keys(self, dat: pd.DataFrame) -> List[str]:
+        keys = ["station", self.columns.elem_col]
+        if "id" in dat.columns:
+            keys.append("id")
+        return keys
+
+    @staticmethod
+    def _normalize(key: Hashable) -> Tuple:
+        # NaN ids don't compare equal to themselves, so store them as None.
+        key = key if isinstance(key, tuple) else (key,)
+        return tuple(None if pd.isna(x) else x for x in key)
+
+    def check(self, dat: pd.DataFrame, keep_columns: List[str] = None) -> pd.DataFrame:
+        """QA/QC check a batch of observations and fold it into the session's state.
+
+        Args:
+            dat (pd.DataFrame): A long-formatted dataframe of new observations with the following columns:
+            `station`, `datetime`, `element`, `value`. Each observation should only be passed to a session once.
+            keep_columns (List[str]): Columns to keep in the returned DataFrame, as in `check_observations`.
+
+        Returns:
+            pd.DataFrame: The batch with `qa_range`, `qa_step` and `qa_delta` columns. The first observation
+            of a series, and observations that arrive after a later one, get a `qa_step` of -1. `qa_delta`
+            uses all observations of the day seen so far, so it is only final once the day is complete.
+        """
+        columns = self.columns
+        dat = merge_elements_by_date(dat, self.elements, columns)
+        dat = check_range_pd(dat, columns)
+
+        keys = self._series_keys(dat)
+        dat = dat.sort_values([*keys, columns.dt_col], kind="stable", ignore_index=True)
+        dat = self._check_step(dat, keys)
+        dat = self._check_delta(dat, keys)
+
+        return _select_columns(dat, keep_columns)
+
+    def _check_step(self, dat: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        columns = self.columns
+        times = dat[columns.dt_col]
+        values = dat[columns.compare_col]
+
+        prev = values.groupby(
+            [dat[x] for x in keys], dropna=False, observed=True
+        ).shift(1)
+        late = np.zeros(len(dat), dtype=bool)
+
+        groups = dat.groupby(keys, sort=False, dropna=False, observed=True).indices
+        for key, rows in groups.items():
+            key = self._normalize(key)
+            last = rows[-1]
+
+            if key in self._last:
+                last_time, last_value = self._last[key]
+                # Observations at or before the last one seen have no known predecessor.
+                late[rows] = (times.iloc[rows] <= last_time).to_numpy()
+                # Rows are in time order, so the first row that isn't late follows the last one seen.
+                on_time = rows[~late[rows]]
+                if len(on_time):
+                    prev.iloc[on_time[0]] = last_value
+
+            if key not in self._last or times.iloc[last] > self._last[key][0]:
+                self._last[key] = (times.iloc[last], values.iloc[last])
+
+        diff = (values - prev).abs()
+        qa_step = np.where(diff < dat[columns.step_col], 0, 1)
+        qa_step = np.where(diff.isna() | late, -1, qa_step)
+        qa_step = np.where(dat[columns.step_col].isna(), -1, qa_step)
+
+        return dat.assign(qa_step=qa_step.astype(np.int8))
+
+    def _check_delta(self, dat: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+        columns = self.columns
+        date = dat[columns.dt_col].dt.date
+        values = dat[columns.compare_col]
+
+        grouped = values.groupby(
+            [*(dat[x] for x in keys), date], dropna=False, observed=True
+        )
+        batch = pd.DataFrame(
+            {
+                "count": grouped.count(),
+                "mean": grouped.mean(),
+                "m2": grouped.var(ddof=0) * grouped.count(),
+            }
+        ).fillna(0)
+
+        sd = np.empty(len(batch))
+        for i, ((*key, day), stats) in enumerate(
+            zip(batch.index, batch.itertuples(index=False))
+        ):
+            daily = self._daily.setdefault(self._normalize(tuple(key)), {})
+            sd[i] = (
+                daily.setdefault(day, DailyStats())
+                .update(stats.count, stats.mean, stats.m2)
+                .sd
+            )
+
+            # Forget days that are too old to be needed again.
+            latest = max(daily)
+            for old in [x for x in daily if (latest - x).days > self.keep_days]:
+                del daily[old]
+
+        row_sd = sd[grouped.ngroup().to_numpy()]
+
+        qa_delta = (~(row_sd >= dat[columns.delta_col])).astype(np.int8)
+        qa_delta = np.where(dat[columns.delta_col].isna(), -1, qa_delta)
+
+        return dat.assign(qa_delta=qa_delta.astype(np.int8))
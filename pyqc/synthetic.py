@@ -0,0 +1,286 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class ElementTemplate:
+    """How to generate observations and deployments of one kind of element.
+
+    Args:
+        name (str): The element name. Soil elements get a depth suffix, e.g. `soil_temp_0005`.
+        mean (float): The mean value of the observations.
+        amplitude (float): The amplitude of the daily cycle.
+        noise (float): The standard deviation of the noise added to each observation.
+        low (float): The smallest value an observation can have.
+        high (float): The largest value an observation can have.
+        range_min (float): The `range_min` of the element's deployments.
+        range_max (float): The `range_max` of the element's deployments.
+        step_size (float): The `step_size` of the element's deployments.
+        persistence_delta (float): The `persistence_delta` of the element's deployments.
+        spatial_sd (float): The `spatial_sd` of the element's deployments.
+        type (str): The type of sensor.
+        shared_sensor (str | None): Elements measured by the same sensor, without height or depth suffixes.
+        like_element (str | None): The `like_element` of the element's deployments.
+        flag_min (float): The `flag_min` of the element's deployments.
+        flag_max (float): The `flag_max` of the element's deployments.
+    """
+
+    name: str
+    mean: float
+    amplitude: float
+    noise: float
+    low: float
+    high: float
+    range_min: float
+    range_max: float
+    step_size: float
+    persistence_delta: float
+    spatial_sd: float = np.nan
+    type: str = ""
+    shared_sensor: str | None = None
+    like_element: str | None = None
+    flag_min: float = np.nan
+    flag_max: float = np.nan
+
+
+# Modeled on the elements of a typical mesonet station. The first elements are used when fewer are asked for.
+ELEMENTS: List[ElementTemplate] = [
+    ElementTemplate("air_temp_0200", 10, 8, 0.3, -40, 45, -40, 70, 10, 0.1, 3, "RH/T", like_element="air_temp_logger"),
+    ElementTemplate("rh", 50, 20, 1, 0, 100, 0, 100, 20, 0.1, 20, "RH/T"),
+    ElementTemplate("bp", 85, 0.3, 0.05, 60, 110, 60, 110, 10, 0.1, 1.5, "Barometer", like_element="bp_logger"),
+    ElementTemplate("sol_rad", 300, 500, 20, 0, 1400, 0, 2000, 800, 0.1, 400, "Pyranometer"),
+    ElementTemplate("wind_spd_1000", 3, 1, 0.5, 0, 40, 0, 100, 40, 0.5, 5, "Wind", "wind_dir,wind_dir_sd,windgust"),
+    ElementTemplate("wind_dir_1000", 180, 0, 30, 0, 359, 0, 359, 360, 1, 45, "Wind", "wind_dir_sd,wind_spd,windgust"),
+    ElementTemplate("windgust_1000", 6, 2, 1, 0, 60, 0, 100, 40, 0.5, 5, "Wind", "wind_dir,wind_dir_sd,wind_spd"),
+    ElementTemplate("wind_dir_sd_1000", 20, 5, 5, 0, 180, 0, 180, 90, 1, 60, "Wind", "wind_dir,wind_spd,windgust"),
+    ElementTemplate("ppt", 100, 0, 0.05, 0, 4000, 0, 4000, 25, 0, 50, "Precipitation", "ppt_max_rate"),
+    ElementTemplate("ppt_max_rate", 0, 0, 0.2, 0, 3000, 0, 3000, 125, 0, 50, "Precipitation", "ppt"),
+    ElementTemplate("snow_depth", 100, 0, 2, 0, 950, 0, 950, 10, 0, type="Snow", shared_sensor="snow_depth_q"),
+    ElementTemplate("snow_depth_q", 200, 0, 10, 0, 600, 0, 600, 600, 0, type="Snow", shared_sensor="snow_depth", flag_min=1, flag_max=300),
+]  # fmt: skip
+
+SOIL_ELEMENTS: List[ElementTemplate] = [
+    ElementTemplate("soil_temp", 10, 2, 0.05, -40, 60, -40, 60, 10, 0.0001, type="Soil"),
+    ElementTemplate("soil_vwc", 25, 0, 0.02, 0, 100, 0, 100, 0.2, 0.0001, type="Soil"),
+    ElementTemplate("soil_ec_blk", 0.5, 0, 0.005, 0, 6, 0, 6, 0.1, 0.0001, type="Soil"),
+    ElementTemplate("soil_ec_perm", 15, 0, 0.01, 1, 100, 1, 100, 0.1, 0.0001, type="Soil"),
+    ElementTemplate("soil_ec_por", 0.8, 0, 0.005, 0, 6, 0, 6, 0.1, 0.0001, type="Soil"),
+]  # fmt: skip
+
+
+def _templates(n_elements: int, soil_depths: List[int]) -> List[ElementTemplate]:
+    templates = ELEMENTS[:n_elements]
+    # Asking for more elements than the catalog has adds generic ones.
+    templates += [
+        ElementTemplate(f"aux_{i:02}", 0, 1, 0.2, -50, 50, -50, 50, 10, 0.1, 5, "Aux")
+        for i in range(max(n_elements - len(ELEMENTS), 0))
+    ]
+
+    names = [x.name for x in SOIL_ELEMENTS]
+    for depth in soil_depths:
+        for x in SOIL_ELEMENTS:
+            shared = ",".join(y for y in names if y != x.name)
+            templates.append(
+                ElementTemplate(
+                    **{
+                        **x.__dict__,
+                        "name": f"{x.name}_{depth:04}",
+                        "shared_sensor": shared,
+                    }
+                )
+            )
+    return templates
+
+
+def _series(
+    template: ElementTemplate,
+    times: pd.DatetimeIndex,
+    n: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """`n` series of observations at `times`: a daily cycle plus a slow random walk and noise."""
+    hours = (times.hour + times.minute / 60).to_numpy()
+    cycle = template.amplitude * np.sin(2 * np.pi * (hours - 9) / 24)
+    offset = rng.normal(0, template.noise * 5, (n, 1))
+    walk = rng.normal(0, template.noise * 0.1, (n, len(times))).cumsum(axis=1)
+    noise = rng.normal(0, template.noise, (n, len(times)))
+    values = template.mean + offset + cycle + walk + noise
+    return np.clip(values, template.low, template.high)
+
+
+def make_mesonet(
+    stations: int = 1,
+    days: int = 2,
+    elements: int = len(ELEMENTS),
+    soil_depths: List[int] = (5, 10, 20, 50, 100),
+    soil_sensors: int = 1,
+    sensor_swaps: int = 0,
+    outages: int = 0,
+    gap_fraction: float = 0.0,
+    spike_fraction: float = 0.001,
+    freq: str = "5min",
+    start: str = "2023-01-01",
+    tz: str = "America/Denver",
+    seed: int = 0,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Generate reproducible synthetic observations and a matching elements table.
+
+    Args:
+        stations (int): The number of stations.
+        days (int): The number of days of observations.
+        elements (int): The number of above-ground elements at each station, taken from `ELEMENTS`. If more
+        than `ELEMENTS` has, generic `aux_` elements are added.
+        soil_depths (List[int]): Depths in cm with a soil sensor that measures each of `SOIL_ELEMENTS`.
+        soil_sensors (int): The number of soil sensors at each depth. If more than one, the sensors are
+        told apart by their `sdi12_address`, and the observations have an `id` column. If 0, there
+        are no soil observations.
+        sensor_swaps (int): The number of sensor swaps at each station. Each swap ends the deployment of a
+        random above-ground element and starts a new one on the same day.
+        outages (int): The number of outages at each station. Each outage lists a random element as being
+        out for a few hours in the `outage_ranges` column of the elements table.
+        gap_fraction (float): The fraction of hours each element is missing observations for.
+        spike_fraction (float): The fraction of observations that jump far enough to fail the step check.
+        freq (str): The time between observations.
+        start (str): The first day of observations.
+        tz (str): The time zone of the observations.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The observations, with `station`, `datetime`, `element` and
+        `value` columns, and the elements table.
+    """
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(
+        start,
+        periods=int(pd.Timedelta(days=days) / pd.Timedelta(freq)),
+        freq=freq,
+        tz=tz,
+    )
+    names = [f"station_{i:04}" for i in range(stations)]
+    templates = _templates(elements, list(soil_depths))
+
+    obs, elems = [], []
+    for template in templates:
+        soil = template.name.startswith("soil")
+        n_sensors = soil_sensors if soil else 1
+        if not n_sensors:
+            continue
+        values = _series(template, times, stations * n_sensors, rng)
+
+        spikes = rng.random(values.shape) < spike_fraction
+        values[spikes] += 5 * template.step_size
+
+        # Drop whole hours of observations.
+        hours = (times - times[0]) // pd.Timedelta(hours=1)
+        gaps = rng.random((values.shape[0], hours.max() + 1)) < gap_fraction
+        keep = ~gaps[:, hours]
+
+        station = np.repeat(np.repeat(names, n_sensors), len(times))
+        address = np.tile(np.repeat(np.arange(n_sensors), len(times)), stations)
+        obs.append(
+            pd.DataFrame(
+                {
+                    "station": station,
+                    "datetime": np.tile(times, stations * n_sensors),
+                    "element": template.name,
+                    "value": values.ravel(),
+                    "id": address if soil and soil_sensors > 1 else np.nan,
+                }
+            )[keep.ravel()]
+        )
+
+        for i, name in enumerate(names):
+            for sensor in range(n_sensors):
+                elems.append(
+                    {
+                        "station": name,
+                        "element": template.name,
+                        "date_start": times[0].tz_localize(None).normalize()
+                        - pd.Timedelta(days=1),
+                        "date_end": pd.NaT,
+                        "range_min": template.range_min,
+                        "range_max": template.range_max,
+                        "type": template.type,
+                        "serial_number": f"SN{rng.integers(10**7):07}",
+                        "step_size": template.step_size,
+                        "persistence_delta": template.persistence_delta,
+                        "spatial_sd": template.spatial_sd,
+                        "flag_min": template.flag_min,
+                        "flag_max": template.flag_max,
+                        "like_element": template.like_element,
+                        "shared_sensor": template.shared_sensor,
+                        "sdi12_address": sensor if soil else np.nan,
+                        "outage_ranges": [],
+                    }
+                )
+
+    obs = pd.concat(obs, ignore_index=True)
+    if soil_sensors <= 1 or not len(soil_depths):
+        obs = obs.drop(columns="id")
+    obs = obs.sort_values(
+        ["station", "element", "datetime"], ignore_index=True, kind="stable"
+    )
+
+    elems = pd.DataFrame(elems)
+    if soil_sensors <= 1:
+        elems = elems.drop(columns="sdi12_address")
+
+    elems = _swap_sensors(elems, times, sensor_swaps, rng)
+    elems = _add_outages(elems, times, outages, rng)
+
+    return obs, elems.sort_values(
+        ["station", "element", "date_start"], ignore_index=True
+    )
+
+
+def _swap_sensors(
+    elements: pd.DataFrame, times: pd.DatetimeIndex, n: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    days = times.tz_localize(None).normalize().unique()
+    above = np.flatnonzero(~elements["element"].str.startswith("soil").to_numpy())
+    if not n or not len(above) or len(days) < 2:
+        return elements
+
+    for station, rows in elements.iloc[above].groupby("station").indices.items():
+        for _ in range(n):
+            # Swap the current sensor of a random element, like a technician visit would.
+            element = elements.iloc[above[rng.choice(rows)]]["element"]
+            current = elements.index[
+                (elements["station"] == station)
+                & (elements["element"] == element)
+                & elements["date_end"].isna()
+            ]
+            day = days[rng.integers(1, len(days))]
+            if (elements.loc[current, "date_start"] >= day).any():
+                continue
+
+            replacement = elements.loc[current].assign(
+                date_start=day, serial_number=f"SN{rng.integers(10**7):07}"
+            )
+            elements.loc[current, "date_end"] = day
+            elements = pd.concat([elements, replacement], ignore_index=True)
+
+    return elements
+
+
+def _add_outages(
+    elements: pd.DataFrame, times: pd.DatetimeIndex, n: int, rng: np.random.Generator
+) -> pd.DataFrame:
+    if not n:
+        return elements
+
+    outages = elements["outage_ranges"].map(list)
+    for station, group in elements.groupby("station"):
+        for _ in range(n):
+            element = rng.choice(group["element"].unique())
+            begin = times[rng.integers(len(times))]
+            end = begin + pd.Timedelta(hours=int(rng.integers(1, 12)))
+            outage = [begin.strftime("%Y-%m-%d %H:%M"), end.strftime("%Y-%m-%d %H:%M")]
+            rows = group.index[group["element"] == element]
+            for row in rows:
+                outages[row] = outages[row] + [outage]
+
+    return elements.assign(outage_ranges=outages)
@@ -0,0 +1,64 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .columns import Columns
+
+
+@dataclass
+class TimeIndex:
+    """The observation times of a frame factorized to integer codes, shared by the checks.
+
+    In long format each time is repeated for every element, so days and orderings are worked out for the
+    unique times only, and the checks group, join and pivot on the codes.
+
+    Args:
+        codes (np.ndarray): The position of each observation's time in `times`, -1 for missing times.
+        times (pd.DatetimeIndex): The unique times in ascending order.
+        day_codes (np.ndarray): The position of each unique time's local day in `days`.
+        days (pd.DatetimeIndex): The unique local days as naive midnights, in ascending order.
+        cache (dict): Other layouts of the same rows, like the matrices of `station_matrices`. A subset
+        from `take` starts with an empty cache.
+    """
+
+    codes: np.ndarray
+    times: pd.DatetimeIndex
+    day_codes: np.ndarray
+    days: pd.DatetimeIndex
+    cache: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def build(cls, dat: pd.DataFrame, columns: Columns) -> "TimeIndex":
+        """Factorize the datetime column of observations.
+
+        Args:
+            dat (pd.DataFrame): Observations with a datetime column.
+            columns (Columns): A Class mapping the column names of `dat`.
+
+        Returns:
+            TimeIndex: The codes of the observations' times and local days.
+        """
+        codes, times = pd.factorize(dat[columns.dt_col], sort=True)
+        times = pd.DatetimeIndex(times)
+        local = times.tz_localize(None) if times.tz is not None else times
+        day_codes, days = pd.factorize(local.normalize(), sort=True)
+        return cls(codes, times, day_codes, pd.DatetimeIndex(days))
+
+    @classmethod
+    def of(
+        cls, dat: pd.DataFrame, columns: Columns, time_index: "TimeIndex | None" = None
+    ) -> "TimeIndex":
+        """`time_index` if it was built for `dat`, or a new index of `dat`."""
+        if time_index is not None and len(time_index.codes) == len(dat):
+            return time_index
+        return cls.build(dat, columns)
+
+    @property
+    def row_days(self) -> np.ndarray:
+        """The position of each observation's local day in `days`, -1 for missing times."""
+        return np.where(self.codes >= 0, self.day_codes[self.codes], -1)
+
+    def take(self, rows: np.ndarray) -> "TimeIndex":
+        """The index of a subset of the observations, e.g. a boolean mask of the rows a check keeps."""
+        return TimeIndex(self.codes[rows], self.times, self.day_codes, self.days)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.backend import BACKENDS, get_backend
+from pyqc.columns import Columns
+from pyqc.process import check_observations, merge_deployments, merge_elements_by_date
+
+CHECKS = [
+    ck.check_range_pd,
+    ck.check_step_pd,
+    ck.check_variance_pd,
+    ck.check_like_elements,
+]
+
+
+@pytest.fixture(params=list(BACKENDS))
+def name(request) -> str:
+    if request.param == "polars":
+        pytest.importorskip("polars")
+    return request.param
+
+
+@pytest.fixture(scope="module")
+def merged(observations, elements) -> pd.DataFrame:
+    dat = merge_elements_by_date(observations, elements, Columns())
+    # Missing values and thresholds must be flagged the same way by every backend.
+    dat.loc[dat.index[::50], "value"] = np.nan
+    dat.loc[dat.index[::70], "range_min"] = np.nan
+    return dat
+
+
+def test_range_matches_pandas(merged, name):
+    columns = Columns()
+    expected = ck.check_range_pd(merged, columns)
+    checked = ck.check_range_pd(merged, columns, backend=name)
+    pd.testing.assert_frame_equal(checked, expected)
+
+
+@pytest.mark.parametrize("filter_first", [True, False])
+def test_step_matches_pandas(merged, name, filter_first):
+    columns = Columns()
+    expected = ck.check_step_pd(merged, columns, filter_first)
+    checked = ck.check_step_pd(merged, columns, filter_first, backend=name)
+    pd.testing.assert_frame_equal(checked, expected)
+
+
+def test_check_observations_backend(observations, elements, name):
+    columns = Columns()
+    expected = check_observations(observations, elements, columns, *CHECKS)
+    checked = check_observations(observations, elements, columns, *CHECKS, backend=name)
+    pd.testing.assert_frame_equal(checked, expected)
+
+
+def test_variance_matches_pandas(merged, name):
+    columns = Columns()
+    expected = ck.check_variance_pd(merged, columns)
+    checked = ck.check_variance_pd(merged, columns, backend=name)
+    pd.testing.assert_frame_equal(checked, expected)
+
+
+@pytest.mark.parametrize(
+    "func", [ck.check_range_pd, ck.check_step_pd, ck.check_variance_pd]
+)
+def test_deployments_match_merged(observations, elements, merged, name, func):
+    columns = Columns()
+    dat, deployments = merge_deployments(observations, elements, columns)
+    expected = func(merge_elements_by_date(observations, elements, columns), columns)
+    checked = func(dat, columns, backend=name, deployments=deployments)
+    qa = [x for x in expected.columns if x.startswith("qa_")]
+    pd.testing.assert_frame_equal(checked[qa], expected[qa])
+
+
+@pytest.mark.parametrize(
+    "func",
+    [
+        ck.check_range_pd,
+        ck.check_step_pd,
+        ck.check_variance_pd,
+        ck.check_like_elements,
+        ck.check_outages,
+        ck.check_spatial,
+    ],
+)
+def test_unknown_backend(merged, func):
+    with pytest.raises(ValueError):
+        get_backend("spark")
+    with pytest.raises(ValueError):
+        func(merged, Columns(), backend="spark")
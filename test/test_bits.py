@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from pyqc.bits import NOT_PERFORMED, UNABLE_TO_PERFORM, BitEncoder
+
+
+def test_encode_matches_bit_string():
+    encoder = BitEncoder(qa_step=1, qa_range=-1, qa_delta=0, qa_like=3)
+    as_str = encoder.encode(as_int=False)
+    assert len(as_str) == 32, "Encoded string was not padded to the total bits."
+    assert int(as_str, 2) == encoder.encode(), "String and integer encodings differ."
+
+
+def test_encode_frame_matches_row_encoder():
+    dat = pd.DataFrame(
+        {
+            "qa_step": [0, 1, -1, None],
+            "qa_range": [1, 0, 0, -1],
+            "qa_shared": [5, -1, None, 0],
+        }
+    )
+    packed = BitEncoder.encode_frame(dat)
+    expected = [
+        BitEncoder(qa_step=0, qa_range=1, qa_shared=5).encode(),
+        BitEncoder(qa_step=1, qa_range=0, qa_shared=-1).encode(),
+        BitEncoder(qa_step=-1, qa_range=0).encode(),
+        BitEncoder(qa_range=-1, qa_shared=0).encode(),
+    ]
+    assert packed.dtype == np.uint32, "Packed flags are not uint32."
+    assert packed.to_list() == expected, (
+        "Column-wise encoding disagrees with BitEncoder."
+    )
+
+
+def test_decode_array_round_trip():
+    dat = pd.DataFrame({"qa_step": [0, 1, -1, None], "qa_like": [127, -1, 0, 3]})
+    decoded = BitEncoder.decode_array(BitEncoder.encode_frame(dat))
+    assert decoded["qa_step"].to_list() == [0, 1, -1, pd.NA]
+    assert decoded["qa_like"].to_list() == [127, -1, 0, 3]
+    assert decoded["qa_range"].isna().all(), "Missing checks should decode as NA."
+
+
+def test_decode_array_human_readable():
+    packed = BitEncoder.encode_frame(pd.DataFrame({"qa_step": [0, -1]}))
+    decoded = BitEncoder.decode_array(packed, human_readable=True)
+    assert pd.isna(decoded["qa_step"].iloc[0])
+    assert decoded["qa_step"].iloc[1] == UNABLE_TO_PERFORM
+    assert (decoded["qa_range"] == NOT_PERFORMED).all()
+    for name, message in BitEncoder().decode(int(packed.iloc[1])).items():
+        value = decoded[name].iloc[1]
+        assert (pd.isna(value) and message is None) or value == message, (
+            "Vectorized decoding disagrees with BitEncoder.decode."
+        )
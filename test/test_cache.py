@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.cache import ResultCache, check_observations_cached
+from pyqc.columns import Columns
+from pyqc.instrument import Instrumentation
+from pyqc.process import check_observations
+
+CHECKS = [
+    ck.check_range_pd,
+    ck.check_step_pd,
+    ck.check_variance_pd,
+    ck.check_like_elements,
+]
+
+
+def _sorted(dat):
+    return dat.astype({"station": str, "element": str}).sort_values(
+        ["element", "datetime"], ignore_index=True
+    )
+
+
+def test_result_cache(tmp_path):
+    frame = pd.DataFrame({"qa_range": [0, 1, 0]})
+    cache = ResultCache(max_bytes=2 * frame.memory_usage(index=False).sum())
+    assert cache.get("a") is None
+
+    for key in "abc":
+        cache.put(key, frame)
+    assert "a" not in cache and len(cache) == 2
+    pd.testing.assert_frame_equal(cache.get("b"), frame)
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (1, 1, 1)
+
+    disk = ResultCache(path=str(tmp_path))
+    disk.put("a", frame)
+    reopened = ResultCache(path=str(tmp_path))
+    pd.testing.assert_frame_equal(reopened.get("a"), frame)
+    assert reopened.nbytes == disk.nbytes
+
+    reopened.clear()
+    assert len(ResultCache(path=str(tmp_path))) == 0
+
+
+@pytest.mark.parametrize("path", [False, True])
+def test_check_observations_cached(observations, elements, tmp_path, path):
+    columns = Columns()
+    cache = ResultCache(path=str(tmp_path) if path else None)
+    start = observations["datetime"].min()
+
+    for hours in [30, 36, 48]:
+        window = observations[
+            observations["datetime"] < start + pd.Timedelta(hours=hours)
+        ]
+        expected = check_observations(window, elements, columns, *CHECKS)
+        checked = check_observations_cached(
+            window, elements, columns, *CHECKS, cache=cache
+        )
+        pd.testing.assert_frame_equal(
+            _sorted(checked), _sorted(expected), check_categorical=False
+        )
+
+    # The first day is the same in every window.
+    n_elements = observations["element"].nunique()
+    assert cache.stats.hits == 2 * n_elements
+    assert cache.stats.misses == 4 * n_elements
+
+
+def test_check_observations_cached_changes(observations, elements):
+    columns = Columns()
+    checks = CHECKS[:3]
+    cache = ResultCache()
+    check_observations_cached(observations, elements, columns, *checks, cache=cache)
+    misses = cache.stats.misses
+
+    changed = observations.copy()
+    changed.loc[changed["element"] == "bp", "value"] += 1
+    expected = check_observations(changed, elements, columns, *checks)
+    instrument = Instrumentation()
+    checked = check_observations_cached(
+        changed, elements, columns, *checks, cache=cache, instrument=instrument
+    )
+    pd.testing.assert_frame_equal(
+        _sorted(checked), _sorted(expected), check_categorical=False
+    )
+    # Only the two days of the changed element are checked again.
+    assert cache.stats.misses - misses == 2
+    assert instrument.stages[0].rows_in == (changed["element"] == "bp").sum(), (
+        "Only the changed element should be checked, since its first day has no previous observation."
+    )
+
+    with pytest.raises(ValueError):
+        check_observations_cached(
+            observations, elements, columns, lambda x: x, cache=cache
+        )
@@ -1,3 +1,5 @@
+import pandas as pd
+
 import pyqc.checks as ck
 from pyqc.columns import Columns
 
@@ -45,6 +47,39 @@ def test_check_step_pd_with_filter_first_false(observations, elements):
     )
 
 
+def test_check_step_pd_matches_scalar_check(observations, elements):
+    columns = Columns()
+    dat = observations.merge(elements, on=["station", "element"], how="left")
+    dat = dat.drop_duplicates(["element", "datetime"])
+    new = ck.check_step_pd(dat, columns, filter_first=False)
+
+    new = new.sort_values(["element", "datetime"], ignore_index=True)
+    prev = new.groupby("element")["value"].shift(1)
+    expected = [
+        -1 if pd.isna(p) else ck.check_step(x, p, t)
+        for x, p, t in zip(new["value"], prev, new["step_size"])
+    ]
+    assert new["qa_step"].to_list() == expected, (
+        "Vectorized step check disagrees with the scalar step check."
+    )
+
+
+def test_check_step_pd_per_station(observations, elements):
+    columns = Columns()
+    dat = observations.merge(elements, on=["station", "element"], how="left")
+    dat = dat.drop_duplicates(["element", "datetime"])
+    other = dat.assign(station="other")
+    new = ck.check_step_pd(pd.concat([other, dat]), columns, filter_first=False)
+
+    one = ck.check_step_pd(dat, columns, filter_first=False)
+    assert (new["qa_step"] == -1).sum() == 2 * (one["qa_step"] == -1).sum(), (
+        "The first observation of each station can't be checked."
+    )
+    assert new.loc[new["station"] == "other", "qa_step"].to_list() == (
+        one["qa_step"].to_list()
+    ), "Steps shouldn't be taken between stations."
+
+
 def test_check_variance_pd(observations, elements):
     columns = Columns()
     dat = observations.merge(elements, on=["station", "element"], how="left")
@@ -66,3 +101,63 @@ def test_check_like_elements(observations, elements):
     dat = ck.check_range_pd(dat, columns)
     dat = ck.check_like_elements(dat, columns)
     assert "qa_shared" in dat.columns, "Step QA flag not properly added to DataFrame."
+
+
+def test_check_like_elements_sets_shared_bits():
+    columns = Columns()
+    times = pd.date_range("2022-10-01", periods=3, freq="5min", tz="America/Denver")
+    dat = pd.DataFrame(
+        {
+            "station": "aceabsar",
+            "datetime": list(times) * 3,
+            "element": ["soil_temp_0005"] * 3 + ["soil_vwc_0005"] * 3 + ["bp"] * 3,
+            "shared_sensor": ["soil_vwc,soil_ec_blk"] * 3
+            + ["soil_temp"] * 3
+            + [None] * 3,
+            "qa_range": [0, 0, -1, 1, 0, 1, 1, 1, 1],
+        }
+    )
+    dat = ck.check_like_elements(dat, columns)
+    assert dat["qa_shared"].to_list() == [1, 0, 1, 0, 0, 0, 0, 0, 0], (
+        "Shared sensor flags were not assigned from the failed elements."
+    )
+
+    dat = dat.assign(qa_range=dat["qa_range"].replace(1, -2)).drop(columns="qa_shared")
+    dat = ck.check_like_elements(dat, columns)
+    assert (dat.loc[dat["element"] == "soil_temp_0005", "qa_shared"] == -1).all(), (
+        "Invalid shared sensor flags should be filled with -1."
+    )
+
+
+def test_check_outages_matches_row_check(observations):
+    columns = Columns()
+    outages = {
+        "air_temp_0200": [["2022-10-01 06:00:00", "2022-10-01 08:00:00"]],
+        "bp": [["2022-10-02 12:00:00"], ["2022-10-01 00:00:00", "2022-10-01 00:30:00"]],
+        "rh": [],
+    }
+    dat = observations.assign(
+        outage_ranges=observations["element"].map(lambda x: outages.get(x, []))
+    )
+    dat = ck.check_outages(dat, columns)
+    expected = dat.apply(ck.apply_outage_check, axis=1)
+    assert dat["qa_outage"].to_list() == expected.to_list(), (
+        "Vectorized outage check disagrees with the row-wise outage check."
+    )
+    assert dat["qa_outage"].sum() > 0, "No observations were flagged as outages."
+
+
+def test_check_outages_by_id(observations):
+    columns = Columns()
+    # Two sensors of the same element at one station, e.g. sdi12 addresses, with their own outages.
+    outages = {
+        1: [["2022-10-01 06:00:00", "2022-10-01 08:00:00"]],
+        2: [["2022-10-02 12:00:00"]],
+    }
+    temp = observations[observations["element"] == "air_temp_0200"]
+    dat = pd.concat([temp.assign(id=x) for x in outages], ignore_index=True)
+    dat = ck.check_outages(dat.assign(outage_ranges=dat["id"].map(outages)), columns)
+    expected = dat.apply(ck.apply_outage_check, axis=1)
+    assert dat["qa_outage"].to_list() == expected.to_list(), (
+        "Each id should be checked against its own outages."
+    )
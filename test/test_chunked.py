@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.chunked import check_observations_chunked, iter_check_observations
+from pyqc.columns import Columns
+from pyqc.process import check_observations
+
+CHECKS = [
+    ck.check_range_pd,
+    ck.check_step_pd,
+    ck.check_variance_pd,
+    ck.check_like_elements,
+]
+
+
+@pytest.mark.parametrize("filter_first", [True, False])
+def test_chunked_matches_check_observations(observations, elements, filter_first):
+    columns = Columns()
+    expected = check_observations(
+        observations, elements, columns, *CHECKS, filter_first=filter_first
+    )
+
+    # Chunk boundaries that don't line up with days.
+    chunks = [
+        x for _, x in observations.groupby(observations["datetime"].dt.floor("7h"))
+    ]
+    out = []
+    check_observations_chunked(
+        chunks, elements, columns, *CHECKS, sink=out.append, filter_first=filter_first
+    )
+    out = pd.concat(out)
+
+    sort_cols = ["element", "datetime"]
+    expected = expected.sort_values(sort_cols, ignore_index=True)
+    out = out[expected.columns].sort_values(sort_cols, ignore_index=True)
+    pd.testing.assert_frame_equal(out, expected, check_dtype=False)
+
+
+def test_chunked_requires_chronological_chunks(observations, elements):
+    columns = Columns()
+    chunks = [x for _, x in observations.groupby(observations["datetime"].dt.date)]
+    with pytest.raises(ValueError):
+        list(iter_check_observations(reversed(chunks), elements, columns))
+
+
+def test_chunked_rejects_network_checks(observations, elements):
+    with pytest.raises(ValueError, match="check_spatial"):
+        list(
+            iter_check_observations(
+                [observations], elements, Columns(), ck.check_range_pd, ck.check_spatial
+            )
+        )
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.daily import DailyStatsStore
+from pyqc.process import merge_elements_by_date
+
+
+def test_daily_stats_update_incrementally(observations):
+    store = DailyStatsStore()
+    # Fold the observations in out of order, as late data would arrive.
+    for part in np.array_split(
+        np.random.default_rng(0).permutation(len(observations)), 5
+    ):
+        store.update(observations.iloc[np.sort(part)])
+
+    expected = observations.groupby(["element", observations["datetime"].dt.date])[
+        "value"
+    ].std()
+    sd = (
+        pd.Series(store.sd(observations))
+        .groupby([observations["element"], observations["datetime"].dt.date])
+        .first()
+    )
+    np.testing.assert_allclose(sd.to_numpy(), expected.to_numpy(), rtol=1e-9)
+
+
+def test_check_variance_with_daily_stats(observations, elements):
+    columns = Columns()
+    dat = merge_elements_by_date(observations, elements, columns)
+    store = DailyStatsStore()
+    store.update(observations)
+
+    expected = ck.check_variance_pd(dat, columns)
+    checked = ck.check_variance_pd(dat, columns, daily_stats=store)
+    pd.testing.assert_series_equal(checked["qa_delta"], expected["qa_delta"])
+
+
+def test_daily_stats_saved(observations, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "daily")
+    saved = DailyStatsStore(path)
+    saved.update(observations)
+
+    store = DailyStatsStore(path)
+    assert store.stats.empty, "Days should only be read when they're needed."
+    pd.testing.assert_frame_equal(
+        store.load().sort_values(["element", "date"], ignore_index=True),
+        saved.stats.sort_values(["element", "date"], ignore_index=True),
+    )
+    assert (
+        len(store.stats)
+        == observations.groupby(["element", observations["datetime"].dt.date]).ngroups
+    ), "Every day of every element should be saved."
+    np.testing.assert_array_equal(
+        DailyStatsStore(path).sd(observations), saved.sd(observations)
+    )
+
+
+def test_daily_stats_late_update_rewrites_its_days(observations, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "daily"
+    dates = observations["datetime"].dt.date
+    late = dates == dates.max()
+    DailyStatsStore(str(path)).update(observations[~late])
+    before = {x.name: x.stat().st_mtime_ns for x in path.iterdir()}
+
+    store = DailyStatsStore(str(path))
+    store.update(observations[late])
+    after = {x.name: x.stat().st_mtime_ns for x in path.iterdir()}
+    assert {x for x in after if after[x] != before.get(x)} == {
+        f"date={dates.max():%Y-%m-%d}.parquet"
+    }, "Only the late day should be written."
+    assert set(store.stats["date"].dt.date) == {dates.max()}
+
+    full = DailyStatsStore()
+    full.update(observations)
+    np.testing.assert_allclose(
+        DailyStatsStore(str(path)).sd(observations), full.sd(observations), rtol=1e-9
+    )
+
+
+def test_daily_stats_update_only_touches_its_days(observations):
+    store = DailyStatsStore()
+    store.update(observations)
+    days = dict(store._days)
+
+    dates = observations["datetime"].dt.date
+    store.update(observations[dates == dates.max()].assign(value=0.0))
+    late = f"date={dates.max():%Y-%m-%d}.parquet"
+    assert store._days[late] is not days[late]
+    assert all(store._days[x] is days[x] for x in days if x != late), (
+        "Days without new observations should be left as they are."
+    )
+
+
+def test_daily_variance_by_station(observations, elements):
+    columns = Columns()
+    # A copy of the station with different values shouldn't change the first station's variance.
+    other = observations.assign(station="other", value=observations["value"] * 10)
+    both = pd.concat([observations, other], ignore_index=True)
+
+    sd = ck._calc_daily_variance(both, columns)
+    single = ck._calc_daily_variance(observations, columns)
+    np.testing.assert_allclose(
+        sd.loc[sd["station"] == "aceabsar", "sd"].to_numpy(), single["sd"].to_numpy()
+    )
@@ -0,0 +1,48 @@
+import pandas as pd
+
+import pyqc.elements as el
+from pyqc.columns import Columns
+from pyqc.elements import clear_elements_cache, compile_elements
+from pyqc.process import merge_elements_by_date
+
+
+def test_compile_elements_is_memoized(elements):
+    columns = Columns()
+    clear_elements_cache()
+    compiled = compile_elements(elements, columns)
+    assert compile_elements(elements.copy(), columns) is compiled, (
+        "An unchanged elements table should reuse the compiled elements."
+    )
+
+    changed = elements.assign(step_size=elements["step_size"] * 2)
+    assert compile_elements(changed, columns) is not compiled, (
+        "A changed elements table should be compiled again."
+    )
+
+
+def test_compile_elements_cache_is_bounded(elements, monkeypatch):
+    columns = Columns()
+    clear_elements_cache()
+    monkeypatch.setattr(el, "ELEMENTS_CACHE_SIZE", 2)
+    first = compile_elements(elements, columns)
+    for i in range(2):
+        compile_elements(elements.assign(step_size=i), columns)
+
+    assert len(el._cache) == 2, "The cache should not grow past its size."
+    assert compile_elements(elements, columns) is not first, (
+        "The least recently used elements table should have been evicted."
+    )
+
+
+def test_merge_with_compiled_elements(observations, elements):
+    columns = Columns()
+    before = elements.copy()
+    merged = merge_elements_by_date(observations, elements, columns)
+    compiled = merge_elements_by_date(
+        observations, compile_elements(elements, columns), columns
+    )
+    # Open-ended deployments end at the time of the call.
+    pd.testing.assert_frame_equal(
+        merged.drop(columns="date_end"), compiled.drop(columns="date_end")
+    )
+    pd.testing.assert_frame_equal(elements, before)
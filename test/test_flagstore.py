@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.bits import BitEncoder
+from pyqc.columns import Columns
+from pyqc.flagstore import FlagStore, match_flags
+from pyqc.process import check_observations
+
+
+@pytest.fixture(scope="module")
+def checked(observations, elements):
+    return check_observations(
+        observations,
+        elements,
+        Columns(),
+        ck.check_range_pd,
+        ck.check_step_pd,
+        ck.check_variance_pd,
+    )
+
+
+def test_match_flags():
+    flags = BitEncoder.encode_frame(
+        pd.DataFrame({"qa_range": [0, 1, -1, 0, np.nan], "qa_step": [0, 0, 0, -1, 0]})
+    ).to_numpy()
+    assert match_flags(flags, raised=["qa_range"]).tolist() == [0, 1, 0, 0, 0]
+    assert match_flags(flags, raised=["qa_range"], unable=["qa_step"]).tolist() == [
+        0,
+        1,
+        0,
+        1,
+        0,
+    ]
+    assert match_flags(flags, not_performed=["qa_range"]).tolist() == [0, 0, 0, 0, 1]
+    with pytest.raises(ValueError):
+        match_flags(flags, raised=["qa_nothing"])
+
+
+def test_flag_store_append_and_read(checked, tmp_path):
+    store = FlagStore(str(tmp_path))
+    # Append one day at a time, as checked observations arrive.
+    days = checked["datetime"].dt.date
+    for day in sorted(days.unique()):
+        store.append(checked[days == day])
+
+    series = checked[checked["element"] == "air_temp_0200"].sort_values("datetime")
+    start, end = series["datetime"].iloc[10], series["datetime"].iloc[20]
+    found = store.read("aceabsar", "air_temp_0200", start, end)
+
+    assert isinstance(found.flags, np.memmap)
+    assert len(found) == 11
+    np.testing.assert_array_equal(
+        found.times, series["datetime"].iloc[10:21].dt.tz_convert(None).to_numpy()
+    )
+    decoded = found.decode()
+    np.testing.assert_array_equal(
+        decoded["qa_range"].to_numpy(), series["qa_range"].iloc[10:21].to_numpy()
+    )
+
+    assert len(store.series()) == checked["element"].nunique()
+    with pytest.raises(ValueError):
+        store.append(checked.iloc[:1])
+
+
+def test_flag_store_rejects_unstored_flags(checked, tmp_path):
+    store = FlagStore(str(tmp_path))
+    with pytest.raises(ValueError, match="qa_outage"):
+        store.append(checked.assign(qa_outage=0))
+    assert store.series() == [], "Nothing should be written."
+
+
+def test_flag_store_query(checked, tmp_path):
+    store = FlagStore(str(tmp_path))
+    store.append(checked)
+
+    found = dict(store.query(raised=["qa_range"], unable=["qa_step"]))
+    expected = checked[(checked["qa_range"] == 1) | (checked["qa_step"] == -1)]
+    assert sum(len(x) for x in found.values()) == len(expected)
+
+    soil = dict(store.query(elements="soil_*"))
+    assert {x[1] for x in soil} == {
+        x for x in checked["element"].unique() if x.startswith("soil_")
+    }
+    assert not dict(store.query(end="2000-01-01"))
+
+
+def test_flag_store_interrupted_append(checked, tmp_path):
+    store = FlagStore(str(tmp_path))
+    days = checked["datetime"].dt.date
+    first, second = (checked[days == x] for x in sorted(days.unique()))
+    store.append(first)
+
+    # Flags written without their times, as if the process died during an append.
+    path = store._path(("aceabsar", "bp", ""))
+    with open(f"{path}/qa_flag.bin", "ab") as f:
+        f.write(np.zeros(3, dtype=np.uint32).tobytes())
+    assert len(store.read("aceabsar", "bp")) == (first["element"] == "bp").sum()
+
+    store.append(second)
+    found = store.read("aceabsar", "bp").decode()
+    expected = checked[checked["element"] == "bp"].sort_values("datetime")
+    np.testing.assert_array_equal(
+        found["qa_step"].to_numpy(), expected["qa_step"].to_numpy()
+    )
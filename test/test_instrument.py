@@ -0,0 +1,39 @@
+import json
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.instrument import Instrumentation
+from pyqc.process import check_observations
+
+
+def test_instrumentation_records_stages(observations, elements):
+    columns = Columns()
+    instrument = Instrumentation(memory=True)
+    dat = check_observations(
+        observations,
+        elements,
+        columns,
+        ck.check_range_pd,
+        ck.check_step_pd,
+        instrument=instrument,
+    )
+
+    names = [x.name for x in instrument.stages]
+    assert names == ["merge_elements_by_date", "check_range_pd", "check_step_pd"], (
+        "Every stage should be recorded in the order it ran."
+    )
+
+    step = instrument.stages[-1]
+    assert step.rows_out == len(dat), "Rows out should match the checked observations."
+    assert step.rows_in > step.rows_out, "The step check drops first observations."
+    assert step.peak_memory_mb is not None, "Memory should be traced when asked for."
+
+    station = step.stations["aceabsar"]
+    assert station["rows_out"] == len(dat), "Rows should be broken down by station."
+    assert station["qa_step"] == (dat["qa_step"] == 1).sum(), (
+        "Raised flags should be counted by station."
+    )
+
+    exported = json.loads(instrument.to_json())
+    assert len(exported["stages"]) == 3, "All stages should be exported."
+    assert list(instrument.to_frame()["name"]) == names
@@ -0,0 +1,113 @@
+import sys
+
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.process import check_observations
+from pyqc.synthetic import make_mesonet
+
+pytest.importorskip("pyarrow")
+
+from pyqc.io import read_elements, read_observations, write_observations  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def checked(observations, elements):
+    return check_observations(
+        observations,
+        elements,
+        Columns(),
+        ck.check_range_pd,
+        ck.check_step_pd,
+        ck.check_variance_pd,
+    )
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_write_read_round_trip(checked, tmp_path, format):
+    write_observations(checked, tmp_path, format=format)
+    dat = read_observations(tmp_path, format=format)
+
+    assert {x.name for x in tmp_path.iterdir()} == {"station=aceabsar"}
+    assert isinstance(dat["element"].dtype, pd.CategoricalDtype)
+    assert dat["datetime"].dt.tz is not None, "Datetimes lost their time zone."
+    assert (dat[["qa_range", "qa_step", "qa_delta"]].dtypes == "int8").all()
+
+    sort_cols = ["element", "datetime"]
+    dat = dat[checked.columns].sort_values(sort_cols, ignore_index=True)
+    expected = checked.sort_values(sort_cols, ignore_index=True)
+    pd.testing.assert_frame_equal(
+        dat, expected, check_dtype=False, check_categorical=False
+    )
+
+
+def test_packed_round_trip(checked, tmp_path):
+    write_observations(checked, tmp_path, packed=True, date_format="%Y-%m")
+    dat = read_observations(tmp_path, filters=[("date", "==", "2022-10")])
+
+    assert "qa_flag" not in dat.columns
+    assert set(dat.filter(like="qa_").columns) == {"qa_range", "qa_step", "qa_delta"}
+
+    sort_cols = ["element", "datetime"]
+    dat = dat[checked.columns].sort_values(sort_cols, ignore_index=True)
+    expected = checked.sort_values(sort_cols, ignore_index=True)
+    assert (dat["qa_delta"] == expected["qa_delta"]).all()
+
+
+def test_read_elements(elements, tmp_path):
+    elements.to_parquet(tmp_path / "elements.parquet")
+    dat = read_elements(tmp_path / "elements.parquet")
+    assert pd.api.types.is_datetime64_dtype(dat["date_start"])
+    assert dat.shape == elements.shape
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_read_elements_round_trip_checks(tmp_path, format):
+    columns = Columns()
+    dat, elements = make_mesonet(stations=2, days=3, outages=3, seed=2)
+    path = tmp_path / f"elements.{format}"
+    if format == "parquet":
+        elements.to_parquet(path)
+    else:
+        elements.to_feather(path)
+    read = read_elements(path, format=format)
+    assert read["outage_ranges"].map(type).eq(list).all(), (
+        "Outage ranges should be read back as lists."
+    )
+
+    checks = [
+        ck.check_range_pd,
+        ck.check_step_pd,
+        ck.check_outages,
+        ck.check_like_elements,
+    ]
+    expected = check_observations(dat, elements, columns, *checks)
+    pd.testing.assert_frame_equal(
+        check_observations(dat, read, columns, *checks), expected
+    )
+
+
+def test_check_outages_read_elements(tmp_path):
+    columns = Columns()
+    dat, elements = make_mesonet(stations=2, days=3, outages=3, seed=1)
+    elements.to_parquet(tmp_path / "elements.parquet")
+    read = read_elements(tmp_path / "elements.parquet")
+
+    expected = check_observations(dat, elements, columns, ck.check_outages)
+    flags = check_observations(dat, read, columns, ck.check_outages)
+    assert expected["qa_outage"].sum() > 0, "No observations were flagged as outages."
+    assert (flags["qa_outage"] == expected["qa_outage"]).all(), (
+        "Outages read back from Parquet should flag the same observations."
+    )
+
+
+@pytest.mark.parametrize(
+    "read", [read_elements, read_observations, lambda x: write_observations(None, x)]
+)
+def test_missing_pyarrow(tmp_path, monkeypatch, read):
+    # A module that is None in sys.modules can't be imported.
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match=r"pyqc\[arrow\]"):
+        read(str(tmp_path))
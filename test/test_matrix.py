@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from pyqc.columns import Columns
+from pyqc.matrix import StationMatrix, station_matrices
+from pyqc.process import merge_elements_by_date
+from pyqc.times import TimeIndex
+
+
+def test_station_matrices(observations, elements):
+    columns = Columns()
+    dat = merge_elements_by_date(observations, elements, columns)
+    index = TimeIndex.build(dat, columns)
+
+    matrices = station_matrices(dat, columns, index)
+    assert station_matrices(dat, columns, index) is matrices
+    assert all(m.unique for m in matrices)
+
+    values = dat[columns.compare_col].to_numpy(dtype=float)
+    for m in matrices:
+        np.testing.assert_array_equal(
+            m.gather(m.scatter(values[m.rows])), values[m.rows]
+        )
+
+    assert not any(m.unique for m in station_matrices(dat.iloc[[0, 0]], columns))
+
+
+def test_station_matrices_by_station(observations):
+    columns = Columns()
+    # The second station observes one element, a day later, so it shouldn't widen the first's matrix.
+    first = observations.iloc[:1000]
+    other = first[first["element"] == first["element"].iloc[0]].assign(
+        station="other", datetime=lambda x: x["datetime"] + pd.Timedelta("1D")
+    )
+    dat = pd.concat([first, other], ignore_index=True)
+
+    matrices = station_matrices(dat, columns)
+    assert [len(m.rows) for m in matrices] == [len(first), len(other)]
+    assert matrices[0].shape == (
+        first["datetime"].nunique() + 1,
+        first["element"].nunique(),
+    )
+    assert matrices[1].shape == (len(other) + 1, 1)
+
+
+def test_threshold():
+    m = StationMatrix(
+        np.arange(4), np.array([0, 0, 1, 1]), np.array([0, 1, 0, 1]), (2, 2), None
+    )
+    assert m.threshold(np.array([1.0, 2.0, 1.0, 2.0])).shape == (1, 2)
+
+    swapped = m.threshold(np.array([1.0, 2.0, 3.0, 2.0]))
+    assert swapped.shape == (2, 2)
+    np.testing.assert_array_equal(m.gather(swapped), [1.0, 2.0, 3.0, 2.0])
@@ -0,0 +1,24 @@
+from pyqc.memo import Memo
+
+
+def test_memo_keeps_most_recently_used():
+    memo = Memo()
+    built = []
+
+    def build(x):
+        built.append(x)
+        return x * 2
+
+    assert memo.get("a", lambda: build(1), 2) == 2
+    assert memo.get("a", lambda: build(1), 2) == 2
+    assert built == [1], "A memoized value should not be built again."
+
+    memo.get("b", lambda: build(2), 2)
+    memo.get("a", lambda: build(1), 2)
+    memo.get("c", lambda: build(3), 2)
+    assert len(memo) == 2
+    assert memo.get("a", lambda: build(1), 2) == 2
+    assert built == [1, 2, 3], "The least recently used value should be evicted."
+
+    memo.clear()
+    assert len(memo) == 0
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.parallel import StationCheckError, check_observations_parallel
+from pyqc.process import check_observations
+from pyqc.synthetic import make_mesonet
+
+CHECKS = [ck.check_range_pd, ck.check_step_pd, ck.check_variance_pd]
+
+
+@pytest.fixture
+def two_stations(observations, elements):
+    dat = pd.concat(
+        [
+            observations,
+            observations.assign(station="copy", value=observations["value"] * 2),
+        ],
+        ignore_index=True,
+    )
+    elems = pd.concat([elements, elements.assign(station="copy")], ignore_index=True)
+    return dat, elems
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_parallel_matches_serial(two_stations, max_workers):
+    dat, elems = two_stations
+    columns = Columns()
+    expected = check_observations(dat, elems, columns, *CHECKS)
+    out = check_observations_parallel(
+        dat, elems, columns, *CHECKS, max_workers=max_workers, stations_per_task=1
+    )
+    pd.testing.assert_frame_equal(out, expected)
+
+
+def test_parallel_soil_sensors_match_serial():
+    columns = Columns()
+    # One sensor of each soil element per station, so a sensor is only told apart by its address
+    # when the elements of every station are seen together.
+    dat, elems = make_mesonet(stations=2, days=1, soil_sensors=2, seed=3)
+    dat = dat[dat["id"].isna() | (dat["id"] == 0)]
+    elems = elems[elems["sdi12_address"].isna() | (elems["sdi12_address"] == 0)]
+
+    expected = check_observations(dat, elems, columns, *CHECKS)
+    out = check_observations_parallel(dat, elems, columns, *CHECKS, max_workers=1)
+    pd.testing.assert_frame_equal(out, expected)
+
+
+def test_parallel_reports_station_errors(two_stations):
+    dat, elems = two_stations
+    columns = Columns()
+    # Observations from before any of the station's sensors were deployed.
+    copy = dat["station"] == "copy"
+    dat.loc[copy, "datetime"] = dat.loc[copy, "datetime"] - pd.Timedelta(days=600)
+    with pytest.raises(StationCheckError) as err:
+        check_observations_parallel(dat, elems, columns, *CHECKS, max_workers=2)
+
+    assert list(err.value.errors) == ["copy"], "The failed station was not reported."
+    assert isinstance(err.value.errors["copy"], IndexError)
+    assert set(err.value.result["station"]) == {"aceabsar"}, (
+        "Results for the other stations should still be returned."
+    )
+
+
+def test_parallel_spatial_matches_serial():
+    columns = Columns()
+    dat, elems = make_mesonet(stations=4, days=2, elements=3, soil_sensors=0, seed=2)
+    stations = pd.DataFrame(
+        {
+            "station": sorted(dat["station"].unique()),
+            "latitude": [46.80, 46.81, 46.82, 46.80],
+            "longitude": [-114.00, -114.01, -113.99, -114.03],
+        }
+    )
+    checks = [*CHECKS, ck.check_spatial, ck.check_like_elements]
+
+    expected = check_observations(dat, elems, columns, *checks, stations=stations)
+    assert (expected["qa_spatial"] >= 0).all(), "Every station should have neighbors."
+    out = check_observations_parallel(
+        dat, elems, columns, *checks, max_workers=2, stations=stations
+    )
+    pd.testing.assert_frame_equal(out, expected)
@@ -0,0 +1,128 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.parallel import StationCheckError
+from pyqc.pipeline import check_observations_async
+from pyqc.process import check_observations
+
+CHECKS = [ck.check_range_pd, ck.check_step_pd, ck.check_variance_pd]
+STATIONS = ["s0", "s1", "s2", "s3", "s4"]
+
+
+@pytest.fixture
+def files(observations, elements, tmp_path):
+    """A file-backed source of several stations with the same observations."""
+    for i, station in enumerate(STATIONS):
+        dat = observations.assign(station=station, value=observations["value"] + i)
+        dat.to_parquet(tmp_path / f"{station}.parquet")
+    elems = pd.concat([elements.assign(station=x) for x in STATIONS])
+    return tmp_path, elems.reset_index(drop=True)
+
+
+def _source(path, fail=()):
+    async def source(station):
+        if station in fail:
+            raise FileNotFoundError(station)
+        return await asyncio.to_thread(pd.read_parquet, path / f"{station}.parquet")
+
+    return source
+
+
+def test_pipeline_matches_serial(files):
+    path, elems = files
+    columns = Columns()
+    written = {}
+
+    async def sink(station, dat):
+        written[station] = dat
+
+    asyncio.run(
+        check_observations_async(
+            STATIONS, _source(path), sink, elems, columns, *CHECKS, workers=2
+        )
+    )
+
+    assert sorted(written) == STATIONS
+    for station in STATIONS:
+        expected = check_observations(
+            pd.read_parquet(path / f"{station}.parquet"), elems, columns, *CHECKS
+        )
+        pd.testing.assert_frame_equal(written[station], expected)
+
+
+def test_pipeline_isolates_station_errors(files):
+    path, elems = files
+    written = []
+
+    async def sink(station, dat):
+        if station == "s3":
+            raise OSError("disk full")
+        written.append(station)
+
+    with pytest.raises(StationCheckError) as e:
+        asyncio.run(
+            check_observations_async(
+                [*STATIONS, "missing"],
+                _source(path, fail=["s1"]),
+                sink,
+                elems,
+                Columns(),
+                *CHECKS,
+            )
+        )
+
+    assert set(e.value.errors) == {"s1", "s3", "missing"}
+    assert isinstance(e.value.errors["s1"], FileNotFoundError)
+    assert isinstance(e.value.errors["s3"], OSError)
+    assert written == ["s0", "s2", "s4"]
+
+
+def test_pipeline_backpressure(files):
+    path, elems = files
+    source = _source(path)
+    loaded, written = [], []
+    ahead = []
+
+    async def counting_source(station):
+        loaded.append(station)
+        ahead.append(len(loaded) - len(written))
+        return await source(station)
+
+    async def slow_sink(station, dat):
+        await asyncio.sleep(0.05)
+        written.append(station)
+
+    asyncio.run(
+        check_observations_async(
+            STATIONS * 3,
+            counting_source,
+            slow_sink,
+            elems,
+            Columns(),
+            *CHECKS,
+            prefetch=1,
+        )
+    )
+
+    assert written == STATIONS * 3
+    # One waiting to be checked, one being checked, one waiting to be written, one being written
+    # and the one being loaded.
+    assert max(ahead) <= 5
+
+
+def test_pipeline_rejects_network_checks(files):
+    path, elems = files
+
+    async def sink(station, dat):
+        pass
+
+    with pytest.raises(ValueError, match="check_spatial"):
+        asyncio.run(
+            check_observations_async(
+                STATIONS, _source(path), sink, elems, Columns(), ck.check_spatial
+            )
+        )
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.plan import CheckPlan, canonical_order, sort_keys, split_network_checks
+from pyqc.process import merge_elements_by_date
+
+
+def test_plan_orders_by_flag_dependencies():
+    plan = CheckPlan.build(ck.check_like_elements, ck.check_range_pd, ck.check_step_pd)
+    assert [x.name for x in plan.checks] == ["range", "step", "like_elements"], (
+        "Checks that read other flags should run after them."
+    )
+    assert CheckPlan.build(ck.check_range_pd, lambda dat, columns: dat) is None, (
+        "Unregistered checks can't be planned."
+    )
+
+
+@pytest.mark.parametrize("filter_first", [True, False])
+def test_plan_matches_chained_checks(observations, elements, filter_first):
+    columns = Columns()
+    dat = merge_elements_by_date(observations, elements, columns)
+    checks = [
+        ck.check_range_pd,
+        ck.check_step_pd,
+        ck.check_variance_pd,
+        ck.check_like_elements,
+    ]
+
+    chained = dat
+    for check in checks:
+        chained = check(chained, columns=columns, filter_first=filter_first)
+    # Intermediate columns aren't kept by the plan.
+    chained = chained.drop(columns="flag_range", errors="ignore")
+
+    planned = CheckPlan.build(*checks).run(dat, columns, filter_first=filter_first)
+    pd.testing.assert_frame_equal(planned, chained.reset_index(drop=True))
+
+
+def test_plan_missing_column(observations, elements):
+    columns = Columns()
+    dat = merge_elements_by_date(observations, elements, columns)
+    with pytest.raises(KeyError):
+        CheckPlan.build(ck.check_step_pd).run(
+            dat.drop(columns=columns.step_col), columns
+        )
+
+
+def test_canonical_order(observations, elements):
+    columns = Columns()
+    dat = merge_elements_by_date(observations, elements, columns)
+    assert canonical_order(dat, columns) is None, (
+        "Merged observations should be sorted."
+    )
+
+    shuffled = dat.sample(frac=1, random_state=0, ignore_index=True)
+    order = canonical_order(shuffled, columns)
+    expected = shuffled.sort_values(sort_keys(shuffled, columns), kind="stable")
+    assert (order == expected.index.to_numpy()).all(), (
+        "The order should be a stable sort by station, element, id and datetime."
+    )
+
+
+def test_split_network_checks():
+    station, network = split_network_checks(
+        ck.check_range_pd, ck.check_spatial, ck.check_step_pd, ck.check_like_elements
+    )
+    assert station == (ck.check_range_pd,)
+    assert network == (ck.check_spatial, ck.check_step_pd, ck.check_like_elements)
+    assert split_network_checks(ck.check_range_pd) == ((ck.check_range_pd,), ())
@@ -1,6 +1,10 @@
+import numpy as np
+import pandas as pd
+import pytest
+
 import pyqc.checks as ck
 from pyqc.columns import Columns
-from pyqc.process import check_observations
+from pyqc.process import check_observations, merge_deployments, merge_elements_by_date
 
 
 def test_check_observations(observations, elements):
@@ -19,3 +23,88 @@ def test_check_observations(observations, elements):
     assert -1 not in dat["qa_step"].to_list(), "QA step test yielded incorrect values"
     assert "qa_delta" in dat.columns, "Delta QA flag not properly added to DataFrame."
     assert -1 not in dat["qa_delta"].to_list(), "QA delta test yielded incorrect values"
+
+
+def test_merge_elements_by_date_uses_active_deployment(observations, elements):
+    columns = Columns()
+    # Shift the observations onto the day sensors were swapped at the station.
+    dat = observations.assign(
+        datetime=observations["datetime"] - pd.Timedelta(days=184)
+    )
+    dat = merge_elements_by_date(dat, elements, columns)
+    assert dat.shape[0] == observations.shape[0], (
+        "Observations were dropped or duplicated."
+    )
+
+    swapped = dat[(dat["element"] == "air_temp_0200") & (dat["datetime"].dt.day == 30)]
+    assert (swapped["serial_number"] == "U0940850").all(), (
+        "Overlapping deployments should resolve to the one that ends last."
+    )
+
+
+def test_merge_deployments(observations, elements):
+    columns = Columns()
+    dat, deployments = merge_deployments(observations, elements, columns)
+    merged = merge_elements_by_date(observations, elements, columns)
+    assert "range_min" not in dat.columns, "Elements columns shouldn't be copied."
+    assert dat[columns.deployment_col].dtype == "int32"
+
+    # Open-ended deployments end when they are merged.
+    attached = deployments.attach(dat, columns).drop(columns=columns.deployment_col)
+    pd.testing.assert_frame_equal(
+        attached.drop(columns=columns.end_col), merged.drop(columns=columns.end_col)
+    )
+    assert np.isnan(deployments.values(np.array([-1]), columns.min_col)).all(), (
+        "Observations without a deployment should have missing thresholds."
+    )
+
+
+def test_check_observations_keep_elements_columns(observations, elements):
+    columns = Columns()
+    checks = [ck.check_range_pd, ck.check_step_pd, ck.check_like_elements]
+    dat = check_observations(observations, elements, columns, *checks)
+    assert not {"range_min", columns.deployment_col} & set(dat.columns), (
+        "Elements columns should only be kept when asked for."
+    )
+
+    kept = check_observations(
+        observations,
+        elements,
+        columns,
+        *checks,
+        keep_columns=["station", "datetime", "^element$", "value", "serial_number"],
+    )
+    merged = merge_elements_by_date(observations, elements, columns)
+    merged = ck.check_step_pd(merged, columns)
+    assert kept.columns[4] == "serial_number", "Kept columns go before the flags."
+    assert (kept["serial_number"] == merged["serial_number"]).all()
+
+
+def test_merge_elements_by_date_missing_element(observations, elements):
+    columns = Columns()
+    dat = observations.assign(
+        datetime=observations["datetime"] - pd.Timedelta(days=600)
+    )
+    with pytest.raises(IndexError):
+        merge_elements_by_date(dat, elements, columns)
+
+
+def test_check_observations_dtypes(observations, elements):
+    columns = Columns()
+    dat = check_observations(
+        observations,
+        elements,
+        columns,
+        ck.check_range_pd,
+        ck.check_step_pd,
+        ck.check_variance_pd,
+        ck.check_like_elements,
+    )
+    for col in ["qa_range", "qa_step", "qa_delta"]:
+        assert dat[col].dtype == "int8", f"{col} should be stored as int8."
+    # Shared flags pack up to 8 like elements, so they don't fit in an int8.
+    assert dat["qa_shared"].dtype == "int16", "qa_shared should be stored as int16."
+    for col in ["station", "element"]:
+        assert isinstance(dat[col].dtype, pd.CategoricalDtype), (
+            f"{col} should be categorical."
+        )
@@ -0,0 +1,112 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.process import check_observations
+from pyqc.recheck import diff_elements, recheck_observations
+from pyqc.synthetic import make_mesonet
+
+CHECKS = [
+    ck.check_range_pd,
+    ck.check_step_pd,
+    ck.check_variance_pd,
+    ck.check_like_elements,
+]
+
+
+def _edit(elements, element, **values):
+    new = elements.copy()
+    # The open deployment of the element.
+    row = new.index[(new["element"] == element) & new["date_end"].isna()][-1]
+    for col, value in values.items():
+        new.loc[row, col] = value
+    return new
+
+
+def test_diff_elements(elements):
+    assert diff_elements(elements, elements.copy()).empty
+    assert diff_elements(elements, _edit(elements, "bp", model="new")).empty
+
+    diff = diff_elements(elements, _edit(elements, "air_temp_0200", step_size=0.5))
+    assert diff[["element", "checks"]].values.tolist() == [["air_temp_0200", ("step",)]]
+    assert diff["end"].isna().all()
+
+
+def test_diff_elements_shared_sensor(elements):
+    diff = diff_elements(elements, _edit(elements, "ppt", range_max=0.0))
+    # ppt_max_rate shares a sensor with ppt, so its like elements flag can change.
+    assert diff[["element", "checks"]].values.tolist() == [
+        ["ppt", ("range",)],
+        ["ppt_max_rate", ("like_elements",)],
+    ]
+
+
+def _split(elements):
+    """End the air temperature deployment early and start a new one with another range."""
+    new = _edit(elements, "air_temp_0200", date_end=datetime.date(2022, 10, 1))
+    row = new[new["element"] == "air_temp_0200"].iloc[[-1]]
+    added = row.assign(
+        date_start=datetime.date(2022, 10, 2), date_end=None, range_max=10.0
+    )
+    return pd.concat([new, added], ignore_index=True)
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        lambda x: _edit(x, "air_temp_0200", step_size=0.5),
+        lambda x: _edit(x, "rh", range_min=50.0),
+        lambda x: _edit(x, "ppt", range_max=0.0),
+        lambda x: _edit(x, "bp", persistence_delta=5.0),
+        _split,
+    ],
+)
+def test_recheck_matches_full_run(observations, elements, edit):
+    columns = Columns()
+    new = edit(elements)
+    checked = check_observations(observations, elements, columns, *CHECKS)
+
+    rechecked = recheck_observations(
+        checked, observations, elements, new, columns, *CHECKS
+    )
+    expected = check_observations(observations, new, columns, *CHECKS)
+    pd.testing.assert_frame_equal(rechecked, expected)
+
+
+@pytest.mark.parametrize(
+    "edit", [{"spatial_sd": 0.5}, {"step_size": 2}, {"range_max": 12.0}]
+)
+def test_recheck_spatial_matches_full_run(edit):
+    columns = Columns()
+    dat, elements = make_mesonet(stations=4, days=3, elements=3, soil_sensors=0, seed=2)
+    stations = pd.DataFrame(
+        {
+            "station": sorted(dat["station"].unique()),
+            "latitude": [46.80, 46.81, 46.82, 46.80],
+            "longitude": [-114.00, -114.01, -113.99, -114.03],
+        }
+    )
+    checks = [*CHECKS, ck.check_spatial]
+    new = elements.copy()
+    edited = (new["station"] == "station_0001") & (new["element"] == "air_temp_0200")
+    for col, value in edit.items():
+        new.loc[edited, col] = value
+
+    checked = check_observations(dat, elements, columns, *checks, stations=stations)
+    rechecked = recheck_observations(
+        checked, dat, elements, new, columns, *checks, stations=stations
+    )
+    expected = check_observations(dat, new, columns, *checks, stations=stations)
+    pd.testing.assert_frame_equal(rechecked, expected)
+
+
+def test_recheck_needs_registered_checks(observations, elements):
+    columns = Columns()
+    checked = check_observations(observations, elements, columns, ck.check_range_pd)
+    with pytest.raises(ValueError):
+        recheck_observations(
+            checked, observations, elements, elements, columns, lambda dat, columns: dat
+        )
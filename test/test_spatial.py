@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.spatial import build_neighbor_index, neighbor_index
+
+STATIONS = pd.DataFrame(
+    {
+        "station": ["a", "b", "c", "d", "far"],
+        "latitude": [46.80, 46.81, 46.82, 46.80, 48.50],
+        "longitude": [-114.00, -114.01, -113.99, -114.03, -110.00],
+    }
+)
+
+
+def _observations(outlier: float = 0.0) -> pd.DataFrame:
+    times = pd.date_range("2024-06-01", periods=24, freq="h", tz="UTC")
+    dat = pd.DataFrame(
+        {
+            "station": np.repeat(STATIONS["station"].to_numpy(), len(times)),
+            "element": "air_temp_0200",
+            "datetime": np.tile(times, len(STATIONS)),
+            "value": np.tile(np.sin(np.arange(len(times)) / 4) * 5 + 15, len(STATIONS)),
+        }
+    )
+    dat.loc[(dat["station"] == "a") & (dat["datetime"] == times[10]), "value"] += (
+        outlier
+    )
+    return dat.assign(spatial_sd=3.0)
+
+
+def test_neighbor_index():
+    index = build_neighbor_index(STATIONS, max_neighbors=2)
+    a = index.neighbors[index.stations.get_loc("a")]
+    assert set(index.stations[a]) <= {"b", "c", "d"}
+    assert (index.weights[index.stations.get_loc("a")] > 0).all()
+    # The far station has no neighbors within 100 km.
+    assert (index.neighbors[index.stations.get_loc("far")] == -1).all()
+    assert index.of("a") == list(index.stations[a])
+    assert index.of("far") == [] and index.of("unknown") == []
+    assert neighbor_index(STATIONS, max_neighbors=2) is neighbor_index(
+        STATIONS, max_neighbors=2
+    )
+
+
+def test_check_spatial_flags_outlier():
+    dat = _observations(outlier=5)
+    checked = ck.check_spatial(dat, Columns(), stations=STATIONS)
+
+    assert checked["qa_spatial"].dtype == np.int8
+    raised = checked[checked["qa_spatial"] == 1]
+    assert raised["station"].tolist() == ["a"]
+    assert raised["datetime"].tolist() == [dat["datetime"].iloc[10]]
+    assert (checked.loc[checked["station"] == "far", "qa_spatial"] == -1).all()
+
+
+def test_check_spatial_unknown_station_and_arguments():
+    dat = pd.concat([_observations(), _observations().assign(station="unknown")])
+    dat["station"] = dat["station"].astype("category")
+    checked = ck.check_spatial(dat, Columns(), stations=STATIONS)
+    assert (checked.loc[checked["station"] == "unknown", "qa_spatial"] == -1).all()
+    assert (checked.loc[checked["station"] == "a", "qa_spatial"] == 0).all()
+
+    with pytest.raises(ValueError):
+        ck.check_spatial(dat, Columns())
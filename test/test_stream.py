@@ -0,0 +1,80 @@
+import pandas as pd
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.process import check_observations
+from pyqc.stream import StreamingSession
+
+
+def test_streaming_session_matches_batch_step(observations, elements):
+    columns = Columns()
+    expected = check_observations(
+        observations,
+        elements,
+        columns,
+        ck.check_range_pd,
+        ck.check_step_pd,
+        filter_first=False,
+    ).sort_values(["element", "datetime"], ignore_index=True)
+
+    session = StreamingSession(elements, columns)
+    batches = observations.groupby(observations["datetime"].dt.floor("1h"))
+    checked = [session.check(batch) for _, batch in batches]
+
+    for batch in checked[1:]:
+        assert -1 not in batch["qa_step"].to_list(), (
+            "The step check should continue from the previous batch."
+        )
+
+    checked = pd.concat(checked).sort_values(["element", "datetime"], ignore_index=True)
+    assert checked["qa_step"].to_list() == expected["qa_step"].to_list()
+    assert checked["qa_range"].to_list() == expected["qa_range"].to_list()
+
+
+def test_streaming_session_late_and_on_time_batch(observations, elements):
+    columns = Columns()
+    # A spike that arrives late, in the same batch as the next hour of observations.
+    spike = observations["datetime"] == observations["datetime"].min() + pd.Timedelta(
+        minutes=30
+    )
+    dat = observations.assign(value=observations["value"].where(~spike, 1e6))
+    expected = check_observations(
+        dat, elements, columns, ck.check_range_pd, ck.check_step_pd, filter_first=False
+    ).set_index(["element", "datetime"])
+
+    hour = dat["datetime"].dt.floor("1h")
+    first, second = hour == hour.min(), hour == hour.min() + pd.Timedelta(hours=1)
+    session = StreamingSession(elements, columns)
+    session.check(dat[first & ~spike])
+    checked = session.check(dat[spike | second]).set_index(["element", "datetime"])
+
+    late = checked.index.get_level_values("datetime") <= hour.min() + pd.Timedelta(
+        minutes=55
+    )
+    assert (checked.loc[late, "qa_step"] == -1).all(), (
+        "Late observations can't be checked."
+    )
+    on_time = checked[~late]
+    assert (on_time["qa_step"] == expected.loc[on_time.index, "qa_step"]).all(), (
+        "On time observations should follow the last observation seen, not a late one."
+    )
+
+
+def test_streaming_session_daily_variance(observations, elements):
+    columns = Columns()
+    expected = check_observations(
+        observations, elements, columns, ck.check_variance_pd
+    ).set_index(["element", "datetime"])
+
+    session = StreamingSession(elements, columns)
+    for _, batch in observations.groupby(observations["datetime"].dt.floor("6h")):
+        checked = session.check(batch)
+
+    # Once the last batch of a day is in, the persistence check has the whole day.
+    checked = checked.set_index(["element", "datetime"])
+    assert (checked["qa_delta"] == expected.loc[checked.index, "qa_delta"]).all(), (
+        "Streaming persistence check disagrees with check_variance_pd."
+    )
+    assert all(len(x) <= 2 for x in session._daily.values()), (
+        "Old daily statistics were not evicted."
+    )
@@ -0,0 +1,33 @@
+import pandas as pd
+
+import pyqc.checks as ck
+from pyqc.columns import Columns
+from pyqc.process import check_observations
+from pyqc.synthetic import make_mesonet
+
+
+def test_make_mesonet_is_reproducible():
+    dat, elements = make_mesonet(stations=2, days=2, sensor_swaps=1, outages=1)
+    again = make_mesonet(stations=2, days=2, sensor_swaps=1, outages=1)
+    pd.testing.assert_frame_equal(dat, again[0])
+    pd.testing.assert_frame_equal(elements, again[1])
+
+    assert dat["station"].nunique() == 2, "Observations should cover every station."
+    assert elements["date_end"].notna().any(), (
+        "Swapped sensors should end a deployment."
+    )
+    assert elements["outage_ranges"].map(len).sum() == 2, (
+        "Each station should have an outage."
+    )
+
+
+def test_make_mesonet_soil_sensors():
+    columns = Columns()
+    dat, elements = make_mesonet(days=1, elements=2, soil_depths=[5], soil_sensors=2)
+    assert "id" in dat.columns, "Soil sensors should be told apart by their id."
+
+    checked = check_observations(
+        dat, elements, columns, ck.check_range_pd, ck.check_outages
+    )
+    assert len(checked) == len(dat), "Every observation should match a deployment."
+    assert (checked["qa_range"] >= 0).all(), "Every deployment should have a range."
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from pyqc.columns import Columns
+from pyqc.plan import Check, CheckPlan, CheckResult
+from pyqc.process import merge_elements_by_date
+from pyqc.times import TimeIndex
+
+
+def test_time_index(observations):
+    dat = observations.copy()
+    dat.loc[5, "datetime"] = pd.NaT
+    index = TimeIndex.build(dat, Columns())
+
+    assert len(index.times) == dat["datetime"].nunique()
+    assert index.times.is_monotonic_increasing
+    np.testing.assert_array_equal(
+        index.times[index.codes[index.codes >= 0]],
+        dat["datetime"][index.codes >= 0].to_numpy(),
+    )
+    assert index.codes[5] == -1 and index.row_days[5] == -1
+
+    dates = pd.Series(index.days.date[index.row_days]).where(index.row_days >= 0)
+    expected = dat["datetime"].dt.date
+    assert dates[expected.notna()].tolist() == expected.dropna().tolist()
+
+    kept = index.take(index.codes >= 0)
+    assert len(kept.codes) == len(dat) - 1
+    assert TimeIndex.of(dat, Columns(), index) is index
+    assert TimeIndex.of(dat.iloc[1:], Columns(), index) is not index
+
+
+def test_plan_shares_time_index(observations, elements):
+    columns = Columns()
+    dat = merge_elements_by_date(observations, elements, columns)
+    seen = []
+
+    def compute(dat, columns, flags, time_index=None, **kwargs):
+        seen.append(time_index)
+        return CheckResult({})
+
+    plan = CheckPlan([Check("probe", lambda dat, columns: dat, compute)])
+    plan.run(dat, columns)
+    assert isinstance(seen[0], TimeIndex) and len(seen[0].codes) == len(dat)